@@ -1,13 +1,13 @@
+import os
 from flask import Flask, request
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from config.config import Config
+from app.replicas import RoutingSession
 
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 limiter = Limiter(
     key_func=get_remote_address,
@@ -19,9 +19,21 @@ def create_app(config_class=Config):
     app.config.from_object(config_class)
 
     db.init_app(app)
-    migrate.init_app(app, db)
+    # Before anything connects, so every SQLite connection gets the production pragmas
+    from app import sqlite_tuning
+    sqlite_tuning.init_app(app)
+    # Alembic is only needed by the `flask db` commands; web workers skip importing it
+    if os.environ.get('FLASK_RUN_FROM_CLI'):
+        from flask_migrate import Migrate
+        Migrate(app, db)
     login_manager.init_app(app)
     limiter.init_app(app)
+
+    from app import passwords
+    passwords.init_app(app)
+
+    from app import negotiation
+    negotiation.init_app(app)
     
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
@@ -35,6 +47,42 @@ def create_app(config_class=Config):
     from app.routes.auth import bp as auth_bp
     app.register_blueprint(auth_bp, url_prefix='/auth')
 
+    from app.routes.admin import bp as admin_bp
+    app.register_blueprint(admin_bp, url_prefix='/admin')
+
+    from app import tenancy
+    tenancy.init_app(app)
+
+    from app import warmup
+    warmup.init_app(app)
+
+    from app import note_drafts
+    note_drafts.init_app(app)
+
+    from app import jobs
+    jobs.init_app(app)
+
+    from app import provisioning
+    provisioning.init_app(app)
+
+    from app import autocomplete
+    autocomplete.init_app(app)
+
+    if app.config.get('SQLALCHEMY_BINDS'):
+        from app import replicas
+        replicas.init_app(app)
+
+    if app.config.get('METRICS_ENABLED'):
+        from app import metrics
+        metrics.init_app(app)
+
+    if app.config.get('SLOW_QUERY_LOG_ENABLED'):
+        from app import slow_queries
+        slow_queries.init_app(app)
+
+    if app.config.get('PROFILING_ENABLED'):
+        from app import profiling
+        profiling.init_app(app)
 
     return app
 
@@ -0,0 +1,268 @@
+"""
+In-memory type-ahead over guild, district and player names.
+
+Each worker keeps one PrefixIndex per (campaign, kind) for guilds and
+districts and one shared index of users (username and character name).
+An index is a sorted list of (key, id) pairs searched with bisect; every
+word start of a name is a key, so "iron" finds both "Iron Fist" and "The
+Iron Works". A keystroke is a couple of bisections and a short scan, well
+under a millisecond even with tens of thousands of names. When a query has
+no prefix match (a typo), a trigram index supplies similar names instead.
+
+Indexes are built on first use and kept current from the change log: at
+most every AUTOCOMPLETE_SYNC_INTERVAL seconds a lookup checks for entries
+above the index's settled sequence (see app/models/change_log.py) and
+re-reads just the rows they touched. If the log was compacted past the
+index, the index is rebuilt.
+"""
+
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from time import monotonic
+
+from flask import current_app
+
+from app import db
+from app.models import District, Guild, User
+from app.models.change_log import ChangeLogEntry
+
+KINDS = ['guild', 'district', 'user']
+# Kinds indexed per campaign; users are shared by every campaign
+CAMPAIGN_KINDS = {'guild': Guild, 'district': District}
+
+WORD_START = re.compile(r"(?:^|(?<=[\s\-_'.,/(]))\w")
+
+
+def normalize(text):
+    """Case-folded with runs of whitespace collapsed, the form keys and queries are compared in"""
+    return ' '.join(text.casefold().split())
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PrefixIndex:
+    """Sorted (key, id) pairs for prefix lookups, plus a trigram index for fuzzy ones"""
+
+    def __init__(self):
+        self._keys = []  # Sorted (key, id)
+        self._entries = {}  # id -> (label, detail, normalized label, keys, trigrams)
+        self._trigrams = {}  # trigram -> set of ids
+
+    def __len__(self):
+        return len(self._entries)
+
+    @classmethod
+    def build(cls, entries):
+        """Index of (id, label, detail, names) tuples, sorting the keys once rather than per entry"""
+        index = cls()
+        for entity_id, label, detail, names in entries:
+            index._keys.extend((key, entity_id) for key in index._add(entity_id, label, detail, names))
+        index._keys.sort()
+        return index
+
+    def put(self, entity_id, label, detail=None, names=()):
+        """Add or replace an entry; `names` are extra strings it can be found by"""
+        self.remove(entity_id)
+        for key in self._add(entity_id, label, detail, names):
+            insort(self._keys, (key, entity_id))
+
+    def _add(self, entity_id, label, detail, names):
+        keys, grams = set(), set()
+        for name in (label, *names):
+            if not name:
+                continue
+            text = normalize(name)
+            keys.update(text[match.start():] for match in WORD_START.finditer(text))
+            grams |= trigrams(text)
+        for gram in grams:
+            self._trigrams.setdefault(gram, set()).add(entity_id)
+        self._entries[entity_id] = (label, detail, normalize(label), keys, grams)
+        return keys
+
+    def remove(self, entity_id):
+        entry = self._entries.pop(entity_id, None)
+        if entry is None:
+            return
+        for key in entry[3]:
+            i = bisect_left(self._keys, (key, entity_id))
+            if i < len(self._keys) and self._keys[i] == (key, entity_id):
+                del self._keys[i]
+        for gram in entry[4]:
+            ids = self._trigrams[gram]
+            ids.discard(entity_id)
+            if not ids:
+                del self._trigrams[gram]
+
+    def prefix(self, query, limit):
+        """Up to `limit` (rank, id, label, detail) whose name or one of its words starts with `query`.
+
+        Names that start with the query rank before names with a later word
+        that does, then alphabetically. At most limit * 5 keys are examined,
+        so a one-letter query costs the same as a long one.
+        """
+        start = bisect_left(self._keys, (query,))
+        ranks = {}
+        for key, entity_id in self._keys[start:start + limit * 5]:
+            if not key.startswith(query):
+                break
+            if entity_id not in ranks:
+                text = self._entries[entity_id][2]
+                ranks[entity_id] = (0 if text.startswith(query) else 1, text)
+        best = heapq.nsmallest(limit, ranks.items(), key=lambda item: item[1])
+        return [(rank, entity_id, *self._entries[entity_id][:2]) for entity_id, rank in best]
+
+    def fuzzy(self, query, limit, threshold=0.5):
+        """Up to `limit` (rank, id, label, detail) sharing the most of `query`'s trigrams.
+
+        Scored by the share of the query's trigrams a name contains, so a
+        short misspelt word still finds the long name it is part of; among
+        equal scores, shorter names (closer matches) come first.
+        """
+        grams = trigrams(query)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._trigrams.get(gram, ()))
+        scored = []
+        for entity_id, count in shared.items():
+            score = count / len(grams)
+            if score >= threshold:
+                text = self._entries[entity_id][2]
+                scored.append(((-score, len(text), text), entity_id))
+        best = heapq.nsmallest(limit, scored)
+        return [(rank, entity_id, *self._entries[entity_id][:2]) for rank, entity_id in best]
+
+
+def _guild_entry(guild):
+    return guild.name, None, ()
+
+
+def _district_entry(district):
+    return district.name, district.district_number, ()
+
+
+def _user_entry(user):
+    # Players are known by their character; the username is shown alongside and matches too
+    return user.character_name or user.username, user.username, (user.username,)
+
+
+ENTRIES = {'guild': _guild_entry, 'district': _district_entry, 'user': _user_entry}
+
+
+class Autocomplete:
+    def __init__(self, sync_interval=1.0):
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._indexes = {}  # (campaign id or None for users, kind) -> PrefixIndex
+        self._synced = {}  # campaign id or None -> (settled change log sequence, monotonic time checked)
+
+    def _load_query(self, kind, campaign_id):
+        if kind == 'user':
+            return User.get_active_users().execution_options(all_campaigns=True)
+        model = CAMPAIGN_KINDS[kind]
+        return model.query.execution_options(all_campaigns=True).filter(model.campaign_id == campaign_id)
+
+    def _rebuild(self, campaign_id, kinds):
+        for kind in kinds:
+            self._indexes[(campaign_id, kind)] = PrefixIndex.build(
+                (row.id, *ENTRIES[kind](row)) for row in self._load_query(kind, campaign_id)
+            )
+
+    def _refresh(self, campaign_id, kinds, ids_by_kind):
+        """Re-read the rows the change log says were touched and update their entries"""
+        for kind in kinds:
+            ids = ids_by_kind.get(kind)
+            if not ids:
+                continue
+            index = self._indexes[(campaign_id, kind)]
+            model = User if kind == 'user' else CAMPAIGN_KINDS[kind]
+            found = {row.id: row for row in self._load_query(kind, campaign_id).filter(model.id.in_(ids))}
+            for entity_id in ids:
+                if entity_id in found:
+                    index.put(entity_id, *ENTRIES[kind](found[entity_id]))
+                else:
+                    index.remove(entity_id)
+
+    def _sync(self, campaign_id):
+        """Bring the indexes of a campaign (None: users) up to date with the change log"""
+        kinds = ['user'] if campaign_id is None else list(CAMPAIGN_KINDS)
+        synced = self._synced.get(campaign_id)
+        now = monotonic()
+        if synced is not None and now - synced[1] < self.sync_interval:
+            return
+
+        scope = ChangeLogEntry.campaign_id.is_(None) if campaign_id is None \
+            else ChangeLogEntry.campaign_id == campaign_id
+        oldest = ChangeLogEntry.oldest_sequence()
+        if synced is None or (oldest is not None and synced[0] < oldest - 1):
+            # Read the settled sequence before the rows so everything at or below it is in them
+            sequence = db.session.query(db.func.max(ChangeLogEntry.id)).filter(
+                scope, ChangeLogEntry.created_at < ChangeLogEntry.settled_before()
+            ).scalar() or 0
+            self._rebuild(campaign_id, kinds)
+        else:
+            # Entries above the settled sequence are re-read on every sync until they settle,
+            # so one that commits out of sequence order is still applied
+            changes = db.session.query(
+                ChangeLogEntry.id, ChangeLogEntry.entity_type, ChangeLogEntry.entity_id, ChangeLogEntry.created_at
+            ).filter(scope, ChangeLogEntry.id > synced[0]).all()
+            ids_by_kind = {}
+            for change in changes:
+                if change.entity_type in kinds:
+                    ids_by_kind.setdefault(change.entity_type, set()).add(change.entity_id)
+            self._refresh(campaign_id, kinds, ids_by_kind)
+            sequence = ChangeLogEntry.settled_sequence(changes, synced[0])
+        self._synced[campaign_id] = (sequence, now)
+
+    def search(self, query, campaign_id, kinds=KINDS, limit=10, user_filter=None):
+        """Matches for `query` as dicts, prefix matches first and fuzzy ones only if there are none.
+
+        `user_filter`, if given, takes a list of user ids and returns the ones
+        the caller may see; it runs on a few times `limit` candidates.
+        """
+        text = normalize(query)
+        if not text:
+            return []
+        with self._lock:
+            if any(kind in CAMPAIGN_KINDS for kind in kinds):
+                self._sync(campaign_id)
+            if 'user' in kinds:
+                self._sync(None)
+
+            for mode in ('prefix', 'fuzzy'):
+                matches = []
+                for kind in kinds:
+                    index = self._indexes[(None if kind == 'user' else campaign_id, kind)]
+                    lookup = index.prefix if mode == 'prefix' else index.fuzzy
+                    if kind == 'user' and user_filter is not None:
+                        found = lookup(text, limit * 5)
+                        allowed = set(user_filter([match[1] for match in found]))
+                        found = [match for match in found if match[1] in allowed][:limit]
+                    else:
+                        found = lookup(text, limit)
+                    matches.extend((rank, kind, entity_id, label, detail) for rank, entity_id, label, detail in found)
+                if matches:
+                    break
+        matches.sort(key=lambda match: match[0])
+        return [{'type': kind, 'id': entity_id, 'label': label, 'detail': detail, 'match': mode}
+                for _, kind, entity_id, label, detail in matches[:limit]]
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+            self._synced.clear()
+
+
+def autocomplete():
+    return current_app.extensions['autocomplete']
+
+
+def init_app(app):
+    app.config.setdefault('AUTOCOMPLETE_SYNC_INTERVAL', 1.0)
+    app.config.setdefault('AUTOCOMPLETE_MAX_RESULTS', 25)
+    app.extensions['autocomplete'] = Autocomplete(app.config['AUTOCOMPLETE_SYNC_INTERVAL'])
@@ -0,0 +1,262 @@
+"""
+Transactional batch writes for the /api/batch endpoint.
+
+Operations run in order inside one transaction with autoflush disabled.
+The session is flushed once before commit; the only earlier flushes happen
+when an operation references a row created earlier in the same batch and
+needs its database id. A reference is "$name" in an id field (`id` and
+REF_FIELDS) or {"$ref": "name"} in any field; other strings, including
+ones that start with "$", are stored as given.
+"""
+
+from flask_login import current_user
+from app import db
+from app.models import District, Guild, GuildRelationship, PlayerNote
+from app.note_drafts import note_drafts
+from app.tenancy import current_campaign_id
+
+MAX_OPERATIONS = 200
+
+TARGET_TYPES = ['district', 'guild', 'guild_relationship', 'note']
+
+DISTRICT_FIELDS = ['name', 'info', 'status', 'color', 'district_number', 'svg_path', 'label_x', 'label_y']
+GUILD_FIELDS = ['name', 'description', 'leadership', 'status', 'influence', 'headquarters_district_id']
+RELATIONSHIP_TYPES = ['positive', 'negative']
+NOTE_TARGET_TYPES = ['district', 'guild']
+# Fields whose "$name" strings refer to rows created earlier in the batch
+REF_FIELDS = ['guild_1_id', 'guild_2_id', 'headquarters_district_id', 'target_id']
+
+
+class BatchError(Exception):
+    """An operation failed; the whole batch is rolled back"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class BatchRunner:
+    def __init__(self, operations):
+        self.operations = operations
+        self.refs = {}  # ref name -> object created earlier in this batch
+        self.guild_names = set()  # names claimed by guilds created/renamed in this batch
+        self.relationship_pairs = set()  # guild pairs related in this batch
+
+    def run(self):
+        """Apply every operation, flush once, and return per-operation results.
+
+        Raises BatchError (with the failing index set) if any operation fails;
+        the caller is responsible for rolling back.
+        """
+        applied = []
+        with db.session.no_autoflush:
+            for index, operation in enumerate(self.operations):
+                try:
+                    applied.append(self.apply(operation))
+                except BatchError as e:
+                    e.index = index
+                    raise
+
+        db.session.flush()
+        return [self.result(op, obj) for op, obj in applied]
+
+    def apply(self, operation):
+        if not isinstance(operation, dict):
+            raise BatchError('Each operation must be an object')
+
+        op = operation.get('op')
+        target = operation.get('type')
+        handler = getattr(self, f'{op}_{target}', None) if target in TARGET_TYPES else None
+        if op not in ['create', 'update', 'delete'] or handler is None:
+            raise BatchError(f'Unsupported operation: {op} {target}')
+
+        data = operation.get('data') or {}
+        if not isinstance(data, dict):
+            raise BatchError('Operation data must be an object')
+        data = {field: self.resolve(value, field in REF_FIELDS) for field, value in data.items()}
+        if op == 'create':
+            obj = handler(data)
+            if operation.get('ref'):
+                self.refs[operation['ref']] = obj
+        else:
+            obj = handler(self.resolve(operation.get('id'), True), data)
+        return operation, obj
+
+    def resolve(self, value, id_field=False):
+        """Replace a reference with the id of the row created under that ref name"""
+        if isinstance(value, dict) and list(value) == ['$ref']:
+            name = value['$ref']
+        elif id_field and isinstance(value, str) and value.startswith('$'):
+            name = value[1:]
+        else:
+            return value
+        obj = self.refs.get(name) if isinstance(name, str) else None
+        if obj is None:
+            raise BatchError(f'Unknown reference {name!r}')
+        if obj.id is None:
+            db.session.flush()  # Only flush when a later operation needs the generated id
+        return obj.id
+
+    def result(self, operation, obj):
+        result = {'op': operation['op'], 'type': operation['type'], 'status': 'ok'}
+        if obj is not None:
+            result['id'] = obj.id
+        if operation.get('ref'):
+            result['ref'] = operation['ref']
+        return result
+
+    def get(self, model, object_id, label):
+        obj = db.session.get(model, object_id) if object_id is not None else None
+        if obj is None:
+            raise BatchError(f'{label} {object_id} not found', 404)
+        return obj
+
+    def require_editor(self, what):
+        if not current_user.can_edit_districts():
+            raise BatchError(f'Permission denied. Only DMs and Admins can edit {what}.', 403)
+
+    # Districts
+
+    def update_district(self, district_id, data):
+        self.require_editor('districts')
+        district = self.get(District, district_id, 'District')
+        for field in DISTRICT_FIELDS:
+            if field in data:
+                setattr(district, field, data[field])
+        return district
+
+    # Guilds
+
+    def claim_guild_name(self, name, guild=None):
+        if name is not None and not isinstance(name, str):
+            raise BatchError('Guild name must be a string')
+        name = (name or '').strip()
+        if not name:
+            raise BatchError('Guild name is required')
+        existing = Guild.query.filter_by(name=name).first()
+        if name in self.guild_names or (existing and existing is not guild):
+            raise BatchError('A guild with this name already exists')
+        self.guild_names.add(name)
+        return name
+
+    def create_guild(self, data):
+        self.require_editor('guilds')
+        guild = Guild(
+            name=self.claim_guild_name(data.get('name')),
+            description=data.get('description', ''),
+            leadership=data.get('leadership', ''),
+            status=data.get('status', 'Active'),
+            influence=data.get('influence', 'Medium'),
+            headquarters_district_id=data.get('headquarters_district_id')
+        )
+        db.session.add(guild)
+        return guild
+
+    def update_guild(self, guild_id, data):
+        self.require_editor('guilds')
+        guild = self.get(Guild, guild_id, 'Guild')
+        if 'name' in data and data['name'] != guild.name:
+            data = dict(data, name=self.claim_guild_name(data['name'], guild))
+        for field in GUILD_FIELDS:
+            if field in data:
+                setattr(guild, field, data[field])
+        return guild
+
+    def delete_guild(self, guild_id, data):
+        if current_user.role != 'admin':
+            raise BatchError('Permission denied. Only Admins can delete guilds.', 403)
+        guild = self.get(Guild, guild_id, 'Guild')
+        for rel in GuildRelationship.get_guild_relationships(guild.id):
+            db.session.delete(rel)
+        db.session.delete(guild)
+        return None
+
+    # Guild relationships
+
+    def create_guild_relationship(self, data):
+        self.require_editor('guild relationships')
+        guild_1_id = data.get('guild_1_id')
+        guild_2_id = data.get('guild_2_id')
+        relationship_type = data.get('relationship_type')
+
+        if not all([guild_1_id, guild_2_id, relationship_type]):
+            raise BatchError('Guild IDs and relationship type are required')
+        if relationship_type not in RELATIONSHIP_TYPES:
+            raise BatchError('Relationship type must be "positive" or "negative"')
+        if guild_1_id == guild_2_id:
+            raise BatchError('A guild cannot have a relationship with itself')
+
+        pair = frozenset([guild_1_id, guild_2_id])
+        if pair in self.relationship_pairs or GuildRelationship.get_relationship_between(guild_1_id, guild_2_id):
+            raise BatchError('A relationship between these guilds already exists')
+        self.get(Guild, guild_1_id, 'Guild')
+        self.get(Guild, guild_2_id, 'Guild')
+        self.relationship_pairs.add(pair)
+
+        relationship = GuildRelationship(
+            guild_1_id=guild_1_id,
+            guild_2_id=guild_2_id,
+            relationship_type=relationship_type,
+            description=data.get('description', '')
+        )
+        db.session.add(relationship)
+        return relationship
+
+    def update_guild_relationship(self, relationship_id, data):
+        self.require_editor('guild relationships')
+        relationship = self.get(GuildRelationship, relationship_id, 'Guild relationship')
+        if 'relationship_type' in data:
+            if data['relationship_type'] not in RELATIONSHIP_TYPES:
+                raise BatchError('Relationship type must be "positive" or "negative"')
+            relationship.relationship_type = data['relationship_type']
+        if 'description' in data:
+            relationship.description = data['description']
+        return relationship
+
+    def delete_guild_relationship(self, relationship_id, data):
+        self.require_editor('guild relationships')
+        db.session.delete(self.get(GuildRelationship, relationship_id, 'Guild relationship'))
+        return None
+
+    # Player notes
+
+    def note_content(self, data):
+        content = data.get('content')
+        if content is not None and not isinstance(content, str):
+            raise BatchError('Content must be a string')
+        content = (content or '').strip()
+        if not content:
+            raise BatchError('Content is required')
+        return content
+
+    def owned_note(self, note_id):
+        note = self.get(PlayerNote, note_id, 'Note')
+        if note.user_id != current_user.id and current_user.role != 'admin':
+            raise BatchError('Permission denied', 403)
+        return note
+
+    def create_note(self, data):
+        target_type = data.get('target_type')
+        target_id = data.get('target_id')
+        if target_type not in NOTE_TARGET_TYPES:
+            raise BatchError('Invalid target type')
+        if not target_id:
+            raise BatchError('Target ID is required')
+        content = self.note_content(data)
+
+        # Same semantics as POST /api/notes: one note per user and target
+        note, _ = PlayerNote.upsert(current_campaign_id(), current_user.id, target_type, target_id, content)
+        return note
+
+    def update_note(self, note_id, data):
+        note = self.owned_note(note_id)
+        note.content = self.note_content(data)
+        return note
+
+    def delete_note(self, note_id, data):
+        note = self.owned_note(note_id)
+        # Keep an autosave that has not been flushed yet from bringing the note back
+        note_drafts().discard(note.campaign_id, note.user_id, note.target_type, note.target_id)
+        db.session.delete(note)
+        return None
@@ -0,0 +1,337 @@
+"""
+Background jobs: a queue in the `job` table worked by scripts/run_jobs.py.
+
+Web workers only enqueue. A runner process polls for due jobs, claims one
+with a conditional UPDATE (so several runners can share the table without
+a broker) and hands it to a thread pool, or to a process pool for
+CPU-bound tasks that would otherwise hold the GIL. Each task declares its
+executor, how many attempts it gets and how many copies may run at once
+across all runners:
+
+    @task('export_campaign', executor='process', concurrency=1, campaign_scoped=True)
+    def export_campaign(ctx, ...):
+        ctx.progress(0.5, 'Halfway')
+
+Failed attempts are retried with exponential backoff. Running jobs are
+heartbeated every poll; a job whose runner stops heartbeating for
+JOB_STALE_SECONDS is treated as a failed attempt and requeued.
+
+Passwords and other sensitive input go in `secrets`, not `args`: they are
+handed to the task with its args but never shown in job listings. A task
+may return sensitive output under a 'secrets' key; it is kept out of
+`result` and revealed once by the job status endpoint. Either kind is
+dropped after JOB_SECRETS_TTL seconds.
+"""
+
+import logging
+import os
+import signal
+import socket
+import traceback
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+from time import sleep
+
+from sqlalchemy import update
+
+from app import db
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+@dataclass
+class TaskSpec:
+    name: str
+    func: object
+    executor: str = 'thread'  # 'thread' for I/O-bound work, 'process' for CPU-bound work
+    max_attempts: int = 3
+    concurrency: int = 0  # Running copies allowed across all runners; 0 means no limit
+    campaign_scoped: bool = False  # Runs inside campaign_scope() of the campaign it was enqueued for
+
+
+def task(name, executor='thread', max_attempts=3, concurrency=0, campaign_scoped=False):
+    """Register a function as a job task; it is called as func(ctx, **args)"""
+    if executor not in ('thread', 'process'):
+        raise ValueError(f'Unknown executor {executor!r}')
+
+    def register(func):
+        TASKS[name] = TaskSpec(name, func, executor, max_attempts, concurrency, campaign_scoped)
+        return func
+    return register
+
+
+def load_tasks():
+    """Import the built-in tasks so they register themselves"""
+    import app.tasks  # noqa: F401
+    return TASKS
+
+
+def enqueue(name, args=None, campaign_id=None, created_by=None, priority=0, secrets=None):
+    """Add a job to the queue; the caller commits"""
+    spec = load_tasks().get(name)
+    if spec is None:
+        raise ValueError(f'Unknown task {name!r}')
+    if spec.campaign_scoped and campaign_id is None:
+        raise ValueError(f'Task {name!r} must be enqueued for a campaign')
+
+    job = Job(name=name, args=args or {}, secrets=secrets or None, campaign_id=campaign_id if spec.campaign_scoped else None,
+              created_by=created_by, priority=priority, max_attempts=spec.max_attempts)
+    db.session.add(job)
+    return job
+
+
+class JobFailed(Exception):
+    """A task raised; carries the formatted traceback across the process boundary"""
+
+
+class JobContext:
+    """Handed to every task as its first argument"""
+
+    def __init__(self, job_id, attempt):
+        self.job_id = job_id
+        self.attempt = attempt
+
+    def progress(self, fraction, message=None):
+        """Report progress (0.0 - 1.0); written on its own connection so the task's transaction is untouched"""
+        with db.engine.begin() as connection:
+            connection.execute(update(Job).where(Job.id == self.job_id).values(
+                progress=max(0.0, min(float(fraction), 1.0)),
+                progress_message=message[:255] if message else None,
+                heartbeat_at=datetime.utcnow()
+            ))
+
+
+def execute(job_id, name, args, campaign_id, attempt):
+    """Run one job in the current thread or pool process; requires an app context"""
+    from app.tenancy import campaign_scope
+
+    spec = load_tasks()[name]
+    try:
+        ctx = JobContext(job_id, attempt)
+        if campaign_id is not None:
+            with campaign_scope(campaign_id):
+                return spec.func(ctx, **args)
+        return spec.func(ctx, **args)
+    except Exception:
+        db.session.rollback()
+        raise JobFailed(traceback.format_exc())
+    finally:
+        db.session.remove()
+
+
+def _execute_in_thread(app, *job):
+    with app.app_context():
+        return execute(*job)
+
+
+_process_app = None
+
+
+def _init_process(config):
+    """Pool process initializer: build an app of our own from the runner's settings"""
+    global _process_app
+    from app import create_app
+    from config.config import Config
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The runner decides when pool processes stop
+    _process_app = create_app(type('JobProcessConfig', (Config,), config))
+    load_tasks()
+
+
+def _execute_in_process(*job):
+    with _process_app.app_context():
+        return execute(*job)
+
+
+def _picklable_config(app):
+    return {key: value for key, value in app.config.items()
+            if key.isupper() and isinstance(value, (str, int, float, bool, type(None), list, tuple, dict))}
+
+
+class JobRunner:
+    def __init__(self, app):
+        self.app = app
+        self.poll_interval = app.config['JOB_POLL_INTERVAL']
+        self.stale_after = timedelta(seconds=app.config['JOB_STALE_SECONDS'])
+        self.retry_backoff = app.config['JOB_RETRY_BACKOFF']
+        self.secrets_ttl = timedelta(seconds=app.config['JOB_SECRETS_TTL'])
+        self.capacity = {'thread': app.config['JOB_THREAD_WORKERS'], 'process': app.config['JOB_PROCESS_WORKERS']}
+        self.runner_id = f'{socket.gethostname()}:{os.getpid()}'[:100]
+        self.executors = {}
+        self.running = {}  # job id -> (executor kind, future)
+        self.stopping = False
+
+    def _executor(self, kind):
+        if kind not in self.executors:
+            if kind == 'thread':
+                self.executors[kind] = ThreadPoolExecutor(self.capacity['thread'], thread_name_prefix='job')
+            else:
+                # Spawned rather than forked: the runner holds open connections and threads
+                self.executors[kind] = ProcessPoolExecutor(
+                    self.capacity['process'], mp_context=get_context('spawn'),
+                    initializer=_init_process, initargs=(_picklable_config(self.app),)
+                )
+        return self.executors[kind]
+
+    def run(self, once=False):
+        """Poll until stopped (SIGTERM/SIGINT), or until nothing is due or running when `once` is set"""
+        load_tasks()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logger.info('Job runner %s started', self.runner_id)
+        with self.app.app_context():
+            try:
+                while not self.stopping:
+                    started = self.poll()
+                    if once and not started and not self.running:
+                        break
+                    sleep(self.poll_interval)
+                # Let claimed jobs finish instead of leaving them to the stale-job sweep
+                while self.running:
+                    self._collect()
+                    sleep(self.poll_interval)
+            finally:
+                for executor in self.executors.values():
+                    executor.shutdown(wait=True)
+                db.session.remove()
+
+    def stop(self, *_):
+        self.stopping = True
+
+    def poll(self):
+        """One scheduling round; returns the number of jobs started"""
+        self._collect()
+        self._heartbeat()
+        self._requeue_stale()
+        self._expire_secrets()
+        started = self._start_due()
+        db.session.remove()
+        return started
+
+    def _start_due(self):
+        started = 0
+        now = datetime.utcnow()
+        for job in Job.get_due(now):
+            spec = TASKS.get(job.name)
+            if spec is None:
+                self._finish(job.id, error=f'Unknown task {job.name!r}', retry=False)
+                continue
+
+            in_use = sum(1 for kind, _ in self.running.values() if kind == spec.executor)
+            if in_use >= self.capacity[spec.executor]:
+                continue
+            if spec.concurrency and Job.count_running(spec.name) >= spec.concurrency:
+                continue
+
+            # Only one runner wins the claim; the rest see rowcount 0 and move on
+            claimed = db.session.execute(update(Job).where(Job.id == job.id, Job.status == 'queued').values(
+                status='running', attempts=Job.attempts + 1, locked_by=self.runner_id,
+                started_at=now, heartbeat_at=now, progress=0.0, progress_message=None
+            )).rowcount
+            db.session.commit()
+            if not claimed:
+                continue
+
+            args = (job.id, job.name, {**(job.args or {}), **(job.secrets or {})}, job.campaign_id, job.attempts + 1)
+            try:
+                if spec.executor == 'process':
+                    future = self._executor('process').submit(_execute_in_process, *args)
+                else:
+                    future = self._executor('thread').submit(_execute_in_thread, self.app, *args)
+            except BrokenProcessPool:
+                self._discard_pool('process')
+                self._finish(job.id, error=traceback.format_exc())
+                continue
+            self.running[job.id] = (spec.executor, future)
+            started += 1
+        return started
+
+    def _discard_pool(self, kind):
+        # A pool process died (OOM kill, segfault); start a fresh pool for the next job
+        executor = self.executors.pop(kind, None)
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _collect(self):
+        for job_id, (kind, future) in list(self.running.items()):
+            if not future.done():
+                continue
+            del self.running[job_id]
+            try:
+                result = future.result()
+            except JobFailed as e:
+                self._finish(job_id, error=str(e))
+            except BrokenProcessPool:
+                self._discard_pool(kind)
+                self._finish(job_id, error=traceback.format_exc())
+            else:
+                self._finish(job_id, result=result)
+
+    def _finish(self, job_id, result=None, error=None, retry=True):
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return
+        now = datetime.utcnow()
+        if error is None:
+            job.status = 'succeeded'
+            job.secrets = result.pop('secrets', None) if isinstance(result, dict) else None
+            job.result = result
+            job.error = None
+            job.progress = 1.0
+            job.finished_at = now
+        elif retry and job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.error = error
+            job.run_after = now + timedelta(seconds=self.retry_backoff * 2 ** (job.attempts - 1))
+            logger.warning('Job %s (%s) failed attempt %s; retrying', job.id, job.name, job.attempts)
+        else:
+            job.status = 'failed'
+            job.error = error
+            job.finished_at = now
+            logger.error('Job %s (%s) failed for good:\n%s', job.id, job.name, error)
+        job.locked_by = None
+        db.session.commit()
+
+    def _heartbeat(self):
+        if self.running:
+            db.session.execute(update(Job).where(Job.id.in_(list(self.running))).values(
+                heartbeat_at=datetime.utcnow()
+            ))
+            db.session.commit()
+
+    def _requeue_stale(self):
+        cutoff = datetime.utcnow() - self.stale_after
+        stale = Job.query.filter(Job.status == 'running', Job.heartbeat_at < cutoff).all()
+        for job in stale:
+            if job.id not in self.running:
+                self._finish(job.id, error=f'Runner {job.locked_by} stopped responding')
+
+    def _expire_secrets(self):
+        # Jobs left waiting that long fail rather than run without their secrets; finished ones
+        # just lose them (a failed job keeps its secrets until then so it can be retried)
+        cutoff = datetime.utcnow() - self.secrets_ttl
+        db.session.execute(update(Job).where(
+            Job.status == 'queued', Job.secrets.isnot(None), Job.run_after < cutoff
+        ).values(status='failed', secrets=None, error='Secrets expired before the job ran',
+                 finished_at=datetime.utcnow()))
+        db.session.execute(update(Job).where(
+            Job.status.in_(['succeeded', 'failed']), Job.secrets.isnot(None), Job.finished_at < cutoff
+        ).values(secrets=None))
+        db.session.commit()
+
+
+def init_app(app):
+    app.config.setdefault('JOB_THREAD_WORKERS', 4)
+    app.config.setdefault('JOB_PROCESS_WORKERS', 2)
+    app.config.setdefault('JOB_POLL_INTERVAL', 1.0)
+    app.config.setdefault('JOB_STALE_SECONDS', 300)
+    app.config.setdefault('JOB_RETRY_BACKOFF', 10)
+    app.config.setdefault('JOB_SECRETS_TTL', 3600)
+    app.config.setdefault('JOB_EXPORT_DIR', os.path.join(app.instance_path, 'exports'))
+    app.config.setdefault('USER_ARCHIVE_AFTER_DAYS', 30)
\ No newline at end of file
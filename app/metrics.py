@@ -0,0 +1,311 @@
+"""
+Request, rate-limit and connection-pool metrics in Prometheus text format.
+
+Each worker process keeps its counters and histograms in memory and writes
+them to a JSON file in METRICS_DIR at most every METRICS_FLUSH_INTERVAL
+seconds. The /admin/metrics endpoint merges every worker's file, so the
+scrape reflects all gunicorn workers on the host, not just the one that
+happened to serve it.
+
+A worker writes its file once more when it exits. The next worker to start
+folds the counters and histograms of exited workers into ARCHIVE_FILE
+before deleting their files, so host-wide totals never go backwards when
+gunicorn recycles a worker (which Prometheus would read as a reset).
+"""
+
+import atexit
+import json
+import os
+import threading
+from collections import defaultdict
+from time import perf_counter, time
+
+from flask import g, request, got_request_exception
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app import db
+
+try:
+    import fcntl
+except ImportError:  # Windows: the dev server runs a single process, so there is nothing to race
+    fcntl = None
+
+ARCHIVE_FILE = 'metrics-archived.json'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# name -> (type, help text, histogram buckets)
+METRICS = {
+    'aethermere_requests_total': ('counter', 'HTTP requests by endpoint, method and status', None),
+    'aethermere_request_duration_seconds': ('histogram', 'Request latency by endpoint', LATENCY_BUCKETS),
+    'aethermere_request_errors_total': ('counter', 'Requests that raised or returned a 5xx', None),
+    'aethermere_rate_limited_total': ('counter', 'Requests rejected by the rate limiter (429)', None),
+    'aethermere_db_pool_checkouts_total': ('counter', 'Connections checked out of the pool', None),
+    'aethermere_db_pool_connects_total': ('counter', 'New DBAPI connections opened by the pool', None),
+    'aethermere_db_pool_timeouts_total': ('counter', 'Requests that timed out waiting for a pooled connection', None),
+    'aethermere_db_pool_wait_seconds': ('histogram', 'Time spent waiting to check out a connection', POOL_WAIT_BUCKETS),
+    'aethermere_db_pool_size': ('gauge', 'Configured pool size (live workers)', None),
+    'aethermere_db_pool_checked_out': ('gauge', 'Connections currently checked out (live workers)', None),
+    'aethermere_db_pool_overflow': ('gauge', 'Connections open beyond pool_size (live workers)', None),
+}
+
+
+class MetricsRegistry:
+    def __init__(self, directory, flush_interval):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+        self.engines = []
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._last_flush = 0.0
+
+    def inc(self, name, labels=(), amount=1):
+        with self._lock:
+            self._counters[(name, labels)] += amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        with self._lock:
+            hist = self._histograms.get((name, labels))
+            if hist is None:
+                hist = self._histograms[(name, labels)] = [0] * len(buckets) + [0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    hist[i] += 1
+                    break
+            hist[-2] += value
+            hist[-1] += 1
+
+    def pool_gauges(self):
+        gauges = defaultdict(float)
+        for engine in self.engines:
+            pool = engine.pool
+            # Only QueuePool-style pools expose these; SQLite memory pools do not
+            for name, method in [('aethermere_db_pool_size', 'size'),
+                                 ('aethermere_db_pool_checked_out', 'checkedout'),
+                                 ('aethermere_db_pool_overflow', 'overflow')]:
+                if hasattr(pool, method):
+                    gauges[name] += max(getattr(pool, method)(), 0)
+        return [[name, [], value] for name, value in gauges.items()]
+
+    def snapshot(self):
+        with self._lock:
+            counters = [[name, list(labels), value] for (name, labels), value in self._counters.items()]
+            histograms = [[name, list(labels), list(hist)] for (name, labels), hist in self._histograms.items()]
+        return {'pid': os.getpid(), 'counters': counters, 'histograms': histograms,
+                'gauges': self.pool_gauges()}
+
+    def flush(self, force=False):
+        """Write this worker's metrics to its file (throttled unless forced)"""
+        now = time()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, self.path)
+
+    def remove_dead_workers(self):
+        """Fold the counters of worker processes that no longer exist into the archive, then delete their files"""
+        claimed = []
+        for filename in os.listdir(self.directory):
+            pid = _file_pid(filename)
+            if pid and pid != os.getpid() and not _pid_alive(pid):
+                path = os.path.join(self.directory, f'{filename}.{os.getpid()}.folding')
+                try:
+                    os.rename(os.path.join(self.directory, filename), path)  # Only one starting worker wins
+                except OSError:
+                    continue
+                claimed.append(path)
+        if not claimed:
+            return
+
+        with open(os.path.join(self.directory, ARCHIVE_FILE + '.lock'), 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            archive_path = os.path.join(self.directory, ARCHIVE_FILE)
+            counters, histograms = _read_totals([archive_path] + claimed)
+            tmp_path = f'{archive_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+                           'histograms': [[name, list(labels), hist] for (name, labels), hist in histograms.items()]},
+                          f)
+            os.replace(tmp_path, archive_path)
+        for path in claimed:
+            os.remove(path)
+
+    def collect(self):
+        """Merge every worker's metrics, and those archived from exited workers, into one snapshot"""
+        self.flush(force=True)
+        paths = [os.path.join(self.directory, filename) for filename in os.listdir(self.directory)
+                 if _file_pid(filename) or filename == ARCHIVE_FILE]
+        counters, histograms = _read_totals(paths)
+
+        # Gauges describe live state, so ignore workers that have exited
+        gauges = defaultdict(float)
+        for path in paths:
+            pid = _file_pid(os.path.basename(path))
+            if pid and (pid == os.getpid() or _pid_alive(pid)):
+                for name, labels, value in _read_metrics(path).get('gauges', []):
+                    gauges[(name, tuple(map(tuple, labels)))] += value
+
+        return counters, histograms, gauges
+
+    def render(self):
+        """Render all workers' metrics in Prometheus text exposition format"""
+        counters, histograms, gauges = self.collect()
+        series = defaultdict(list)  # name -> [(labels, [sample lines])]
+
+        for (name, labels), value in list(counters.items()) + list(gauges.items()):
+            series[name].append((labels, [f'{name}{_format_labels(labels)} {_format_value(value)}']))
+        for (name, labels), hist in histograms.items():
+            buckets = METRICS[name][2]
+            lines = []
+            cumulative = 0
+            for bound, count in zip(buckets, hist):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", repr(bound)),))} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {hist[-1]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(hist[-2])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {hist[-1]}')
+            series[name].append((labels, lines))
+
+        lines = []
+        for name, (metric_type, help_text, _) in METRICS.items():
+            if series.get(name):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                # Order series by labels but keep each histogram's buckets in ascending order
+                for _, sample_lines in sorted(series[name], key=lambda item: item[0]):
+                    lines.extend(sample_lines)
+        return '\n'.join(lines) + '\n'
+
+
+def _read_metrics(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}  # Being rewritten or removed; it will be picked up next scrape
+
+
+def _read_totals(paths):
+    """Summed counters and histograms of metrics files"""
+    counters = defaultdict(float)
+    histograms = {}
+    for path in paths:
+        data = _read_metrics(path)
+        for name, labels, value in data.get('counters', []):
+            counters[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, hist in data.get('histograms', []):
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [0] * len(hist))
+            for i, value in enumerate(hist):
+                merged[i] += value
+    return counters, histograms
+
+
+def _file_pid(filename):
+    if filename.startswith('metrics-') and filename.endswith('.json'):
+        try:
+            return int(filename[len('metrics-'):-len('.json')])
+        except ValueError:
+            return None
+    return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _instrument_engine(registry, engine):
+    registry.engines.append(engine)
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        registry.inc('aethermere_db_pool_checkouts_total')
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        registry.inc('aethermere_db_pool_connects_total')
+
+    # Pool events fire only after a connection is handed out, so time the
+    # checkout itself to see how long requests queue for a connection.
+    pool = engine.pool
+    checkout = pool.connect
+
+    def timed_connect():
+        started = perf_counter()
+        try:
+            return checkout()
+        finally:
+            registry.observe('aethermere_db_pool_wait_seconds', (), perf_counter() - started)
+
+    pool.connect = timed_connect
+
+
+def init_app(app):
+    """Start collecting metrics for every request served by this app"""
+    directory = app.config.get('METRICS_DIR')
+    os.makedirs(directory, exist_ok=True)
+    registry = MetricsRegistry(directory, app.config.get('METRICS_FLUSH_INTERVAL', 5))
+    registry.remove_dead_workers()
+    app.extensions['metrics'] = registry
+    atexit.register(registry.flush, True)  # Up to METRICS_FLUSH_INTERVAL of counts would otherwise go with us
+
+    with app.app_context():
+        for engine in db.engines.values():
+            _instrument_engine(registry, engine)
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('metrics_start', None)
+        if started is None:
+            return response
+
+        endpoint = request.endpoint or 'unmatched'
+        blueprint = request.blueprint or ''
+        labels = (('blueprint', blueprint), ('endpoint', endpoint))
+
+        registry.observe('aethermere_request_duration_seconds', labels, perf_counter() - started)
+        registry.inc('aethermere_requests_total',
+                     labels + (('method', request.method), ('status', str(response.status_code))))
+        if response.status_code == 429:
+            registry.inc('aethermere_rate_limited_total', labels)
+        elif response.status_code >= 500:
+            registry.inc('aethermere_request_errors_total', labels)
+
+        registry.flush()
+        return response
+
+    def record_exception(sender, exception, **extra):
+        if isinstance(exception, PoolTimeoutError):
+            registry.inc('aethermere_db_pool_timeouts_total')
+
+    got_request_exception.connect(record_exception, app, weak=False)
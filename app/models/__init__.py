@@ -1,5 +1,12 @@
+from app.models.campaign import Campaign, CampaignMembership
 from app.models.district import District
 from app.models.user import User
 from app.models.player_note import PlayerNote
+from app.models.player_note_revision import PlayerNoteRevision
 from app.models.guild import Guild, GuildRelationship
-from app.models.character_quick_ref import CharacterQuickRef
\ No newline at end of file
+from app.models.character_quick_ref import CharacterQuickRef
+from app.models.district_stats import DistrictStats
+from app.models.change_log import ChangeLogEntry
+from app.models.slow_query import SlowQuery
+from app.models.job import Job
+from app.models.user_archive import UserArchive
\ No newline at end of file
@@ -0,0 +1,92 @@
+from app import db
+from datetime import datetime
+from sqlalchemy.orm import declared_attr
+
+DEFAULT_CAMPAIGN_NAME = 'Aethermere'
+
+
+class Campaign(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Campaign {self.name}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    @classmethod
+    def get_default(cls):
+        """The oldest campaign, created on first use; rows written outside a request land here"""
+        campaign = cls.query.order_by(cls.id).first()
+        if campaign is None:
+            campaign = cls(name=DEFAULT_CAMPAIGN_NAME)
+            db.session.add(campaign)
+        return campaign
+
+    @classmethod
+    def get_user_campaigns(cls, user):
+        """Campaigns a user can switch to (every campaign for admins)"""
+        query = cls.query
+        if user.role != 'admin':
+            query = query.join(CampaignMembership).filter(CampaignMembership.user_id == user.id)
+        return query.order_by(cls.name, cls.id)
+
+    @classmethod
+    def resolve_for(cls, user, requested_id=None):
+        """The campaign a request from `user` runs in: the requested one if allowed, else their first"""
+        if requested_id is not None:
+            if user.role == 'admin':
+                if db.session.get(cls, requested_id) is not None:
+                    return requested_id
+            elif CampaignMembership.is_member(requested_id, user.id):
+                return requested_id
+
+        campaign = cls.get_user_campaigns(user).with_entities(cls.id).order_by(None).order_by(cls.id).first()
+        return campaign.id if campaign else None
+
+
+class CampaignMembership(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaign.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    campaign = db.relationship('Campaign', backref=db.backref('memberships', lazy=True, cascade='all, delete-orphan'))
+    user = db.relationship('User', backref=db.backref('memberships', lazy=True, cascade='all, delete-orphan'))
+
+    __table_args__ = (
+        db.UniqueConstraint('campaign_id', 'user_id', name='uq_campaign_membership'),
+        db.Index('ix_campaign_membership_user_id', 'user_id'),
+    )
+
+    def __repr__(self):
+        return f'<CampaignMembership campaign={self.campaign_id} user={self.user_id}>'
+
+    @classmethod
+    def is_member(cls, campaign_id, user_id):
+        """Check whether a user belongs to a campaign"""
+        return db.session.query(
+            cls.query.filter_by(campaign_id=campaign_id, user_id=user_id).exists()
+        ).scalar()
+
+
+class CampaignScoped:
+    """Mixin for rows that belong to one campaign.
+
+    Queries for these models are limited to the request's campaign and new rows
+    are assigned to it automatically (see app/tenancy.py).
+    """
+
+    @declared_attr
+    def campaign_id(cls):
+        return db.Column(db.Integer, db.ForeignKey('campaign.id'), nullable=False)
+
+    @declared_attr
+    def campaign(cls):
+        return db.relationship('Campaign')
\ No newline at end of file
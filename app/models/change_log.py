@@ -0,0 +1,219 @@
+from app import db
+from datetime import datetime, date, timedelta
+from sqlalchemy import event, inspect
+import json
+import math
+
+# Models that are mirrored into the change log, keyed by class name so this
+# module does not need to import them. Values are the entity_type exposed to clients.
+TRACKED_MODELS = {
+    'District': 'district',
+    'Guild': 'guild',
+    'GuildRelationship': 'guild_relationship',
+    'PlayerNote': 'note',
+    'User': 'user',
+    'CharacterQuickRef': 'quick_ref',
+}
+
+# Columns that must never leave the server through the change feed
+EXCLUDED_FIELDS = {'password_hash', 'email'}
+
+# Sequences are assigned when a transaction flushes but become visible when it
+# commits, so with concurrent writers (Postgres) an entry can show up below a
+# sequence a reader has already passed. Assuming no transaction stays open
+# longer than this after writing its entries, every entry below one created
+# that long ago is committed: the entry is "settled", and only settled
+# sequences are safe to use as a sync cursor.
+DEFAULT_SETTLE_SECONDS = 10
+
+
+class ChangeLogEntry(db.Model):
+    __tablename__ = 'change_log'
+
+    id = db.Column(db.Integer, primary_key=True)  # Doubles as the sync sequence number
+    entity_type = db.Column(db.String(30), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(10), nullable=False)  # 'create', 'update' or 'delete'
+    payload = db.Column(db.Text, nullable=True)  # JSON: full row on create, changed fields on update
+    user_id = db.Column(db.Integer, nullable=True)  # Who made the change, if known
+    campaign_id = db.Column(db.Integer, nullable=True)  # None for entities shared by all campaigns (users)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        db.Index('ix_change_log_campaign_id_id', 'campaign_id', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<ChangeLogEntry {self.id} {self.action} {self.entity_type} {self.entity_id}>'
+
+    def to_dict(self):
+        return {
+            'seq': self.id,
+            'entity_type': self.entity_type,
+            'entity_id': self.entity_id,
+            'action': self.action,
+            'data': json.loads(self.payload) if self.payload else None,
+            'at': self.created_at.isoformat()
+        }
+
+    @classmethod
+    def visible_in(cls, campaign_id):
+        """SQL condition for entries a campaign's clients see: its own plus shared (user) entries"""
+        return (cls.campaign_id == campaign_id) | cls.campaign_id.is_(None)
+
+    @classmethod
+    def latest_sequence(cls, campaign_id=None):
+        """Highest sequence number written so far (0 if the log is empty), optionally as seen by one campaign"""
+        query = db.session.query(db.func.max(cls.id))
+        if campaign_id is not None:
+            query = query.filter(cls.visible_in(campaign_id))
+        return query.scalar() or 0
+
+    @classmethod
+    def newest(cls, campaign_id=None):
+        """(sequence, created_at) of the newest entry, optionally as seen by one campaign; (0, None) if there is none"""
+        query = db.session.query(cls.id, cls.created_at)
+        if campaign_id is not None:
+            query = query.filter(cls.visible_in(campaign_id))
+        row = query.order_by(cls.id.desc()).first()
+        return tuple(row) if row else (0, None)
+
+    @classmethod
+    def settled_before(cls):
+        """Entries created before this are settled (CHANGE_LOG_SETTLE_SECONDS ago)"""
+        from flask import current_app
+        seconds = current_app.config.get('CHANGE_LOG_SETTLE_SECONDS', DEFAULT_SETTLE_SECONDS)
+        return datetime.utcnow() - timedelta(seconds=seconds)
+
+    @classmethod
+    def settled_sequence(cls, entries, since=0):
+        """Highest settled sequence among `entries` (anything with id and created_at), or `since` if none is"""
+        cutoff = cls.settled_before()
+        return max((entry.id for entry in entries if entry.created_at < cutoff), default=since)
+
+    @classmethod
+    def seconds_to_settle(cls, entries):
+        """Whole seconds until the first of `entries` settles (at least 1)"""
+        wait = (min(entry.created_at for entry in entries) - cls.settled_before()).total_seconds()
+        return max(1, math.ceil(wait))
+
+    @classmethod
+    def oldest_sequence(cls):
+        """Lowest sequence number still retained (None if the log is empty)"""
+        return db.session.query(db.func.min(cls.id)).scalar()
+
+    @classmethod
+    def readable_by(cls, user, campaign_id):
+        """SQL condition for entries `user` may read in a campaign's feed.
+
+        User entries have no campaign, so one is only sent to campaigns the user
+        is a member of. Quick refs are private to their owner and the DMs, as
+        on /auth/quick-reference.
+        """
+        from app.models import CampaignMembership, CharacterQuickRef
+
+        members = db.select(CampaignMembership.user_id).where(CampaignMembership.campaign_id == campaign_id)
+        condition = cls.visible_in(campaign_id) & ((cls.entity_type != 'user') | cls.entity_id.in_(members))
+        if user.role not in ('dm', 'admin'):
+            own_quick_refs = db.select(CharacterQuickRef.id).where(CharacterQuickRef.user_id == user.id)
+            condition &= (cls.entity_type != 'quick_ref') | cls.entity_id.in_(own_quick_refs) | (cls.user_id == user.id)
+        return condition
+
+    @classmethod
+    def get_changes_since(cls, since, limit=500, campaign_id=None, user=None):
+        """Get up to `limit` entries with a sequence greater than `since`, optionally as seen by one campaign (and user)"""
+        query = cls.query.filter(cls.id > since)
+        if campaign_id is not None:
+            query = query.filter(cls.readable_by(user, campaign_id) if user is not None else cls.visible_in(campaign_id))
+        return query.order_by(cls.id).limit(limit).all()
+
+    @classmethod
+    def compact(cls, older_than):
+        """Delete entries created before `older_than`.
+
+        The newest entry is always kept so clients can tell a compacted log
+        (their `since` falls below the oldest retained sequence) from an idle one.
+        """
+        latest = cls.latest_sequence()
+        deleted = cls.query.filter(
+            cls.created_at < older_than,
+            cls.id < latest
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+
+def _serialize_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _row_payload(obj, changed_only=False):
+    state = inspect(obj)
+    payload = {}
+    for attr in state.mapper.column_attrs:
+        if attr.key in EXCLUDED_FIELDS:
+            continue
+        if changed_only and not state.attrs[attr.key].history.has_changes():
+            continue
+        payload[attr.key] = _serialize_value(getattr(obj, attr.key))
+    return payload
+
+
+def _current_user_id():
+    # Imported lazily so scripts that run outside a request still work
+    from flask import has_request_context
+    from flask_login import current_user
+    if has_request_context() and current_user and current_user.is_authenticated:
+        return current_user.id
+    return None
+
+
+def build_change(entity_type, entity_id, action, payload=None, user_id=None, campaign_id=None):
+    """Build a change_log row for statements that bypass the ORM flush (bulk/Core writes)"""
+    return {
+        'entity_type': entity_type,
+        'entity_id': entity_id,
+        'action': action,
+        'payload': json.dumps(payload, default=_serialize_value) if payload is not None else None,
+        'user_id': user_id if user_id is not None else _current_user_id(),
+        'campaign_id': campaign_id,
+        'created_at': datetime.utcnow()
+    }
+
+
+def record_changes(connection, rows):
+    """Insert change_log rows on `connection` so they commit with the surrounding transaction"""
+    if rows:
+        connection.execute(ChangeLogEntry.__table__.insert(), rows)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _record_flushed_changes(session, flush_context):
+    """Mirror every flushed create/update/delete of a tracked model into the change log"""
+    rows = []
+    user_id = _current_user_id()
+
+    for obj in session.new:
+        entity_type = TRACKED_MODELS.get(type(obj).__name__)
+        if entity_type:
+            rows.append(build_change(entity_type, obj.id, 'create', _row_payload(obj), user_id,
+                                     getattr(obj, 'campaign_id', None)))
+
+    for obj in session.dirty:
+        entity_type = TRACKED_MODELS.get(type(obj).__name__)
+        if entity_type and session.is_modified(obj, include_collections=False):
+            payload = _row_payload(obj, changed_only=True)
+            # Skip updates that only touched private columns (e.g. password resets)
+            if payload:
+                rows.append(build_change(entity_type, obj.id, 'update', payload, user_id,
+                                         getattr(obj, 'campaign_id', None)))
+
+    for obj in session.deleted:
+        entity_type = TRACKED_MODELS.get(type(obj).__name__)
+        if entity_type:
+            rows.append(build_change(entity_type, obj.id, 'delete', None, user_id,
+                                     getattr(obj, 'campaign_id', None)))
+
+    record_changes(session.connection(), rows)
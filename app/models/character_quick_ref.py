@@ -1,63 +1,86 @@
 from app import db
 from datetime import datetime
-import json
+from sqlalchemy import func, select, literal, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from app.models.campaign import CampaignScoped
 
+# Native JSONB on PostgreSQL (GIN-indexable), JSON text with json1 functions on SQLite
+JSONColumn = db.JSON().with_variant(JSONB(), 'postgresql')
 
-class CharacterQuickRef(db.Model):
+DEFAULT_THRESHOLDS = {"minor": None, "major": None, "severe": None}
+
+
+class CharacterQuickRef(CampaignScoped, db.Model):
     __tablename__ = 'character_quick_refs'
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)  # One quick ref per user and campaign
     evasion_score = db.Column(db.Integer, nullable=True)
-    damage_thresholds = db.Column(db.Text, nullable=True)  # JSON string for minor/major/severe
-    experiences = db.Column(db.Text, nullable=True)  # JSON array of experiences
+    damage_thresholds = db.Column(JSONColumn, nullable=True)  # {"minor": n, "major": n, "severe": n}
+    experiences = db.Column(JSONColumn, nullable=True)  # List of 2-4 experience names
     class_name = db.Column(db.String(100), nullable=True)
     specialization = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    # Relationship back to user
+    # Relationship back to user; inside a request this only sees the current campaign's quick ref
     user = db.relationship('User', backref=db.backref('character_quick_ref', uselist=False, cascade='all, delete-orphan'))
 
+    __table_args__ = (
+        db.UniqueConstraint('campaign_id', 'user_id', name='uq_character_quick_refs_campaign_user'),
+        db.Index('ix_character_quick_refs_campaign_evasion', 'campaign_id', 'evasion_score'),
+        # GIN index for experience containment lookups; SQLite has no equivalent
+        db.Index('ix_character_quick_refs_experiences', 'experiences',
+                 postgresql_using='gin', postgresql_ops={'experiences': 'jsonb_path_ops'}).ddl_if(dialect='postgresql'),
+    )
+
     def __repr__(self):
         return f'<CharacterQuickRef {self.user.username}>'
 
+    # The JSON columns are decoded once when the row is loaded and kept on the
+    # instance, so these getters are plain attribute reads.
+
     def get_damage_thresholds(self):
-        """Parse damage thresholds from JSON string"""
-        if self.damage_thresholds:
-            try:
-                return json.loads(self.damage_thresholds)
-            except (json.JSONDecodeError, TypeError):
-                return {"minor": None, "major": None, "severe": None}
-        return {"minor": None, "major": None, "severe": None}
+        """Damage thresholds as a minor/major/severe dict"""
+        if isinstance(self.damage_thresholds, dict):
+            return self.damage_thresholds
+        return dict(DEFAULT_THRESHOLDS)
 
     def set_damage_thresholds(self, thresholds_dict):
-        """Set damage thresholds as JSON string"""
-        if thresholds_dict:
-            self.damage_thresholds = json.dumps(thresholds_dict)
-        else:
-            self.damage_thresholds = None
+        """Set damage thresholds from a minor/major/severe dict"""
+        self.damage_thresholds = dict(thresholds_dict) if thresholds_dict else None
 
     def get_experiences(self):
-        """Parse experiences from JSON string"""
-        if self.experiences:
-            try:
-                return json.loads(self.experiences)
-            except (json.JSONDecodeError, TypeError):
-                return []
+        """Experiences as a list of strings"""
+        if isinstance(self.experiences, list):
+            return self.experiences
         return []
 
     def set_experiences(self, experiences_list):
-        """Set experiences as JSON string"""
+        """Set experiences from a list of strings"""
         if experiences_list:
             # Ensure we have 2-4 experiences
             if len(experiences_list) < 2:
                 experiences_list = experiences_list + [""] * (2 - len(experiences_list))
             elif len(experiences_list) > 4:
                 experiences_list = experiences_list[:4]
-            self.experiences = json.dumps(experiences_list)
+            self.experiences = list(experiences_list)
         else:
-            self.experiences = json.dumps(["", ""])  # Default to 2 empty experiences
+            self.experiences = ["", ""]  # Default to 2 empty experiences
+
+    @classmethod
+    def evasion_above(cls, evasion):
+        """SQL condition for quick refs with an evasion score above `evasion` (uses the campaign/evasion index)"""
+        return cls.evasion_score > evasion
+
+    @classmethod
+    def has_experience(cls, experience):
+        """SQL condition for quick refs that list `experience` among their experiences"""
+        if db.engine.dialect.name == 'postgresql':
+            # jsonb containment is served by the GIN index
+            return type_coerce(cls.experiences, JSONB).contains([experience])
+        entries = func.json_each(cls.experiences).table_valued('value')
+        return select(literal(1)).select_from(entries).where(entries.c.value == experience).exists()
 
     def to_dict(self):
         """Convert to dictionary for API responses"""
@@ -1,13 +1,14 @@
 from app import db
+from app.models.campaign import CampaignScoped
 from datetime import datetime
 
-class District(db.Model):
+class District(CampaignScoped, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)  # Always need a name
     info = db.Column(db.Text, nullable=True)  # Can be null for TBD districts
     status = db.Column(db.String(50), nullable=True)  # Can be null initially
     color = db.Column(db.String(20), nullable=False, default='#4a5568')  # Default gray for TBD
-    district_number = db.Column(db.Integer, nullable=False, unique=True)  # Always need the number
+    district_number = db.Column(db.Integer, nullable=False)  # Always need the number; unique within a campaign
     
     # SVG path data for the district shape
     svg_path = db.Column(db.Text, nullable=False)  # Always need the shape
@@ -18,6 +19,10 @@ class District(db.Model):
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('campaign_id', 'district_number', name='uq_district_campaign_number'),
+    )
     
     def __repr__(self):
         return f'<District {self.name}>'
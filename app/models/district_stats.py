@@ -0,0 +1,219 @@
+from app import db
+from app.models.campaign import CampaignScoped
+from app.models.district import District
+from app.models.guild import Guild, GuildRelationship
+from app.models.player_note import PlayerNote
+from datetime import datetime
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+
+INFLUENCE_LEVELS = ['Low', 'Medium', 'High']
+RELATIONSHIP_TYPES = ['positive', 'negative']
+COUNT_COLUMNS = ['guild_count', 'influence_low', 'influence_medium', 'influence_high',
+                 'positive_relationships', 'negative_relationships', 'note_count']
+
+
+class DistrictStats(CampaignScoped, db.Model):
+    """Per-district aggregates for the map overview.
+
+    Kept current by the flush listeners below: every flush that touches a
+    guild, guild relationship, district note or district recomputes the rows
+    of just the districts involved (before and after the change), in the
+    same transaction. Writes that bypass the ORM call refresh() themselves.
+    A relationship counts once for each district holding one of its guilds.
+    """
+    __tablename__ = 'district_stats'
+
+    district_id = db.Column(db.Integer, db.ForeignKey('district.id'), primary_key=True)
+    guild_count = db.Column(db.Integer, nullable=False, default=0)
+    influence_low = db.Column(db.Integer, nullable=False, default=0)
+    influence_medium = db.Column(db.Integer, nullable=False, default=0)
+    influence_high = db.Column(db.Integer, nullable=False, default=0)
+    positive_relationships = db.Column(db.Integer, nullable=False, default=0)
+    negative_relationships = db.Column(db.Integer, nullable=False, default=0)
+    note_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<DistrictStats district={self.district_id} guilds={self.guild_count}>'
+
+    @staticmethod
+    def to_overview(district, stats):
+        """Overview entry for a district; `stats` is None for a district nothing has touched yet"""
+        counts = {column: getattr(stats, column) if stats else 0 for column in COUNT_COLUMNS}
+        relationships = counts['positive_relationships'] + counts['negative_relationships']
+        return {
+            'district_id': district.id,
+            'district_number': district.district_number,
+            'name': district.name,
+            'guild_count': counts['guild_count'],
+            'influence': {
+                'low': counts['influence_low'],
+                'medium': counts['influence_medium'],
+                'high': counts['influence_high'],
+                'unknown': counts['guild_count'] - counts['influence_low'] - counts['influence_medium']
+                           - counts['influence_high']
+            },
+            'relationships': {
+                'positive': counts['positive_relationships'],
+                'negative': counts['negative_relationships']
+            },
+            # Share of the district's relationships that are hostile, 0 with none
+            'tension': round(counts['negative_relationships'] / relationships, 3) if relationships else 0,
+            'note_count': counts['note_count']
+        }
+
+    @classmethod
+    def get_overview(cls):
+        """Every district with its aggregates, in district number order"""
+        rows = db.session.query(District, cls).outerjoin(cls, cls.district_id == District.id) \
+            .order_by(District.district_number).all()
+        return [cls.to_overview(district, stats) for district, stats in rows]
+
+    @classmethod
+    def refresh(cls, connection, district_ids):
+        """Recompute the rows of `district_ids` on `connection` from the guild, relationship and note tables"""
+        district_ids = sorted({district_id for district_id in district_ids if district_id is not None})
+        if not district_ids:
+            return
+        district, guild = District.__table__, Guild.__table__
+        relationship, note = GuildRelationship.__table__, PlayerNote.__table__
+        campaigns = dict(connection.execute(
+            db.select(district.c.id, district.c.campaign_id).where(district.c.id.in_(district_ids))
+        ).all())
+        stats = {district_id: dict.fromkeys(COUNT_COLUMNS, 0) for district_id in campaigns}
+
+        for district_id, influence, count in connection.execute(
+            db.select(guild.c.headquarters_district_id, guild.c.influence, db.func.count())
+            .where(guild.c.headquarters_district_id.in_(campaigns))
+            .group_by(guild.c.headquarters_district_id, guild.c.influence)
+        ):
+            stats[district_id]['guild_count'] += count
+            if influence in INFLUENCE_LEVELS:
+                stats[district_id][f'influence_{influence.lower()}'] += count
+
+        # Both guilds of a relationship may sit in the same district; count it once there
+        seen = set()
+        for district_id, relationship_id, relationship_type in connection.execute(
+            db.select(guild.c.headquarters_district_id, relationship.c.id, relationship.c.relationship_type)
+            .join(guild, db.or_(guild.c.id == relationship.c.guild_1_id, guild.c.id == relationship.c.guild_2_id))
+            .where(guild.c.headquarters_district_id.in_(campaigns))
+        ):
+            if (district_id, relationship_id) in seen or relationship_type not in RELATIONSHIP_TYPES:
+                continue
+            seen.add((district_id, relationship_id))
+            stats[district_id][f'{relationship_type}_relationships'] += 1
+
+        for district_id, count in connection.execute(
+            db.select(note.c.target_id, db.func.count())
+            .where(note.c.target_type == 'district', note.c.target_id.in_(campaigns))
+            .group_by(note.c.target_id)
+        ):
+            if district_id in stats:
+                stats[district_id]['note_count'] = count
+
+        table = cls.__table__
+        now = datetime.utcnow()
+        gone = [district_id for district_id in district_ids if district_id not in campaigns]
+        if gone:
+            connection.execute(table.delete().where(table.c.district_id.in_(gone)))
+        if stats:
+            # Upsert rather than delete and reinsert: two transactions refreshing the same new district
+            # would both find no row to delete, and the second insert would hit the primary key
+            dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+            statement = dialect.insert(table)
+            statement = statement.on_conflict_do_update(index_elements=['district_id'], set_={
+                column: statement.excluded[column] for column in COUNT_COLUMNS + ['campaign_id', 'updated_at']
+            })
+            connection.execute(statement, [
+                dict(counts, district_id=district_id, campaign_id=campaigns[district_id], updated_at=now)
+                for district_id, counts in sorted(stats.items())  # One lock order for every transaction
+            ])
+
+    @classmethod
+    def rebuild(cls, campaign_id=None):
+        """Recompute every district (of one campaign, or all); the caller commits"""
+        query = db.session.query(District.id).execution_options(all_campaigns=True)
+        if campaign_id is not None:
+            query = query.filter(District.campaign_id == campaign_id)
+        district_ids = [district_id for (district_id,) in query]
+        cls.refresh(db.session.connection(), district_ids)
+        return len(district_ids)
+
+
+# Columns whose changes move a row's contribution between districts or buckets
+WATCHED = {
+    Guild: ['headquarters_district_id', 'influence'],
+    GuildRelationship: ['guild_1_id', 'guild_2_id', 'relationship_type'],
+    PlayerNote: ['target_type', 'target_id'],
+}
+
+
+def _changed(obj, columns):
+    state = inspect(obj)
+    return any(state.attrs[column].history.has_changes() for column in columns)
+
+
+def _districts_of_guilds(session, guild_ids):
+    guild = Guild.__table__
+    guild_ids = {guild_id for guild_id in guild_ids if guild_id is not None}
+    if not guild_ids:
+        return set()
+    return {district_id for (district_id,) in session.execute(
+        db.select(guild.c.headquarters_district_id).where(guild.c.id.in_(guild_ids)))}
+
+
+def _touched_districts(session):
+    """Districts whose aggregates the pending changes affect, judged by the rows as stored and as they will be"""
+    touched = {model: [] for model in WATCHED}
+    districts = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        model = type(obj)
+        if model in WATCHED and (obj in session.new or obj in session.deleted or _changed(obj, WATCHED[model])):
+            touched[model].append(obj)
+        elif model is District and obj in session.deleted:
+            districts.add(obj.id)
+
+    def stored(model, columns):
+        # Values still in the database, which attribute history lacks for attributes that were never loaded
+        ids = [obj.id for obj in touched[model] if obj.id is not None and obj not in session.new]
+        if not ids:
+            return []
+        table = model.__table__
+        return session.execute(db.select(*[table.c[column] for column in columns]).where(table.c.id.in_(ids))).all()
+
+    districts.update(district_id for (district_id,) in stored(Guild, ['headquarters_district_id']))
+    districts.update(obj.headquarters_district_id for obj in touched[Guild] if obj not in session.deleted)
+
+    guild_ids = [guild_id for row in stored(GuildRelationship, ['guild_1_id', 'guild_2_id']) for guild_id in row]
+    guild_ids += [guild_id for obj in touched[GuildRelationship] for guild_id in (obj.guild_1_id, obj.guild_2_id)]
+    districts.update(_districts_of_guilds(session, guild_ids))
+
+    targets = stored(PlayerNote, ['target_type', 'target_id'])
+    targets += [(obj.target_type, obj.target_id) for obj in touched[PlayerNote] if obj not in session.deleted]
+    districts.update(target_id for target_type, target_id in targets if target_type == 'district')
+
+    districts.discard(None)
+    return districts
+
+
+@event.listens_for(db.session, 'before_flush')
+def _collect_district_stats(session, flush_context, instances):
+    """Note which districts this flush affects while their old rows still exist"""
+    deleted = {obj.id for obj in session.deleted if isinstance(obj, District)}
+    if deleted:
+        table = DistrictStats.__table__
+        session.execute(table.delete().where(table.c.district_id.in_(deleted)))
+    touched = _touched_districts(session) - deleted
+    if touched:
+        session.info.setdefault('district_stats_touched', set()).update(touched)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_district_stats(session, flush_context):
+    touched = session.info.pop('district_stats_touched', set())
+    # Guilds and relationships linked through objects rather than ids only have their ids now
+    touched.update(obj.headquarters_district_id for obj in session.new if isinstance(obj, Guild))
+    touched |= _districts_of_guilds(session, [guild_id for obj in session.new if isinstance(obj, GuildRelationship)
+                                              for guild_id in (obj.guild_1_id, obj.guild_2_id)])
+    DistrictStats.refresh(session.connection(), touched)
@@ -1,7 +1,10 @@
 from app import db
+from app.models.campaign import CampaignScoped
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm.attributes import set_committed_value
 
-class Guild(db.Model):
+class Guild(CampaignScoped, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
@@ -14,11 +17,16 @@ class Guild(db.Model):
     
     # Relationship to district
     headquarters = db.relationship('District', backref=db.backref('guilds', lazy=True))
+
+    __table_args__ = (
+        db.Index('ix_guild_campaign_name', 'campaign_id', 'name'),
+        db.Index('ix_guild_campaign_headquarters', 'campaign_id', 'headquarters_district_id'),
+    )
     
     def __repr__(self):
         return f'<Guild {self.name}>'
 
-class GuildRelationship(db.Model):
+class GuildRelationship(CampaignScoped, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     guild_1_id = db.Column(db.Integer, db.ForeignKey('guild.id'), nullable=False)
     guild_2_id = db.Column(db.Integer, db.ForeignKey('guild.id'), nullable=False)
@@ -31,23 +39,48 @@ class GuildRelationship(db.Model):
     guild_1 = db.relationship('Guild', foreign_keys=[guild_1_id], backref='relationships_as_first')
     guild_2 = db.relationship('Guild', foreign_keys=[guild_2_id], backref='relationships_as_second')
     
-    # Ensure we don't have duplicate relationships (guild A -> guild B and guild B -> guild A)
-    __table_args__ = (db.UniqueConstraint('guild_1_id', 'guild_2_id', name='unique_guild_relationship'),)
+    # Relationships are symmetric, so each pair is stored once, lower guild id first
+    # (see canonical_pair); the unique constraint then also rules out (B, A) next to (A, B)
+    __table_args__ = (
+        db.UniqueConstraint('guild_1_id', 'guild_2_id', name='unique_guild_relationship'),
+        db.CheckConstraint('guild_1_id < guild_2_id', name='ck_guild_relationship_canonical'),
+        db.Index('ix_guild_relationship_campaign_guilds', 'campaign_id', 'guild_1_id', 'guild_2_id'),
+        db.Index('ix_guild_relationship_guild_2', 'guild_2_id'),
+    )
     
     def __repr__(self):
         return f'<GuildRelationship {self.guild_1.name} -> {self.guild_2.name} ({self.relationship_type})>'
     
+    @staticmethod
+    def canonical_pair(guild_1_id, guild_2_id):
+        """The (lower id, higher id) order a relationship between two guilds is stored in"""
+        return (guild_1_id, guild_2_id) if guild_1_id <= guild_2_id else (guild_2_id, guild_1_id)
+    
     @classmethod
     def get_guild_relationships(cls, guild_id):
         """Get all relationships for a specific guild"""
-        return cls.query.filter(
-            (cls.guild_1_id == guild_id) | (cls.guild_2_id == guild_id)
+        # Two probes, on the unique constraint's (guild_1_id, ...) index and on guild_2_id,
+        # instead of an OR across both columns
+        return cls.query.filter(cls.guild_1_id == guild_id).union_all(
+            cls.query.filter(cls.guild_2_id == guild_id)
         ).all()
     
     @classmethod
     def get_relationship_between(cls, guild_1_id, guild_2_id):
         """Get the relationship between two specific guilds"""
-        return cls.query.filter(
-            ((cls.guild_1_id == guild_1_id) & (cls.guild_2_id == guild_2_id)) |
-            ((cls.guild_1_id == guild_2_id) & (cls.guild_2_id == guild_1_id))
-        ).first()
\ No newline at end of file
+        guild_1_id, guild_2_id = cls.canonical_pair(guild_1_id, guild_2_id)
+        return cls.query.filter_by(guild_1_id=guild_1_id, guild_2_id=guild_2_id).first()
+
+
+@event.listens_for(GuildRelationship, 'before_insert')
+@event.listens_for(GuildRelationship, 'before_update')
+def _store_canonical_pair(mapper, connection, relationship):
+    """Swap a pair given in (higher, lower) order; runs after guild objects have set the ids"""
+    if relationship.guild_1_id is None or relationship.guild_2_id is None:
+        return
+    if relationship.guild_1_id > relationship.guild_2_id:
+        relationship.guild_1_id, relationship.guild_2_id = relationship.guild_2_id, relationship.guild_1_id
+        if 'guild_1' in relationship.__dict__ and 'guild_2' in relationship.__dict__:
+            guild_1, guild_2 = relationship.guild_1, relationship.guild_2
+            set_committed_value(relationship, 'guild_1', guild_2)
+            set_committed_value(relationship, 'guild_2', guild_1)
\ No newline at end of file
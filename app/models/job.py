@@ -0,0 +1,97 @@
+from app import db
+from datetime import datetime
+
+# Keys whose values never leave the server through job listings
+REDACTED_KEYS = {'password', 'password_hash', 'passwords', 'secrets'}
+
+
+def redact(value):
+    """`value` with anything under a REDACTED_KEYS key masked, at any depth"""
+    if isinstance(value, dict):
+        return {key: '[redacted]' if key in REDACTED_KEYS and item is not None else redact(item)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False)  # Registered task name (see app/tasks.py)
+    args = db.Column(db.JSON, nullable=True)  # Keyword arguments for the task
+    # Sensitive keyword arguments while queued, then sensitive output until read once; never rendered
+    secrets = db.Column(db.JSON, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # 'queued', 'running', 'succeeded' or 'failed'
+    priority = db.Column(db.Integer, nullable=False, default=0)  # Higher runs first
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    progress = db.Column(db.Float, nullable=False, default=0.0)  # 0.0 - 1.0
+    progress_message = db.Column(db.String(255), nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)  # Traceback of the last failed attempt
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaign.id'), nullable=True)  # Campaign the task runs in, if any
+    created_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    locked_by = db.Column(db.String(100), nullable=True)  # host:pid of the runner working on it
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Pushed back between retries
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    campaign = db.relationship('Campaign')
+    created_by = db.relationship('User')
+
+    __table_args__ = (
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+    )
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.name} {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'args': self.public_args,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'progress': self.progress,
+            'progress_message': self.progress_message,
+            'result': self.public_result,
+            'has_secrets': self.secrets is not None,
+            'error': self.error,
+            'campaign_id': self.campaign_id,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    @property
+    def public_args(self):
+        return redact(self.args or {})
+
+    @property
+    def public_result(self):
+        return redact(self.result)
+
+    @classmethod
+    def get_recent(cls, limit=100):
+        """Get the most recently created jobs"""
+        return cls.query.order_by(cls.id.desc()).limit(limit).all()
+
+    @classmethod
+    def count_by_status(cls):
+        """Number of jobs in each status"""
+        return dict(db.session.query(cls.status, db.func.count(cls.id)).group_by(cls.status).all())
+
+    @classmethod
+    def get_due(cls, now, limit=50):
+        """Queued jobs whose retry delay has passed, highest priority first"""
+        return cls.query.filter(cls.status == 'queued', cls.run_after <= now).order_by(
+            cls.priority.desc(), cls.id
+        ).limit(limit).all()
+
+    @classmethod
+    def count_running(cls, name):
+        """Running jobs of one task across every runner"""
+        return cls.query.filter_by(name=name, status='running').count()
\ No newline at end of file
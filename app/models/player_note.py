@@ -1,17 +1,29 @@
 from app import db
+from app.models.campaign import CampaignScoped
 from datetime import datetime
+from sqlalchemy import literal_column, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import make_transient_to_detached
 
-class PlayerNote(db.Model):
+class PlayerNote(CampaignScoped, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     target_type = db.Column(db.String(20), nullable=False)  # 'district' or 'guild'
     target_id = db.Column(db.Integer, nullable=False)  # ID of district or guild
-    content = db.Column(db.Text, nullable=False)
+    # Active history keeps the replaced text available to the revision listener even if it was never loaded
+    content = db.column_property(db.Column(db.Text, nullable=False), active_history=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # Bumped per kept revision
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationship to user
     user = db.relationship('User', backref=db.backref('notes', lazy=True))
+    revisions = db.relationship('PlayerNoteRevision', backref='note', lazy=True, cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'target_type', 'target_id', name='uq_player_note_user_target'),
+        db.Index('ix_player_note_campaign_target', 'campaign_id', 'target_type', 'target_id'),
+    )
     
     def __repr__(self):
         return f'<PlayerNote {self.user.username} on {self.target_type} {self.target_id}>'
@@ -31,4 +43,72 @@ class PlayerNote(db.Model):
             user_id=user_id,
             target_type=target_type,
             target_id=target_id
-        ).first()
\ No newline at end of file
+        ).first()
+    
+    @classmethod
+    def upsert(cls, campaign_id, user_id, target_type, target_id, content, edited_at=None):
+        """Create a user's note on a target or replace its content, race-free; returns (note, created).
+
+        A single INSERT ... ON CONFLICT either creates the note or returns the
+        existing one, locked until commit, so concurrent saves of the same
+        note queue up instead of creating duplicates. The conflict branch only
+        touches the row: replacing the content is then an ordinary ORM update,
+        because the revision history needs the text it replaces, which
+        RETURNING cannot give back portably.
+
+        Postgres reports which branch ran through the row's xmax, which is 0
+        only on a row version this statement inserted. SQLite has no such
+        column, so there the conflict does nothing and the existing row is
+        read back; the insert already holds the database's write lock, so it
+        cannot change in between.
+
+        `edited_at` dates a write made earlier, such as a note draft: the note
+        gets that time, and an existing note saved since keeps its content.
+        """
+        from app.models.change_log import build_change, record_changes
+        from app.models.district_stats import DistrictStats
+
+        db.session.flush()  # Pending ORM changes go first, as a query's autoflush would send them
+        connection = db.session.connection()  # Always the primary
+        columns = list(cls.__table__.c)
+        now = edited_at or datetime.utcnow()
+        values = dict(campaign_id=campaign_id, user_id=user_id, target_type=target_type, target_id=target_id,
+                      content=content, version=1, created_at=now, updated_at=now)
+        conflict = ['user_id', 'target_type', 'target_id']
+
+        if connection.dialect.name == 'postgresql':
+            statement = postgresql.insert(cls.__table__).values(**values)
+            statement = statement.on_conflict_do_update(
+                index_elements=conflict, set_={'user_id': statement.excluded.user_id}
+            ).returning(*columns, literal_column('xmax = 0').label('inserted'))
+            row = dict(connection.execute(statement).one()._mapping)
+            created = row.pop('inserted')
+        else:
+            statement = sqlite.insert(cls.__table__).values(**values).on_conflict_do_nothing(
+                index_elements=conflict
+            ).returning(*columns)
+            found = connection.execute(statement).one_or_none()
+            created = found is not None
+            if found is None:
+                found = connection.execute(select(*columns).where(
+                    cls.user_id == user_id, cls.target_type == target_type, cls.target_id == target_id
+                )).one()
+            row = dict(found._mapping)
+
+        note = cls(**row)
+        make_transient_to_detached(note)
+        note = db.session.merge(note, load=False)
+
+        if created:
+            # Written outside the flush, so the change log and district stats are kept here
+            record_changes(connection, [build_change('note', note.id, 'create', row, user_id=user_id,
+                                                     campaign_id=campaign_id)])
+            if target_type == 'district':
+                DistrictStats.refresh(connection, [target_id])
+        elif edited_at is None:
+            if note.content != content:
+                note.content = content
+        elif note.updated_at is None or note.updated_at < edited_at:
+            note.content = content
+            note.updated_at = edited_at
+        return note, created
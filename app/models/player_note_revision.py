@@ -0,0 +1,151 @@
+from app import db
+from app.models.campaign import CampaignScoped
+from app.models.player_note import PlayerNote
+from datetime import datetime
+from difflib import SequenceMatcher
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+import json
+import re
+import zlib
+
+# Words with their leading whitespace, plus trailing whitespace: joining the tokens gives the text back exactly
+TOKEN = re.compile(r'\s*\S+|\s+')
+
+
+def _tokens(text):
+    return TOKEN.findall(text)
+
+
+def make_delta(newer, older):
+    """Instructions that rebuild `older` from `newer`: [start, end] copies newer tokens, a string is literal text"""
+    newer_tokens, older_tokens = _tokens(newer), _tokens(older)
+    ops = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, newer_tokens, older_tokens, autojunk=False).get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(''.join(older_tokens[j1:j2]))
+    return ops
+
+
+def apply_delta(newer, ops):
+    newer_tokens = _tokens(newer)
+    return ''.join(''.join(newer_tokens[op[0]:op[1]]) if isinstance(op, list) else op for op in ops)
+
+
+class PlayerNoteRevision(CampaignScoped, db.Model):
+    """An earlier version of a note.
+
+    The current version lives only in player_note.content. Each revision is
+    stored as a zlib-compressed delta against the next newer version, and
+    every NOTE_REVISION_SNAPSHOT_EVERY-th revision as a full compressed
+    snapshot, so rebuilding any version applies fewer than that many deltas.
+    """
+    __tablename__ = 'player_note_revision'
+
+    id = db.Column(db.Integer, primary_key=True)
+    note_id = db.Column(db.Integer, db.ForeignKey('player_note.id'), nullable=False)
+    number = db.Column(db.Integer, nullable=False)  # Version number, 1 = the note as first written
+    kind = db.Column(db.String(10), nullable=False)  # 'snapshot' or 'delta'
+    data = db.Column(db.LargeBinary, nullable=False)
+    length = db.Column(db.Integer, nullable=False)  # Characters in this version
+    created_at = db.Column(db.DateTime, nullable=False)  # When this version was written
+
+    __table_args__ = (
+        db.UniqueConstraint('note_id', 'number', name='uq_player_note_revision_note_number'),
+    )
+
+    def __repr__(self):
+        return f'<PlayerNoteRevision note={self.note_id} v{self.number} {self.kind}>'
+
+    def to_dict(self):
+        return {
+            'number': self.number,
+            'length': self.length,
+            'created_at': self.created_at.isoformat()
+        }
+
+    def rebuild(self, newer):
+        """This version's text, given the text of the version after it"""
+        data = zlib.decompress(self.data).decode()
+        if self.kind == 'snapshot':
+            return data
+        return apply_delta(newer, json.loads(data))
+
+    @classmethod
+    def get_for_note(cls, note_id):
+        """All revisions of a note, newest first, without their data"""
+        return cls.query.filter_by(note_id=note_id).options(db.defer(cls.data)).order_by(cls.number.desc())
+
+    @classmethod
+    def content_at(cls, note, number):
+        """Text of version `number` of `note` (None if there is no such version)"""
+        if number == note.version:
+            return note.content
+        if number < 1 or number > note.version:
+            return None
+        # Walk back from the nearest snapshot at or after `number`, or from the current text
+        snapshot = db.session.query(db.func.min(cls.number)).filter(
+            cls.note_id == note.id, cls.number >= number, cls.kind == 'snapshot'
+        ).scalar()
+        query = cls.query.filter(cls.note_id == note.id, cls.number >= number)
+        if snapshot is not None:
+            query = query.filter(cls.number <= snapshot)
+        text = note.content
+        for revision in query.order_by(cls.number.desc()):
+            text = revision.rebuild(text)
+        return text
+
+
+def _encode(newer, older, number, every):
+    """Compressed delta, or a snapshot every `every` versions and whenever that is no bigger"""
+    snapshot = zlib.compress(older.encode(), 9)
+    if every and number % every == 0:
+        return 'snapshot', snapshot
+    delta = zlib.compress(json.dumps(make_delta(newer, older), separators=(',', ':')).encode(), 9)
+    if len(delta) >= len(snapshot):
+        return 'snapshot', snapshot
+    return 'delta', delta
+
+
+def _record_revision(session, note, older, written_at, replaced_at, settings):
+    newer = note.content
+    every, coalesce = settings
+    previous = None
+    if note.version > 1:
+        previous = PlayerNoteRevision.query.execution_options(all_campaigns=True).filter_by(
+            note_id=note.id, number=note.version - 1).first()
+
+    if coalesce and (replaced_at - written_at).total_seconds() < coalesce and (note.version == 1 or previous):
+        # The outgoing version was replaced within seconds (autosave): drop it instead of keeping a
+        # revision, and re-base the previous revision onto the new text if it was a delta against it
+        if previous is not None and previous.kind == 'delta':
+            previous.kind, previous.data = _encode(newer, previous.rebuild(older), previous.number, every)
+        return
+
+    kind, data = _encode(newer, older, note.version, every)
+    session.add(PlayerNoteRevision(note_id=note.id, campaign_id=note.campaign_id, number=note.version,
+                                   kind=kind, data=data, length=len(older), created_at=written_at))
+    note.version += 1
+
+
+@event.listens_for(db.session, 'before_flush')
+def _keep_note_revisions(session, flush_context, instances):
+    """Keep the previous text of every note whose content changes, however it was written"""
+    settings = (10, 60)
+    if has_app_context():
+        settings = (current_app.config.get('NOTE_REVISION_SNAPSHOT_EVERY', 10),
+                    current_app.config.get('NOTE_REVISION_COALESCE_SECONDS', 60))
+
+    for obj in list(session.dirty):
+        if not isinstance(obj, PlayerNote):
+            continue
+        state = inspect(obj)
+        content = state.attrs.content.history
+        if not content.deleted or not content.added or content.deleted[0] == content.added[0]:
+            continue
+        updated = state.attrs.updated_at.history
+        written_at = (updated.deleted or updated.unchanged or [None])[0] or obj.created_at or datetime.utcnow()
+        replaced_at = updated.added[0] if updated.added and updated.added[0] else datetime.utcnow()
+        _record_revision(session, obj, content.deleted[0], written_at, replaced_at, settings)
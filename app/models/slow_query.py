@@ -0,0 +1,20 @@
+from app import db
+from datetime import datetime
+
+class SlowQuery(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    statement = db.Column(db.Text, nullable=False)
+    parameter_shape = db.Column(db.Text, nullable=True)  # Parameter types only, never values
+    duration_ms = db.Column(db.Float, nullable=False)
+    route = db.Column(db.String(100), nullable=True)  # Flask endpoint that issued the query
+    call_site = db.Column(db.String(255), nullable=True)  # e.g. PlayerNote.get_notes_for_target
+    plan = db.Column(db.Text, nullable=True)  # EXPLAIN / EXPLAIN QUERY PLAN output
+    recorded_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<SlowQuery {self.duration_ms}ms {self.call_site or self.route}>'
+
+    @classmethod
+    def get_recent(cls, limit=200):
+        """Get the most recently recorded slow queries"""
+        return cls.query.order_by(cls.recorded_at.desc()).limit(limit).all()
\ No newline at end of file
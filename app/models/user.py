@@ -1,6 +1,6 @@
 from app import db, login_manager
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.passwords import hash_password, verify_password, needs_rehash
 from datetime import datetime
 
 class User(UserMixin, db.Model):
@@ -12,12 +12,27 @@ class User(UserMixin, db.Model):
     character_name = db.Column(db.String(100), nullable=True)  # Character name for display
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     deleted_at = db.Column(db.DateTime, nullable=True)  # Soft delete timestamp
+    archived_at = db.Column(db.DateTime, nullable=True)  # Notes and quick refs moved to user_archive
+
+    __table_args__ = (
+        # Partial indexes: lookups of active users only ever touch active rows, and the
+        # archival sweep only touches deleted users that still have data in the hot tables
+        db.Index('ix_user_active_role_username', 'role', 'username',
+                 postgresql_where=db.text('deleted_at IS NULL'), sqlite_where=db.text('deleted_at IS NULL')),
+        db.Index('ix_user_pending_archive', 'deleted_at',
+                 postgresql_where=db.text('deleted_at IS NOT NULL AND archived_at IS NULL'),
+                 sqlite_where=db.text('deleted_at IS NOT NULL AND archived_at IS NULL')),
+    )
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """Check whether the stored hash predates the current PASSWORD_HASH_METHOD"""
+        return needs_rehash(self.password_hash)
 
     def soft_delete(self):
         """Mark user as deleted"""
@@ -36,6 +51,64 @@ class User(UserMixin, db.Model):
     def get_active_players(cls):
         """Get all non-deleted players"""
         return cls.query.filter(cls.deleted_at.is_(None), cls.role == 'player')
+
+    @classmethod
+    def get_deleted_users(cls):
+        """Get all soft-deleted users, most recently deleted first"""
+        return cls.query.filter(cls.deleted_at.isnot(None)).order_by(cls.deleted_at.desc())
+
+    @classmethod
+    def get_archivable(cls, deleted_before):
+        """Get users deleted before a cutoff whose data is still in the hot tables"""
+        return cls.query.filter(cls.deleted_at < deleted_before, cls.archived_at.is_(None)).order_by(cls.id)
+
+    # Sort keys accepted by get_player_roster, mapped to column names
+    ROSTER_SORTS = {
+        'username': 'username',
+        'character_name': 'character_name',
+        'evasion': 'evasion_score',
+        'class_name': 'class_name',
+    }
+
+    @classmethod
+    def get_player_roster(cls, campaign_id, sort='username', descending=False, search=None,
+                          class_name=None, evasion_above=None, experience=None):
+        """Get a campaign's active players with their quick references loaded in the same query"""
+        from app.models.campaign import CampaignMembership
+        from app.models.character_quick_ref import CharacterQuickRef
+
+        query = cls.get_active_players().join(CampaignMembership).filter(
+            CampaignMembership.campaign_id == campaign_id
+        ).outerjoin(CharacterQuickRef, (CharacterQuickRef.user_id == cls.id) &
+                    (CharacterQuickRef.campaign_id == campaign_id)).options(
+            db.contains_eager(cls.character_quick_ref)
+        )
+
+        if search:
+            pattern = f'%{search}%'
+            query = query.filter(cls.username.ilike(pattern) | cls.character_name.ilike(pattern))
+        if class_name:
+            query = query.filter(CharacterQuickRef.class_name == class_name)
+        if evasion_above is not None:
+            query = query.filter(CharacterQuickRef.evasion_above(evasion_above))
+        if experience:
+            query = query.filter(CharacterQuickRef.has_experience(experience))
+
+        column = cls.ROSTER_SORTS.get(sort, 'username')
+        sort_column = getattr(cls if hasattr(cls, column) else CharacterQuickRef, column)
+        sort_column = sort_column.desc() if descending else sort_column.asc()
+        # Tie-break on id so pages are stable
+        return query.order_by(sort_column.nulls_last(), cls.id)
+
+    def to_roster_dict(self):
+        """Convert to dictionary for the player roster API"""
+        quick_ref = self.character_quick_ref
+        return {
+            'id': self.id,
+            'username': self.username,
+            'character_name': self.character_name,
+            'quick_ref': quick_ref.to_dict() if quick_ref else None
+        }
     
     @property
     def is_admin(self):
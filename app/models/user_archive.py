@@ -0,0 +1,113 @@
+from app import db
+from datetime import datetime, date
+from sqlalchemy import inspect
+import json
+import zlib
+
+
+def _archived_models():
+    """Per-user rows that leave the hot tables once the user has been deleted for a while.
+
+    Memberships stay: they are tiny and keep the user's campaigns for a restore.
+    """
+    from app.models import PlayerNote, CharacterQuickRef
+    return {'PlayerNote': PlayerNote, 'CharacterQuickRef': CharacterQuickRef}
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _decode_row(model, row):
+    """Turn an archived row back into constructor kwargs (new primary key, parsed datetimes)"""
+    columns = inspect(model).columns
+    values = {}
+    for key, value in row.items():
+        if key == 'id' or key not in columns:
+            continue
+        if value is not None and isinstance(columns[key].type, db.DateTime):
+            value = datetime.fromisoformat(value)
+        values[key] = value
+    return values
+
+
+class UserArchive(db.Model):
+    __tablename__ = 'user_archive'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True)
+    user_deleted_at = db.Column(db.DateTime, nullable=True)  # When the user was soft deleted
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    row_counts = db.Column(db.JSON, nullable=False)  # {"PlayerNote": n, ...}
+    payload = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed NDJSON, one {"model", "row"} per line
+
+    user = db.relationship('User', backref=db.backref('archive', uselist=False))
+
+    def __repr__(self):
+        return f'<UserArchive user={self.user_id} {self.row_counts}>'
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'archived_at': self.archived_at.isoformat(),
+            'row_counts': self.row_counts,
+            'compressed_bytes': len(self.payload)
+        }
+
+    def rows(self):
+        """Archived rows as (model name, column dict) pairs"""
+        for line in zlib.decompress(self.payload).decode().splitlines():
+            record = json.loads(line)
+            yield record['model'], record['row']
+
+    @classmethod
+    def archive_user(cls, user):
+        """Move a deleted user's notes and quick refs into one compressed archive row (without note history); the caller commits"""
+        lines = []
+        counts = {}
+        for name, model in _archived_models().items():
+            rows = model.query.execution_options(all_campaigns=True).filter_by(user_id=user.id).order_by(model.id).all()
+            columns = [attr.key for attr in inspect(model).column_attrs]
+            for row in rows:
+                lines.append(json.dumps({'model': name, 'row': {c: _encode_value(getattr(row, c)) for c in columns}}))
+                db.session.delete(row)
+            counts[name] = len(rows)
+
+        archive = cls(
+            user_id=user.id,
+            user_deleted_at=user.deleted_at,
+            archived_at=datetime.utcnow(),
+            row_counts=counts,
+            payload=zlib.compress('\n'.join(lines).encode(), 9)
+        )
+        db.session.add(archive)
+        user.archived_at = archive.archived_at
+        return archive
+
+    @classmethod
+    def restore_user(cls, user):
+        """Undelete a user and put their archived rows back (with new ids); the caller commits"""
+        restored = {}
+        archive = cls.query.filter_by(user_id=user.id).first()
+        if archive is not None:
+            models = _archived_models()
+            CharacterQuickRef = models['CharacterQuickRef']
+            existing_refs = {ref.campaign_id for ref in CharacterQuickRef.query.execution_options(all_campaigns=True)
+                             .filter_by(user_id=user.id)}
+            for name, row in archive.rows():
+                values = _decode_row(models[name], row)
+                # A quick ref written while the user was deleted wins over the archived one
+                if name == 'CharacterQuickRef' and values['campaign_id'] in existing_refs:
+                    continue
+                # Note revision history is not archived, so a restored note starts over at version 1
+                if name == 'PlayerNote':
+                    values['version'] = 1
+                db.session.add(models[name](**values))
+                restored[name] = restored.get(name, 0) + 1
+            db.session.delete(archive)
+
+        user.deleted_at = None
+        user.archived_at = None
+        return restored
\ No newline at end of file
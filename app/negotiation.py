@@ -0,0 +1,68 @@
+"""
+Binary response formats for the API, chosen by the Accept header.
+
+Every API endpoint builds its payload and returns jsonify(...), which goes
+through app.json.response(). NegotiatingJSONProvider encodes that same
+payload as MessagePack (application/msgpack, application/x-msgpack) or CBOR
+(application/cbor, when cbor2 is installed) if the client prefers one of
+those to JSON, so the formats cannot drift apart. JSON stays the default,
+including for "*/*" and missing Accept headers. Values JSON would convert
+(dates, UUIDs, dataclasses) are converted the same way for the binary formats.
+"""
+
+from datetime import timezone
+
+import msgpack
+from flask import request, has_request_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import cbor2
+except ImportError:  # Optional: CBOR is only offered when cbor2 is installed
+    cbor2 = None
+
+# Blueprints whose jsonify() responses are negotiated; pages and auth keep plain JSON
+NEGOTIATED_BLUEPRINTS = {'api'}
+
+
+def _msgpack(obj):
+    return msgpack.packb(obj, default=DefaultJSONProvider.default)
+
+
+def _cbor(obj):
+    return cbor2.dumps(obj, timezone=timezone.utc,
+                       default=lambda encoder, value: encoder.encode(DefaultJSONProvider.default(value)))
+
+
+ENCODERS = {
+    'application/msgpack': _msgpack,
+    'application/x-msgpack': _msgpack,
+}
+if cbor2 is not None:
+    ENCODERS['application/cbor'] = _cbor
+
+
+def negotiated_mimetype():
+    """The binary format the current API request prefers over JSON, or None for JSON"""
+    if not has_request_context() or request.blueprint not in NEGOTIATED_BLUEPRINTS:
+        return None
+    # JSON is listed first so it wins ties, e.g. "*/*" or "application/json, application/msgpack"
+    best = request.accept_mimetypes.best_match(['application/json', *ENCODERS])
+    return best if best in ENCODERS else None
+
+
+class NegotiatingJSONProvider(DefaultJSONProvider):
+    def response(self, *args, **kwargs):
+        mimetype = negotiated_mimetype()
+        if mimetype is None:
+            response = super().response(*args, **kwargs)
+        else:
+            obj = self._prepare_response_obj(args, kwargs)
+            response = self._app.response_class(ENCODERS[mimetype](obj), mimetype=mimetype)
+        if has_request_context() and request.blueprint in NEGOTIATED_BLUEPRINTS:
+            response.vary.add('Accept')
+        return response
+
+
+def init_app(app):
+    app.json = NegotiatingJSONProvider(app)
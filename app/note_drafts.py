@@ -0,0 +1,316 @@
+"""
+Write-behind buffer for note autosave (PUT /api/notes/draft).
+
+Each draft is appended to this worker's journal file in NOTE_DRAFT_DIR and
+fsynced before the request is acknowledged, so an accepted draft survives a
+crash. A background thread rotates the journal every NOTE_DRAFT_FLUSH_INTERVAL
+seconds, coalesces the entries to the newest one per (campaign, user, target)
+and writes them to player_note in transactions of NOTE_DRAFT_BATCH_SIZE notes.
+A rotated file is deleted only after its notes are committed; files left by a
+worker that died are claimed and flushed by the next flush on the host.
+
+Readers merge pending drafts from every worker's files, so a draft shows up in
+GET /api/notes/<type>/<id> before it is flushed. A flush never overwrites a
+note that was saved after the draft was written, and deleting a note appends a
+tombstone that voids older drafts so the flush cannot bring it back. A flush
+re-journals a tombstone for as long as an older draft for the same note is
+still waiting in another worker's file.
+"""
+
+import atexit
+import glob
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from time import time
+
+from flask import current_app
+
+from app import db
+
+JOURNAL_SUFFIX = '.jsonl'
+FLUSHING_SUFFIX = '.flushing'
+
+
+def to_timestamp(value):
+    """POSIX time of a naive UTC datetime as stored by the models"""
+    return value.replace(tzinfo=timezone.utc).timestamp() if value else 0.0
+
+
+def _file_pid(path):
+    name = os.path.basename(path)
+    try:
+        return int(name.split('-', 1)[1].split('.', 1)[0])
+    except (IndexError, ValueError):
+        return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_entries(path):
+    entries = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue  # Torn final line from a crash mid-write; earlier lines are intact
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _coalesce(entries):
+    """Newest entry per (campaign, user, target type, target id)"""
+    latest = {}
+    for entry in entries:
+        key = (entry['campaign_id'], entry['user_id'], entry['target_type'], entry['target_id'])
+        if key not in latest or entry['ts'] >= latest[key]['ts']:
+            latest[key] = entry
+    return latest
+
+
+class NoteDraftBuffer:
+    def __init__(self, app):
+        self.app = app
+        self.directory = app.config['NOTE_DRAFT_DIR']
+        self.flush_interval = app.config['NOTE_DRAFT_FLUSH_INTERVAL']
+        self.batch_size = app.config['NOTE_DRAFT_BATCH_SIZE']
+        self.fsync = app.config['NOTE_DRAFT_FSYNC']
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._rotations = 0
+        self._fd = None
+        self._pid = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._read_cache = {}  # path -> ((mtime_ns, size), entries)
+        os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def journal_path(self):
+        return os.path.join(self.directory, f'drafts-{os.getpid()}{JOURNAL_SUFFIX}')
+
+    def _append(self, entry):
+        line = (json.dumps(entry) + '\n').encode()
+        with self._lock:
+            if self._fd is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._fd = os.open(self.journal_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            os.write(self._fd, line)
+            if self.fsync:
+                os.fsync(self._fd)
+
+    def save(self, campaign_id, user_id, target_type, target_id, content):
+        """Durably record a draft; returns its timestamp"""
+        self.start()
+        entry = {'ts': time(), 'campaign_id': campaign_id, 'user_id': user_id,
+                 'target_type': target_type, 'target_id': target_id, 'content': content}
+        self._append(entry)
+        return entry['ts']
+
+    def discard(self, campaign_id, user_id, target_type, target_id):
+        """Void pending drafts for a note that was just deleted"""
+        if self.pending_for_target(campaign_id, target_type, target_id).get(user_id):
+            self._append({'ts': time(), 'campaign_id': campaign_id, 'user_id': user_id,
+                          'target_type': target_type, 'target_id': target_id, 'content': None})
+
+    # Read path
+
+    def _pending_entries(self):
+        entries = []
+        paths = glob.glob(os.path.join(self.directory, 'drafts-*'))
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_mtime_ns, stat.st_size)
+            cached = self._read_cache.get(path)
+            if cached is None or cached[0] != signature:
+                cached = self._read_cache[path] = (signature, _read_entries(path))
+            entries.extend(cached[1])
+        for path in set(self._read_cache) - set(paths):
+            self._read_cache.pop(path, None)
+        return entries
+
+    def pending_for_target(self, campaign_id, target_type, target_id):
+        """Unflushed drafts for one target on this host: user id -> (timestamp, content)"""
+        drafts = {}
+        for (campaign, user_id, kind, target), entry in _coalesce(self._pending_entries()).items():
+            if (campaign, kind, target) == (campaign_id, target_type, target_id) and entry['content'] is not None:
+                drafts[user_id] = (entry['ts'], entry['content'])
+        return drafts
+
+    # Write-behind
+
+    def start(self):
+        """Start the background flusher in this process (idempotent; threads do not survive a fork)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='note-draft-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                self.app.logger.exception('Flushing note drafts failed; will retry')
+
+    def _rotate(self):
+        """Move this worker's journal and any dead worker's files into our own .flushing files"""
+        with self._lock:
+            if self._fd is not None and self._pid == os.getpid():
+                os.close(self._fd)
+            self._fd = None
+            self._rotate_path(self.journal_path)
+
+        for path in glob.glob(os.path.join(self.directory, 'drafts-*')):
+            pid = _file_pid(path)
+            if pid is not None and pid != os.getpid() and not _pid_alive(pid):
+                self._rotate_path(path)
+
+        return sorted(glob.glob(os.path.join(self.directory, f'drafts-{os.getpid()}.*{FLUSHING_SUFFIX}')))
+
+    def _rotate_path(self, path):
+        self._rotations += 1
+        target = os.path.join(self.directory, f'drafts-{os.getpid()}.{int(time() * 1000)}-{self._rotations}{FLUSHING_SUFFIX}')
+        try:
+            os.rename(path, target)  # Atomic: if another worker claimed it first, this fails
+        except FileNotFoundError:
+            pass
+
+    def flush(self):
+        """Write every rotated draft to the database; returns the number of notes written"""
+        with self._flush_lock:
+            paths = self._rotate()
+            if not paths:
+                return 0
+
+            entries = []
+            for path in paths:
+                entries.extend(_read_entries(path))
+            tombstones = [entry for entry in _coalesce(entries).values() if entry['content'] is None]
+            # A delete handled by another worker leaves its tombstone in that worker's journal
+            entries.extend(entry for entry in self._pending_entries() if entry['content'] is None)
+            drafts = [entry for entry in _coalesce(entries).values() if entry['content'] is not None]
+
+            written = 0
+            with self.app.app_context():
+                for start in range(0, len(drafts), self.batch_size):
+                    written += self._write_batch(drafts[start:start + self.batch_size])
+                db.session.remove()
+
+            self._carry_forward(tombstones, paths)
+            for path in paths:
+                os.remove(path)
+            return written
+
+    def _carry_forward(self, tombstones, flushed_paths):
+        """Re-journal tombstones that still void an older draft in another worker's file.
+
+        Without this, a worker that flushes its tombstone before the worker
+        holding the older draft flushes would let that draft re-create the
+        deleted note. A tombstone is kept until no such draft is left.
+        """
+        if not tombstones:
+            return
+        waiting = {}
+        for path in glob.glob(os.path.join(self.directory, 'drafts-*')):
+            if path in flushed_paths:
+                continue
+            for entry in _read_entries(path):
+                if entry['content'] is not None:
+                    key = (entry['campaign_id'], entry['user_id'], entry['target_type'], entry['target_id'])
+                    waiting[key] = min(waiting.get(key, entry['ts']), entry['ts'])
+        for tombstone in tombstones:
+            key = (tombstone['campaign_id'], tombstone['user_id'], tombstone['target_type'], tombstone['target_id'])
+            if waiting.get(key, tombstone['ts']) < tombstone['ts']:
+                self._append(tombstone)
+
+    def _write_batch(self, drafts):
+        try:
+            written = self._apply(drafts)
+            db.session.commit()
+            return written
+        except Exception:
+            db.session.rollback()
+            if len(drafts) == 1:
+                self.app.logger.exception('Dropping note draft that cannot be saved: %r', drafts[0])
+                return 0
+            # Isolate the bad draft so the rest of the batch still lands
+            return sum(self._write_batch([draft]) for draft in drafts)
+
+    def _apply(self, drafts):
+        from app.models import PlayerNote
+
+        user_ids = {draft['user_id'] for draft in drafts}
+        existing = {
+            (note.campaign_id, note.user_id, note.target_type, note.target_id): note
+            for note in PlayerNote.query.execution_options(all_campaigns=True).filter(
+                PlayerNote.user_id.in_(user_ids),
+                PlayerNote.target_id.in_({draft['target_id'] for draft in drafts})
+            )
+        }
+
+        written = 0
+        for draft in drafts:
+            key = (draft['campaign_id'], draft['user_id'], draft['target_type'], draft['target_id'])
+            edited_at = datetime.utcfromtimestamp(draft['ts'])
+            note = existing.get(key)
+            if note is not None and to_timestamp(note.updated_at) >= draft['ts']:
+                continue  # Saved explicitly after this draft was written
+            # The upsert also covers a note that a concurrent save created after the lookup above
+            existing[key], _ = PlayerNote.upsert(draft['campaign_id'], draft['user_id'], draft['target_type'],
+                                                 draft['target_id'], draft['content'], edited_at=edited_at)
+            written += 1
+        return written
+
+    def close(self):
+        """Stop the flusher and write out whatever is pending (called at exit and by gunicorn's worker_exit)"""
+        self._stop.set()
+        try:
+            self.flush()
+        except Exception:
+            self.app.logger.exception('Could not flush note drafts at exit; the next worker will')
+
+
+def note_drafts():
+    return current_app.extensions['note_drafts']
+
+
+def init_app(app):
+    app.config.setdefault('NOTE_DRAFT_DIR', os.path.join(app.instance_path, 'note-drafts'))
+    app.config.setdefault('NOTE_DRAFT_FLUSH_INTERVAL', 2)
+    app.config.setdefault('NOTE_DRAFT_BATCH_SIZE', 200)
+    app.config.setdefault('NOTE_DRAFT_FSYNC', True)
+
+    directory = os.path.realpath(app.config['NOTE_DRAFT_DIR'])
+    if directory.startswith(os.path.realpath(tempfile.gettempdir()) + os.sep) and not (app.debug or app.testing):
+        app.logger.warning('NOTE_DRAFT_DIR %s is in the temp directory; drafts in it are lost if the host '
+                           'restarts before they are flushed', directory)
+
+    buffer = NoteDraftBuffer(app)
+    app.extensions['note_drafts'] = buffer
+    atexit.register(buffer.close)
+
+    @app.before_request
+    def start_flusher():
+        # Started on first request rather than at import so CLI commands never spawn it;
+        # its first flush also recovers journals left by workers that crashed.
+        buffer.start()
\ No newline at end of file
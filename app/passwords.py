@@ -0,0 +1,92 @@
+"""
+Password hashing policy.
+
+PASSWORD_HASH_METHOD is a complete werkzeug method string, "scrypt:<n>:<r>:<p>"
+or "pbkdf2:<hash>:<iterations>", exactly as werkzeug stores it in front of
+each hash. scripts/calibrate_password_hash.py picks one that costs about a
+target number of milliseconds on this host. Hashes made with other
+parameters still verify and are replaced on the user's next login.
+
+Hashing runs in a small per-process thread pool (PASSWORD_HASH_WORKERS).
+hashlib releases the GIL while it works, so the worker's other request
+threads (gunicorn.conf.py runs gthread workers) keep being served, and at
+most PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE hashes are admitted at
+once. A login burst beyond that fails fast with PasswordHashBusy instead of
+piling up CPU-bound work behind every other endpoint. Under a single-threaded
+worker there is never more than one hash waiting, so the limit only matters
+with threads.
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'  # werkzeug's own default
+METHOD_FORMAT = re.compile(r'scrypt:\d+:\d+:\d+|pbkdf2:\w+:\d+')
+
+
+class PasswordHashBusy(Exception):
+    """Too many password hashes are queued in this worker"""
+
+
+class HashPool:
+    def __init__(self, workers, queue, timeout):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='password-hash')
+        self.slots = threading.BoundedSemaphore(workers + queue)
+        self.timeout = timeout
+
+    def run(self, func, *args):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise PasswordHashBusy()
+        try:
+            return self.executor.submit(func, *args).result()
+        finally:
+            self.slots.release()
+
+
+def _policy():
+    if has_app_context():
+        return current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+    return DEFAULT_METHOD
+
+
+def _run(func, *args):
+    pool = current_app.extensions.get('password_hash_pool') if has_app_context() else None
+    if pool is None:
+        return func(*args)
+    return pool.run(func, *args)
+
+
+def hash_password(password, method=None):
+    """Hash with the configured policy"""
+    return _run(generate_password_hash, password, method or _policy())
+
+
+def verify_password(pwhash, password):
+    """Check a password against any werkzeug hash, whatever parameters made it"""
+    if not pwhash:
+        return False
+    return _run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """True if a hash was made with parameters other than the current policy"""
+    return bool(pwhash) and pwhash.split('$', 1)[0] != _policy()
+
+
+def init_app(app):
+    app.config.setdefault('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+    app.config.setdefault('PASSWORD_HASH_WORKERS', 2)
+    app.config.setdefault('PASSWORD_HASH_QUEUE', 8)
+    app.config.setdefault('PASSWORD_HASH_QUEUE_TIMEOUT', 5)
+    # Shorthands like "scrypt" would never match a stored prefix and rehash on every login
+    if not METHOD_FORMAT.fullmatch(app.config['PASSWORD_HASH_METHOD']):
+        raise ValueError(f"PASSWORD_HASH_METHOD must look like 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000', "
+                         f"not {app.config['PASSWORD_HASH_METHOD']!r}")
+    app.extensions['password_hash_pool'] = HashPool(
+        app.config['PASSWORD_HASH_WORKERS'], app.config['PASSWORD_HASH_QUEUE'],
+        app.config['PASSWORD_HASH_QUEUE_TIMEOUT']
+    )
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Per-request SQL profiling (enabled with PROFILING_ENABLED).
+
+Hooks the SQLAlchemy engine to count statements and DB time for each
+request, adds a Server-Timing header, logs statements that repeat often
+enough to look like N+1 lazy loads, and keeps per-endpoint totals for
+the /admin/profiling page. Stats are per worker process.
+"""
+
+import re
+import threading
+from collections import Counter
+from time import perf_counter
+
+from flask import g, request, has_request_context
+from sqlalchemy import event
+
+from app import db
+
+_IN_LIST = re.compile(r'\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+_lock = threading.Lock()
+_endpoint_stats = {}
+
+
+def fingerprint(statement):
+    """Normalize a SQL statement so repeats with different parameters compare equal"""
+    statement = _WHITESPACE.sub(' ', statement).strip()
+    return _IN_LIST.sub('(?)', statement)
+
+
+class EndpointStats:
+    __slots__ = ('endpoint', 'requests', 'total_wall', 'max_wall', 'total_db',
+                 'total_queries', 'max_queries', 'n_plus_one', 'worst_statement', 'worst_repeats')
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.requests = 0
+        self.total_wall = 0.0
+        self.max_wall = 0.0
+        self.total_db = 0.0
+        self.total_queries = 0
+        self.max_queries = 0
+        self.n_plus_one = 0  # Requests flagged as likely N+1
+        self.worst_statement = None
+        self.worst_repeats = 0
+
+    def to_dict(self):
+        return {
+            'endpoint': self.endpoint,
+            'requests': self.requests,
+            'avg_wall_ms': self.total_wall / self.requests * 1000,
+            'max_wall_ms': self.max_wall * 1000,
+            'avg_db_ms': self.total_db / self.requests * 1000,
+            'avg_queries': self.total_queries / self.requests,
+            'max_queries': self.max_queries,
+            'n_plus_one': self.n_plus_one,
+            'worst_statement': self.worst_statement,
+            'worst_repeats': self.worst_repeats
+        }
+
+
+def get_endpoint_stats(sort='avg_wall_ms'):
+    """Per-endpoint stats for this worker, worst first"""
+    with _lock:
+        stats = [s.to_dict() for s in _endpoint_stats.values()]
+    return sorted(stats, key=lambda s: s.get(sort) or 0, reverse=True)
+
+
+def reset_endpoint_stats():
+    with _lock:
+        _endpoint_stats.clear()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('profiling_start', []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('profiling_start')
+    if not started:
+        return
+    elapsed = perf_counter() - started.pop()
+
+    if has_request_context():
+        profile = g.get('sql_profile')
+        if profile is not None:
+            profile['queries'] += 1
+            profile['db_time'] += elapsed
+            profile['statements'][fingerprint(statement)] += 1
+
+
+def _start_request():
+    g.sql_profile = {'start': perf_counter(), 'queries': 0, 'db_time': 0.0, 'statements': Counter()}
+
+
+def _finish_request(app, response):
+    profile = g.pop('sql_profile', None)
+    if profile is None:
+        return response
+
+    wall = perf_counter() - profile['start']
+    endpoint = request.endpoint or request.path
+    threshold = app.config['PROFILING_N_PLUS_ONE_THRESHOLD']
+
+    worst_statement, worst_repeats = None, 0
+    if profile['statements']:
+        worst_statement, worst_repeats = profile['statements'].most_common(1)[0]
+    flagged = worst_repeats >= threshold
+
+    if flagged:
+        app.logger.warning('Possible N+1 query in %s: statement ran %d times: %s',
+                           endpoint, worst_repeats, worst_statement[:300])
+
+    response.headers.add('Server-Timing', f'db;dur={profile["db_time"] * 1000:.1f};desc="{profile["queries"]} queries"')
+    response.headers.add('Server-Timing', f'app;dur={wall * 1000:.1f}')
+
+    with _lock:
+        stats = _endpoint_stats.get(endpoint)
+        if stats is None:
+            stats = _endpoint_stats[endpoint] = EndpointStats(endpoint)
+        stats.requests += 1
+        stats.total_wall += wall
+        stats.max_wall = max(stats.max_wall, wall)
+        stats.total_db += profile['db_time']
+        stats.total_queries += profile['queries']
+        stats.max_queries = max(stats.max_queries, profile['queries'])
+        if flagged:
+            stats.n_plus_one += 1
+        if worst_repeats > stats.worst_repeats:
+            stats.worst_statement, stats.worst_repeats = worst_statement, worst_repeats
+
+    return response
+
+
+def init_app(app):
+    """Attach the profiler to the app's engines and request lifecycle"""
+    app.config.setdefault('PROFILING_N_PLUS_ONE_THRESHOLD', 5)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    app.before_request(_start_request)
+    app.after_request(lambda response: _finish_request(app, response))
@@ -0,0 +1,150 @@
+"""
+Bulk user provisioning from CSV or NDJSON (scripts/provision_users.py and
+POST /auth/admin/users/bulk).
+
+Every row is validated before anything is written: required fields and
+roles per row, duplicate usernames/emails inside the file with sets, and
+clashes with existing accounts with one IN query per column. Passwords are
+then hashed in a process pool (each hash is CPU-bound and independent),
+users are inserted in PROVISION_BATCH_SIZE flushes through the ORM so the
+change log sees them, and everything commits in one transaction. Rows
+without a password get a generated one, returned in that row's result.
+
+The admin endpoint only validates in the request; the provision_users job
+(app/tasks.py) does the hashing and inserts, as thousands of scrypt hashes
+take longer than gunicorn's request timeout.
+"""
+
+import csv
+import io
+import json
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing import get_context
+
+from flask import current_app
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import User, CampaignMembership
+
+FIELDS = ['username', 'email', 'password', 'role', 'character_name']
+ROLES = ['admin', 'dm', 'player']
+IN_CHUNK = 500  # Stay well under SQLite's bound-parameter limit
+
+
+def parse_rows(text, fmt):
+    """Rows from CSV (with a header line) or NDJSON text as dicts of FIELDS"""
+    if fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(text))
+        records = list(reader)
+    elif fmt == 'ndjson':
+        records = []
+        for number, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise ValueError(f'Line {number} is not valid JSON')
+            if not isinstance(record, dict):
+                raise ValueError(f'Line {number} is not a JSON object')
+            records.append(record)
+    else:
+        raise ValueError(f'Unknown format {fmt!r}; use csv or ndjson')
+
+    return normalize(records)
+
+
+def normalize(records):
+    """Keep FIELDS only, as stripped strings or None"""
+    return [{field: (str(record.get(field) or '').strip() or None) for field in FIELDS} for record in records]
+
+
+def _existing(column, values):
+    values = list(values)
+    found = set()
+    for start in range(0, len(values), IN_CHUNK):
+        chunk = values[start:start + IN_CHUNK]
+        found.update(value for (value,) in db.session.query(column).filter(column.in_(chunk)))
+    return found
+
+
+def validate(rows):
+    """Per-row error lists (empty when the row is valid), checked against the file and the database"""
+    errors = [[] for _ in rows]
+    seen = {'username': {}, 'email': {}}
+    for index, row in enumerate(rows):
+        if not row['username'] or not row['email']:
+            errors[index].append('Username and email are required')
+        if (row['role'] or 'player') not in ROLES:
+            errors[index].append('Invalid role')
+        for field in ('username', 'email'):
+            if row[field] in seen[field]:
+                errors[index].append(f'Duplicate {field} (row {seen[field][row[field]] + 1})')
+            elif row[field]:
+                seen[field][row[field]] = index
+
+    taken = {'username': _existing(User.username, seen['username']), 'email': _existing(User.email, seen['email'])}
+    for index, row in enumerate(rows):
+        for field in ('username', 'email'):
+            if row[field] in taken[field]:
+                errors[index].append(f'{field.capitalize()} already exists')
+    return errors
+
+
+def hash_passwords(passwords, method, processes):
+    """Hash passwords in parallel worker processes, in order"""
+    if len(passwords) < 2 or processes < 2:
+        return [generate_password_hash(password, method=method) for password in passwords]
+    processes = min(processes, len(passwords))
+    with ProcessPoolExecutor(processes, mp_context=get_context('spawn')) as pool:
+        return list(pool.map(generate_password_hash, passwords, repeat(method),
+                             chunksize=max(1, len(passwords) // (processes * 4))))
+
+
+def provision(rows, campaign_id=None, dry_run=False, skip_invalid=False):
+    """Validate and create users; returns (created count, per-row results). The caller commits."""
+    errors = validate(rows)
+    results = [{'row': index + 1, 'username': row['username'], 'status': 'error' if errors[index] else 'ok',
+                'errors': errors[index]} for index, row in enumerate(rows)]
+    valid = [index for index, row_errors in enumerate(errors) if not row_errors]
+    if dry_run or (len(valid) < len(rows) and not skip_invalid):
+        return 0, results
+
+    generated = {index: secrets.token_urlsafe(12) for index in valid if not rows[index]['password']}
+    hashes = hash_passwords(
+        [rows[index]['password'] or generated[index] for index in valid],
+        current_app.config['PASSWORD_HASH_METHOD'],
+        current_app.config['PROVISION_HASH_PROCESSES']
+    )
+
+    batch_size = current_app.config['PROVISION_BATCH_SIZE']
+    created = []
+    for start in range(0, len(valid), batch_size):
+        batch = []
+        for index, password_hash in zip(valid[start:start + batch_size], hashes[start:start + batch_size]):
+            row = rows[index]
+            user = User(username=row['username'], email=row['email'], role=row['role'] or 'player',
+                        character_name=row['character_name'], password_hash=password_hash)
+            batch.append(user)
+            created.append((index, user))
+        db.session.add_all(batch)
+        db.session.flush()
+        if campaign_id is not None:
+            db.session.add_all([CampaignMembership(campaign_id=campaign_id, user_id=user.id) for user in batch])
+            db.session.flush()
+
+    for index, user in created:
+        results[index].update(status='created', id=user.id)
+        if index in generated:
+            results[index]['password'] = generated[index]
+    return len(created), results
+
+
+def init_app(app):
+    app.config.setdefault('PROVISION_BATCH_SIZE', 500)
+    app.config.setdefault('PROVISION_HASH_PROCESSES', os.cpu_count() or 1)
+    app.config.setdefault('PROVISION_MAX_ROWS', 2000)
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+Read-only rows for the list endpoints.
+
+Loading Guild or PlayerNote instances just to serialize a handful of their
+attributes pays for identity-map bookkeeping, attribute instrumentation and
+change tracking, plus a lazy load per relationship touched. The queries
+here select exactly the columns (and joined names) each endpoint returns
+and keep them in NamedTuple rows, which are plain tuples with __slots__ = ():
+no per-row __dict__, no session state. scripts/bench_read_models.py
+compares them with the ORM path.
+
+They run through db.session.execute(), so campaign scoping and read
+replicas apply exactly as they do to the ORM queries. Use models for
+anything that writes.
+"""
+
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.models import District, Guild, GuildRelationship, PlayerNote, User
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+class DistrictRow(NamedTuple):
+    id: int
+    name: str
+    info: Optional[str]
+    status: Optional[str]
+    color: str
+    district_number: int
+    svg_path: str
+    label_x: int
+    label_y: int
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+    def to_dict(self):
+        """Same shape as District.to_dict()"""
+        data = self._asdict()
+        data['created_at'] = _isoformat(self.created_at)
+        data['updated_at'] = _isoformat(self.updated_at)
+        return data
+
+
+class GuildRow(NamedTuple):
+    id: int
+    name: str
+    description: Optional[str]
+    leadership: Optional[str]
+    status: Optional[str]
+    influence: Optional[str]
+    headquarters_district_id: Optional[int]
+    headquarters_name: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+    def to_dict(self):
+        data = self._asdict()
+        data['created_at'] = _isoformat(self.created_at)
+        data['updated_at'] = _isoformat(self.updated_at)
+        return data
+
+
+class RelationshipRow(NamedTuple):
+    id: int
+    guild_1_id: int
+    guild_1_name: str
+    guild_2_id: int
+    guild_2_name: str
+    relationship_type: str
+    description: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+    def to_dict(self):
+        data = self._asdict()
+        data['created_at'] = _isoformat(self.created_at)
+        data['updated_at'] = _isoformat(self.updated_at)
+        return data
+
+
+class NoteRow(NamedTuple):
+    id: int
+    user_id: int
+    username: str
+    character_name: Optional[str]
+    content: str
+    created_at: datetime
+    updated_at: datetime
+
+    @property
+    def display_name(self):
+        """Same as User.display_name"""
+        if self.character_name:
+            return f"{self.username} ({self.character_name})"
+        return self.username
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'username': self.display_name,
+            'content': self.content,
+            'created_at': _isoformat(self.created_at),
+            'updated_at': _isoformat(self.updated_at)
+        }
+
+
+def _rows(row_class, statement):
+    return [row_class._make(row) for row in db.session.execute(statement)]
+
+
+def list_districts():
+    """Every district in the current campaign, in creation order like the ORM list"""
+    return _rows(DistrictRow, db.select(*[getattr(District, field) for field in DistrictRow._fields])
+                 .order_by(District.id))
+
+
+def list_guilds():
+    """Every guild in the current campaign, with its headquarters' name"""
+    return _rows(GuildRow, db.select(
+        Guild.id, Guild.name, Guild.description, Guild.leadership, Guild.status, Guild.influence,
+        Guild.headquarters_district_id, District.name, Guild.created_at, Guild.updated_at
+    ).outerjoin(District, Guild.headquarters_district_id == District.id).order_by(Guild.id))
+
+
+def list_relationships():
+    """Every guild relationship in the current campaign, with both guilds' names"""
+    guild_1, guild_2 = aliased(Guild), aliased(Guild)
+    return _rows(RelationshipRow, db.select(
+        GuildRelationship.id, GuildRelationship.guild_1_id, guild_1.name, GuildRelationship.guild_2_id,
+        guild_2.name, GuildRelationship.relationship_type, GuildRelationship.description,
+        GuildRelationship.created_at, GuildRelationship.updated_at
+    ).join(guild_1, GuildRelationship.guild_1_id == guild_1.id)
+     .join(guild_2, GuildRelationship.guild_2_id == guild_2.id).order_by(GuildRelationship.id))
+
+
+def list_notes(target_type, target_id):
+    """Notes on a district or guild with their authors' names, most recently updated first"""
+    return _rows(NoteRow, db.select(
+        PlayerNote.id, PlayerNote.user_id, User.username, User.character_name, PlayerNote.content,
+        PlayerNote.created_at, PlayerNote.updated_at
+    ).join(User, PlayerNote.user_id == User.id).filter(
+        PlayerNote.target_type == target_type, PlayerNote.target_id == target_id
+    ).order_by(PlayerNote.updated_at.desc()))
@@ -0,0 +1,129 @@
+"""
+Read-replica routing (enabled by setting DATABASE_REPLICA_URLS).
+
+Each replica URL becomes a Flask-SQLAlchemy bind named replica_<n>. The
+RoutingSession sends plain SELECTs from GET/HEAD requests to the main and
+api blueprints to a healthy replica; everything else goes to the primary:
+writes, other blueprints, reads after the session has flushed, and every
+request for REPLICA_READ_YOUR_WRITES_SECONDS after the browser's last write
+(tracked in the session cookie so it works across workers).
+
+Lag is measured through the change log: a replica is behind by the age of
+the oldest primary change_log row it doesn't have yet. Replicas lagging more
+than REPLICA_MAX_LAG_SECONDS, or unreachable, are skipped until the next
+check, and reads fall back to the primary.
+"""
+
+import random
+import threading
+from datetime import datetime
+from time import time
+
+from flask import g, request, session, has_app_context, has_request_context
+from flask_sqlalchemy.session import Session
+
+REPLICA_BLUEPRINTS = ['main', 'api']
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+        if self._flushing or getattr(clause, 'is_dml', False):
+            # Later reads in this session must see the write
+            self.info['wrote_primary'] = True
+            if has_request_context():
+                g.wrote_primary = True
+            return engine
+
+        replica = g.get('replica_engine') if has_app_context() else None
+        if (replica is None or bind is not None or self.info.get('wrote_primary')
+                or engine is not self._db.engines.get(None)):
+            return engine
+        # Only plain SELECTs; text() and session.connection() stay on the primary
+        if getattr(clause, 'is_select', False):
+            return replica
+        return engine
+
+
+class ReplicaMonitor:
+    def __init__(self, app, primary, replicas):
+        self.app = app
+        self.primary = primary
+        self.replicas = replicas  # bind key -> engine
+        self.max_lag = app.config['REPLICA_MAX_LAG_SECONDS']
+        self.check_interval = app.config['REPLICA_LAG_CHECK_INTERVAL']
+        self.lag = {key: None for key in replicas}  # None = unreachable or not checked yet
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def measure_lag(self, engine):
+        """Seconds the replica is behind the primary, judged by the change log"""
+        from app.models.change_log import ChangeLogEntry
+        table = ChangeLogEntry.__table__
+        latest = table.select().with_only_columns(table.c.id).order_by(table.c.id.desc()).limit(1)
+
+        with engine.connect() as connection:
+            replica_sequence = connection.execute(latest).scalar() or 0
+        with self.primary.connect() as connection:
+            first_missing = connection.execute(
+                table.select().with_only_columns(table.c.created_at)
+                .where(table.c.id > replica_sequence).order_by(table.c.id).limit(1)
+            ).scalar()
+
+        if first_missing is None:
+            return 0.0
+        return max((datetime.utcnow() - first_missing).total_seconds(), 0.0)
+
+    def check(self):
+        for key, engine in self.replicas.items():
+            try:
+                lag = self.measure_lag(engine)
+            except Exception as e:
+                lag = None
+                if self.lag[key] is not None:
+                    self.app.logger.warning('Replica %s unreachable, reading from primary: %s', key, e)
+            if lag is not None and lag > self.max_lag and (self.lag[key] or 0) <= self.max_lag:
+                self.app.logger.warning('Replica %s is %.1f s behind, reading from primary', key, lag)
+            self.lag[key] = lag
+
+    def healthy_replicas(self):
+        """Replica engines currently within the lag limit (rechecked every REPLICA_LAG_CHECK_INTERVAL)"""
+        if time() - self._checked_at >= self.check_interval and self._lock.acquire(blocking=False):
+            try:
+                self.check()
+                self._checked_at = time()
+            finally:
+                self._lock.release()
+        return [self.replicas[key] for key, lag in self.lag.items() if lag is not None and lag <= self.max_lag]
+
+
+def init_app(app):
+    """Route eligible reads to the replica binds configured in SQLALCHEMY_BINDS"""
+    from app import db
+
+    app.config.setdefault('REPLICA_MAX_LAG_SECONDS', 5)
+    app.config.setdefault('REPLICA_LAG_CHECK_INTERVAL', 10)
+    app.config.setdefault('REPLICA_READ_YOUR_WRITES_SECONDS', 5)
+
+    with app.app_context():
+        replicas = {key: engine for key, engine in db.engines.items()
+                    if key and key.startswith('replica_')}
+        monitor = ReplicaMonitor(app, db.engines[None], replicas)
+    app.extensions['replicas'] = monitor
+
+    @app.before_request
+    def choose_replica():
+        if (request.method not in ['GET', 'HEAD'] or request.blueprint not in REPLICA_BLUEPRINTS
+                or session.get('read_primary_until', 0) > time()):
+            return
+        healthy = monitor.healthy_replicas()
+        if healthy:
+            g.replica_engine = random.choice(healthy)
+
+    @app.after_request
+    def remember_write(response):
+        # Send this browser's reads to the primary until replicas have caught up
+        if g.pop('wrote_primary', False):
+            session['read_primary_until'] = time() + app.config['REPLICA_READ_YOUR_WRITES_SECONDS']
+        return response
@@ -0,0 +1,265 @@
+import hmac
+import json
+import os
+import re
+from datetime import datetime
+from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, abort, Response, jsonify, send_file
+from flask_login import login_required, current_user
+
+bp = Blueprint('admin', __name__)
+
+PROFILE_ID = re.compile(r'cpu-\d+-\d+')
+
+@bp.route('/profiling')
+@login_required
+def profiling():
+    if current_user.role != 'admin':
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('main.index'))
+
+    enabled = current_app.config.get('PROFILING_ENABLED')
+    endpoints = []
+    if enabled:
+        from app.profiling import get_endpoint_stats
+        sort = request.args.get('sort', 'avg_wall_ms')
+        if sort not in ['avg_wall_ms', 'max_wall_ms', 'avg_db_ms', 'avg_queries', 'n_plus_one']:
+            sort = 'avg_wall_ms'
+        endpoints = get_endpoint_stats(sort)
+
+    return render_template('admin/profiling.html', enabled=enabled, endpoints=endpoints,
+                           threshold=current_app.config.get('PROFILING_N_PLUS_ONE_THRESHOLD'))
+
+@bp.route('/profiling/reset', methods=['POST'])
+@login_required
+def reset_profiling():
+    if current_user.role != 'admin':
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('main.index'))
+
+    if current_app.config.get('PROFILING_ENABLED'):
+        from app.profiling import reset_endpoint_stats
+        reset_endpoint_stats()
+    return redirect(url_for('admin.profiling'))
+
+@bp.route('/slow-queries')
+@login_required
+def slow_queries():
+    if current_user.role != 'admin':
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('main.index'))
+
+    recorder = current_app.extensions.get('slow_queries')
+    source = request.args.get('source', 'table' if current_app.config.get('SLOW_QUERY_PERSIST') else 'memory')
+    if recorder is None:
+        records = []
+    elif source == 'table':
+        from app.models import SlowQuery
+        records = SlowQuery.get_recent()
+    else:
+        records = recorder.recent()
+
+    return render_template('admin/slow_queries.html', enabled=recorder is not None, records=records,
+                           source=source, threshold=current_app.config.get('SLOW_QUERY_THRESHOLD_MS'))
+
+@bp.route('/metrics')
+def metrics():
+    registry = current_app.extensions.get('metrics')
+    if registry is None:
+        abort(404)
+
+    # Scrapers authenticate with a bearer token; admins can also view it from a browser session
+    token = current_app.config.get('METRICS_TOKEN')
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    token_ok = bool(token) and hmac.compare_digest(supplied, token)
+    if not token_ok and not (current_user.is_authenticated and current_user.role == 'admin'):
+        abort(403)
+
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+# On-demand profiling endpoints (404 unless PROFILER_ENABLED is set)
+
+@bp.route('/profiler/cpu', methods=['POST'])
+@login_required
+def start_cpu_profile():
+    if not current_app.config.get('PROFILER_ENABLED'):
+        abort(404)
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+
+    from app import sampling_profiler
+    max_seconds = current_app.config['PROFILER_MAX_SECONDS']
+    seconds = min(max(request.args.get('seconds', 10, type=float), 1), max_seconds)
+    interval = max(request.args.get('interval_ms', 10, type=float), 1) / 1000
+
+    try:
+        profile_id = sampling_profiler.start_cpu_profile(current_app.config['PROFILER_OUTPUT_DIR'], seconds, interval)
+    except sampling_profiler.ProfilerBusy:
+        return jsonify({'error': 'A CPU profile is already running in this worker'}), 409
+
+    return jsonify({
+        'profile_id': profile_id,
+        'seconds': seconds,
+        'result_url': url_for('admin.get_cpu_profile', profile_id=profile_id)
+    }), 202
+
+@bp.route('/profiler/cpu/<profile_id>', methods=['GET'])
+@login_required
+def get_cpu_profile(profile_id):
+    if not current_app.config.get('PROFILER_ENABLED'):
+        abort(404)
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+
+    from app import sampling_profiler
+    output_dir = current_app.config['PROFILER_OUTPUT_DIR']
+    if not PROFILE_ID.fullmatch(profile_id):
+        abort(404)
+
+    status = sampling_profiler.cpu_profile_status(output_dir, profile_id)
+    if status is None:
+        abort(404)
+    if status == 'running':
+        return jsonify({'profile_id': profile_id, 'status': 'running'}), 202
+    if status == 'failed':
+        return jsonify({'profile_id': profile_id, 'status': 'failed',
+                        'error': 'The profile did not finish; start a new one'}), 500
+
+    return send_file(sampling_profiler.profile_path(output_dir, profile_id), mimetype='text/plain',
+                     as_attachment=True, download_name=f'{profile_id}.collapsed')
+
+@bp.route('/profiler/memory/start', methods=['POST'])
+@login_required
+def start_memory_profile():
+    if not current_app.config.get('PROFILER_ENABLED'):
+        abort(404)
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+
+    from app import sampling_profiler
+    frames = min(max(request.args.get('frames', 10, type=int), 1), 50)
+    sampling_profiler.start_memory_tracing(frames)
+    return jsonify({'message': 'Memory tracing started; baseline snapshot taken', 'frames': frames})
+
+@bp.route('/profiler/memory', methods=['GET'])
+@login_required
+def memory_profile():
+    if not current_app.config.get('PROFILER_ENABLED'):
+        abort(404)
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+
+    from app import sampling_profiler
+    report = sampling_profiler.memory_report(
+        limit=min(request.args.get('limit', 25, type=int), 200),
+        diff=request.args.get('diff') == '1'
+    )
+    if report is None:
+        return jsonify({'error': 'Memory tracing is not running in this worker. POST to /admin/profiler/memory/start first.'}), 409
+    return jsonify(report)
+
+@bp.route('/profiler/memory/stop', methods=['POST'])
+@login_required
+def stop_memory_profile():
+    if not current_app.config.get('PROFILER_ENABLED'):
+        abort(404)
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+
+    from app import sampling_profiler
+    sampling_profiler.stop_memory_tracing()
+    return jsonify({'message': 'Memory tracing stopped'})
+
+# Background jobs (worked by scripts/run_jobs.py)
+
+@bp.route('/jobs', methods=['GET'])
+@login_required
+def jobs():
+    if current_user.role != 'admin':
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('main.index'))
+
+    from app.jobs import load_tasks
+    from app.models import Job
+    return render_template('admin/jobs.html', jobs=Job.get_recent(), counts=Job.count_by_status(),
+                           tasks=sorted(load_tasks().values(), key=lambda spec: spec.name))
+
+@bp.route('/jobs', methods=['POST'])
+@login_required
+def enqueue_job():
+    if current_user.role != 'admin':
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('main.index'))
+
+    from app import db
+    from app.jobs import enqueue
+    from app.tenancy import current_campaign_id
+
+    try:
+        args = json.loads(request.form.get('args') or '{}')
+        if not isinstance(args, dict):
+            raise ValueError('Arguments must be a JSON object')
+        job = enqueue(request.form.get('name', ''), args, campaign_id=current_campaign_id(), created_by=current_user)
+    except ValueError as e:
+        flash(f'Could not queue job: {e}', 'error')
+        return redirect(url_for('admin.jobs'))
+
+    db.session.commit()
+    flash(f'Queued job {job.id} ({job.name})', 'success')
+    return redirect(url_for('admin.jobs'))
+
+@bp.route('/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def job_status(job_id):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+
+    from app import db
+    from app.models import Job
+    job = Job.query.get_or_404(job_id)
+    status = job.to_dict()
+    # Generated passwords are shown once, to the admin who started the job, then dropped
+    if job.status == 'succeeded' and job.secrets is not None and job.created_by_id == current_user.id:
+        status['secrets'] = job.secrets
+        job.secrets = None
+        db.session.commit()
+    return jsonify(status)
+
+@bp.route('/jobs/<int:job_id>/retry', methods=['POST'])
+@login_required
+def retry_job(job_id):
+    if current_user.role != 'admin':
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('main.index'))
+
+    from app import db
+    from app.models import Job
+    job = Job.query.get_or_404(job_id)
+    if job.status != 'failed':
+        flash('Only failed jobs can be retried.', 'error')
+        return redirect(url_for('admin.jobs'))
+
+    # A manual retry gets a fresh set of attempts
+    job.status = 'queued'
+    job.attempts = 0
+    job.run_after = datetime.utcnow()
+    job.finished_at = None
+    db.session.commit()
+    flash(f'Job {job.id} queued again', 'success')
+    return redirect(url_for('admin.jobs'))
+
+@bp.route('/jobs/<int:job_id>/download', methods=['GET'])
+@login_required
+def download_job_result(job_id):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+
+    from app.models import Job
+    job = Job.query.get_or_404(job_id)
+    filename = (job.result or {}).get('file') if job.status == 'succeeded' else None
+    if not filename or os.path.basename(filename) != filename:
+        abort(404)
+
+    path = os.path.join(current_app.config['JOB_EXPORT_DIR'], filename)
+    if not os.path.exists(path):
+        abort(404)
+    return send_file(os.path.abspath(path), mimetype='application/json', as_attachment=True, download_name=filename)
\ No newline at end of file
@@ -1,15 +1,27 @@
-from flask import Blueprint, jsonify, request
+from datetime import datetime
+from flask import Blueprint, current_app, jsonify, request
 from flask_login import login_required, current_user
-from app import db
-from app.models import District, PlayerNote, Guild, GuildRelationship
+from sqlalchemy.exc import IntegrityError
+from app import db, limiter
+from app.autocomplete import autocomplete, KINDS as AUTOCOMPLETE_KINDS
+from app.batch import BatchRunner, BatchError, MAX_OPERATIONS
+from app.note_drafts import note_drafts, to_timestamp
+from app.read_models import list_districts, list_guilds, list_relationships, list_notes
+from app.tenancy import current_campaign_id
+from app.warmup import reference_cache
+from app.models import (District, DistrictStats, PlayerNote, PlayerNoteRevision, Guild, GuildRelationship,
+                        ChangeLogEntry, User, Campaign, CampaignMembership)
 
 bp = Blueprint('api', __name__)
 
 @bp.route('/districts', methods=['GET'])
 @login_required
 def get_districts():
-    districts = District.query.all()
-    return jsonify([district.to_dict() for district in districts])
+    return jsonify(reference_cache().get('districts', load_districts))
+
+def load_districts():
+    """Serialized district list, cached per worker until the next change"""
+    return [district.to_dict() for district in list_districts()]
 
 @bp.route('/districts/<int:district_id>', methods=['GET', 'PUT', 'DELETE'])
 @login_required
@@ -26,6 +38,8 @@ def district_detail(district_id):
             return jsonify({'error': 'No JSON data provided'}), 400
         
         for k,v in data.items():
+            if k in ['id', 'campaign_id']:
+                continue  # Districts cannot be moved between campaigns
             setattr(district, k,v)
         db.session.commit()
         return jsonify({'success':True, 'district': district.to_dict()})
@@ -71,6 +85,34 @@ def district_detail(district_id):
     else:
         return jsonify({'message': f'District {district_id} detail'})
 
+@bp.route('/overview', methods=['GET'])
+@login_required
+def get_overview():
+    """Guild, influence, relationship and note aggregates for every district, for map overlays"""
+    return jsonify(reference_cache().get('overview', DistrictStats.get_overview))
+
+@bp.route('/autocomplete', methods=['GET'])
+@login_required
+@limiter.limit("600 per minute")
+def get_autocomplete():
+    """Type-ahead suggestions for guild, district and player names"""
+    query = request.args.get('q', '').strip()
+    kinds = request.args.get('types', ','.join(AUTOCOMPLETE_KINDS)).split(',')
+    if not set(kinds) <= set(AUTOCOMPLETE_KINDS):
+        return jsonify({'error': f'types must be a subset of {", ".join(AUTOCOMPLETE_KINDS)}'}), 400
+
+    campaign_id = current_campaign_id()
+    user_filter = None
+    if current_user.role != 'admin':
+        # Only players in the current campaign; admins can find anyone
+        def user_filter(user_ids):
+            return [user_id for (user_id,) in db.session.query(CampaignMembership.user_id).filter(
+                CampaignMembership.campaign_id == campaign_id, CampaignMembership.user_id.in_(user_ids))]
+
+    limit = min(request.args.get('limit', 10, type=int), current_app.config['AUTOCOMPLETE_MAX_RESULTS'])
+    results = autocomplete().search(query, campaign_id, kinds, max(limit, 1), user_filter)
+    return jsonify({'query': query, 'results': results})
+
 # Player Notes API endpoints
 
 @bp.route('/notes/<target_type>/<int:target_id>', methods=['GET'])
@@ -80,21 +122,72 @@ def get_notes(target_type, target_id):
     if target_type not in ['district', 'guild']:
         return jsonify({'error': 'Invalid target type'}), 400
     
-    notes = PlayerNote.get_notes_for_target(target_type, target_id)
+    notes = list_notes(target_type, target_id)
+    drafts = note_drafts().pending_for_target(current_campaign_id(), target_type, target_id)
     
     notes_data = []
     for note in notes:
-        notes_data.append({
-            'id': note.id,
-            'user_id': note.user_id,
-            'username': note.user.display_name,
-            'content': note.content,
-            'created_at': note.created_at.isoformat(),
-            'updated_at': note.updated_at.isoformat()
-        })
+        note_data = note.to_dict()
+        # Autosaved edits that have not been flushed yet win over older saved content
+        draft = drafts.pop(note.user_id, None)
+        if draft and draft[0] > to_timestamp(note.updated_at):
+            note_data['content'] = draft[1]
+            note_data['updated_at'] = datetime.utcfromtimestamp(draft[0]).isoformat()
+            note_data['pending'] = True
+        notes_data.append(note_data)
+
+    # Drafts for notes that do not exist yet
+    if drafts:
+        users = {user.id: user for user in User.query.filter(User.id.in_(drafts.keys()))}
+        for user_id, (ts, content) in sorted(drafts.items(), key=lambda item: item[1][0], reverse=True):
+            if user_id not in users:
+                continue
+            edited_at = datetime.utcfromtimestamp(ts).isoformat()
+            notes_data.insert(0, {
+                'id': None,
+                'user_id': user_id,
+                'username': users[user_id].display_name,
+                'content': content,
+                'created_at': edited_at,
+                'updated_at': edited_at,
+                'pending': True
+            })
     
     return jsonify(notes_data)
 
+@bp.route('/notes/draft', methods=['PUT'])
+@login_required
+@limiter.limit("120 per minute")
+def save_note_draft():
+    """Autosave the current user's note; written to the database in the background"""
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'No JSON data provided'}), 400
+    
+    target_type = data.get('target_type')
+    target_id = data.get('target_id')
+    content = data.get('content', '').strip()
+    
+    if target_type not in ['district', 'guild']:
+        return jsonify({'error': 'Invalid target type'}), 400
+    
+    if not content:
+        return jsonify({'error': 'Content is required'}), 400
+    
+    if not isinstance(target_id, int) or isinstance(target_id, bool):
+        return jsonify({'error': 'Target ID is required'}), 400
+
+    # The flush runs outside this request, so the campaign has to travel with the draft
+    if current_campaign_id() is None:
+        return jsonify({'error': 'You are not a member of any campaign'}), 403
+
+    saved_at = note_drafts().save(current_campaign_id(), current_user.id, target_type, target_id, content)
+    
+    return jsonify({
+        'message': 'Draft saved',
+        'saved_at': datetime.utcfromtimestamp(saved_at).isoformat()
+    }), 202
+
 @bp.route('/notes', methods=['POST'])
 @login_required
 def create_note():
@@ -116,44 +209,31 @@ def create_note():
     if not target_id:
         return jsonify({'error': 'Target ID is required'}), 400
     
-    # Check if user already has a note for this target
-    existing_note = PlayerNote.get_user_note_for_target(
-        current_user.id, target_type, target_id
-    )
+    # One statement creates the note or finds the user's existing one
+    note, created = PlayerNote.upsert(current_campaign_id(), current_user.id, target_type, target_id, content)
+    db.session.flush()
     
-    if existing_note:
-        # Update existing note instead of creating new one
-        existing_note.content = content
-        db.session.commit()
-        
-        return jsonify({
-            'message': 'Note updated successfully',
+    if created:
+        response = {
+            'message': 'Note created successfully',
             'note': {
-                'id': existing_note.id,
-                'content': existing_note.content,
-                'updated_at': existing_note.updated_at.isoformat()
+                'id': note.id,
+                'content': note.content,
+                'created_at': note.created_at.isoformat()
             }
-        })
+        }
     else:
-        # Create new note
-        note = PlayerNote(
-            user_id=current_user.id,
-            target_type=target_type,
-            target_id=target_id,
-            content=content
-        )
-        
-        db.session.add(note)
-        db.session.commit()
-        
-        return jsonify({
-            'message': 'Note created successfully',
+        response = {
+            'message': 'Note updated successfully',
             'note': {
                 'id': note.id,
                 'content': note.content,
-                'created_at': note.created_at.isoformat()
+                'updated_at': note.updated_at.isoformat()
             }
-        })
+        }
+    db.session.commit()
+    
+    return jsonify(response)
 
 @bp.route('/notes/<int:note_id>', methods=['PUT'])
 @login_required
@@ -185,6 +265,35 @@ def update_note(note_id):
         }
     })
 
+@bp.route('/notes/<int:note_id>/revisions', methods=['GET'])
+@login_required
+def get_note_revisions(note_id):
+    """Earlier versions of a note, newest first"""
+    note = PlayerNote.query.get_or_404(note_id)
+    return jsonify({
+        'note_id': note.id,
+        'current_version': note.version,
+        'revisions': [revision.to_dict() for revision in PlayerNoteRevision.get_for_note(note.id)]
+    })
+
+@bp.route('/notes/<int:note_id>/revisions/<int:number>', methods=['GET'])
+@login_required
+def get_note_revision(note_id, number):
+    """The text of one version of a note"""
+    note = PlayerNote.query.get_or_404(note_id)
+    content = PlayerNoteRevision.content_at(note, number)
+    if content is None:
+        return jsonify({'error': 'Revision not found'}), 404
+
+    revision = PlayerNoteRevision.query.filter_by(note_id=note.id, number=number).first()
+    return jsonify({
+        'note_id': note.id,
+        'number': number,
+        'current': number == note.version,
+        'content': content,
+        'created_at': (revision.created_at if revision else note.updated_at).isoformat()
+    })
+
 @bp.route('/notes/<int:note_id>', methods=['DELETE'])
 @login_required
 def delete_note(note_id):
@@ -195,6 +304,8 @@ def delete_note(note_id):
     if note.user_id != current_user.id and current_user.role != 'admin':
         return jsonify({'error': 'Permission denied'}), 403
     
+    # Keep an autosave that has not been flushed yet from bringing the note back
+    note_drafts().discard(note.campaign_id, note.user_id, note.target_type, note.target_id)
     db.session.delete(note)
     db.session.commit()
     
@@ -206,25 +317,11 @@ def delete_note(note_id):
 @login_required
 def get_guilds():
     """Get all guilds"""
-    guilds = Guild.query.all()
-    guilds_data = []
-    
-    for guild in guilds:
-        guild_data = {
-            'id': guild.id,
-            'name': guild.name,
-            'description': guild.description,
-            'leadership': guild.leadership,
-            'status': guild.status,
-            'influence': guild.influence,
-            'headquarters_district_id': guild.headquarters_district_id,
-            'headquarters_name': guild.headquarters.name if guild.headquarters else None,
-            'created_at': guild.created_at.isoformat(),
-            'updated_at': guild.updated_at.isoformat()
-        }
-        guilds_data.append(guild_data)
-    
-    return jsonify(guilds_data)
+    return jsonify(reference_cache().get('guilds', load_guilds))
+
+def load_guilds():
+    """Serialized guild list, cached per worker until the next change"""
+    return [guild.to_dict() for guild in list_guilds()]
 
 @bp.route('/guilds/<int:guild_id>', methods=['GET', 'PUT', 'DELETE'])
 @login_required
@@ -344,23 +441,7 @@ def create_guild():
 @login_required
 def get_guild_relationships():
     """Get all guild relationships"""
-    relationships = GuildRelationship.query.all()
-    relationships_data = []
-    
-    for rel in relationships:
-        relationships_data.append({
-            'id': rel.id,
-            'guild_1_id': rel.guild_1_id,
-            'guild_1_name': rel.guild_1.name,
-            'guild_2_id': rel.guild_2_id,
-            'guild_2_name': rel.guild_2.name,
-            'relationship_type': rel.relationship_type,
-            'description': rel.description,
-            'created_at': rel.created_at.isoformat(),
-            'updated_at': rel.updated_at.isoformat()
-        })
-    
-    return jsonify(relationships_data)
+    return jsonify([relationship.to_dict() for relationship in list_relationships()])
 
 @bp.route('/guild-relationships', methods=['POST'])
 @login_required
@@ -445,4 +526,180 @@ def manage_guild_relationship(relationship_id):
     elif request.method == 'DELETE':
         db.session.delete(relationship)
         db.session.commit()
-        return jsonify({'success': True, 'message': 'Guild relationship deleted successfully'})
\ No newline at end of file
+        return jsonify({'success': True, 'message': 'Guild relationship deleted successfully'})
+
+# Player roster API endpoint
+
+@bp.route('/roster', methods=['GET'])
+@login_required
+def get_roster():
+    """Get a page of active players with their quick references"""
+    if current_user.role not in ['admin', 'dm']:
+        return jsonify({'error': 'Permission denied. Only DMs and Admins can view the player roster.'}), 403
+
+    roster = User.get_player_roster(
+        current_campaign_id(),
+        sort=request.args.get('sort', 'username'),
+        descending=request.args.get('order') == 'desc',
+        search=request.args.get('q', '').strip() or None,
+        class_name=request.args.get('class_name', '').strip() or None,
+        evasion_above=request.args.get('evasion_above', type=int),
+        experience=request.args.get('experience', '').strip() or None
+    )
+    pagination = roster.paginate(page=request.args.get('page', 1, type=int),
+                                 per_page=request.args.get('per_page', 50, type=int),
+                                 max_per_page=200, error_out=False)
+
+    return jsonify({
+        'players': [player.to_roster_dict() for player in pagination.items],
+        'page': pagination.page,
+        'per_page': pagination.per_page,
+        'total': pagination.total,
+        'pages': pagination.pages
+    })
+
+# Batch API endpoint
+
+@bp.route('/batch', methods=['POST'])
+@login_required
+def batch():
+    """Apply an ordered list of operations in a single all-or-nothing transaction"""
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'No JSON data provided'}), 400
+
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'A non-empty list of operations is required'}), 400
+
+    if len(operations) > MAX_OPERATIONS:
+        return jsonify({'error': f'A batch can contain at most {MAX_OPERATIONS} operations'}), 400
+
+    try:
+        results = BatchRunner(operations).run()
+        db.session.commit()
+    except BatchError as e:
+        db.session.rollback()
+        results = []
+        for index, operation in enumerate(operations):
+            if index < e.index:
+                results.append({'index': index, 'status': 'rolled_back'})
+            elif index == e.index:
+                results.append({'index': index, 'status': 'error', 'error': e.message})
+            else:
+                results.append({'index': index, 'status': 'skipped'})
+        return jsonify({'success': False, 'error': e.message, 'failed_index': e.index, 'results': results}), e.status
+    except IntegrityError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': f'Batch violates a database constraint: {e.orig}'}), 400
+
+    return jsonify({'success': True, 'results': results})
+
+# Change feed API endpoints
+
+@bp.route('/changes', methods=['GET'])
+@login_required
+def get_changes():
+    """Get changes recorded after a sequence number so clients can sync deltas"""
+    since = request.args.get('since', 0, type=int)
+    limit = min(request.args.get('limit', 500, type=int), 1000)
+
+    campaign_id = current_campaign_id()
+    latest = ChangeLogEntry.latest_sequence(campaign_id)
+    oldest = ChangeLogEntry.oldest_sequence()
+
+    # Entries the client still needs were compacted away; it must refetch everything
+    if since and oldest is not None and since < oldest - 1:
+        return jsonify({'reset': True, 'latest': latest, 'changes': []})
+
+    changes = ChangeLogEntry.get_changes_since(since, limit, campaign_id, current_user)
+
+    # The cursor only moves past settled entries: one committed out of sequence order
+    # still lands above it, and clients skip the unsettled entries they get again
+    next_sequence = ChangeLogEntry.settled_sequence(changes, since)
+    response = {
+        'reset': False,
+        'latest': latest,
+        'next': next_sequence,
+        'has_more': bool(changes) and next_sequence > since and changes[-1].id < latest,
+        'changes': [change.to_dict() for change in changes]
+    }
+    if changes and next_sequence == since:
+        # Nothing here has settled, so asking again before it does returns the same page
+        response['retry_after'] = ChangeLogEntry.seconds_to_settle(changes)
+    return jsonify(response)
+
+# Campaign API endpoints
+
+@bp.route('/campaigns', methods=['GET'])
+@login_required
+def get_campaigns():
+    """Get the campaigns the current user can switch to"""
+    campaign_id = current_campaign_id()
+    return jsonify([
+        dict(campaign.to_dict(), current=campaign.id == campaign_id)
+        for campaign in Campaign.get_user_campaigns(current_user)
+    ])
+
+@bp.route('/campaigns', methods=['POST'])
+@login_required
+def create_campaign():
+    """Create a new campaign"""
+    # Only Admins can create campaigns
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Permission denied. Only Admins can create campaigns.'}), 403
+
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'No JSON data provided'}), 400
+
+    name = (data.get('name') or '').strip()
+    if not name:
+        return jsonify({'error': 'Campaign name is required'}), 400
+
+    campaign = Campaign(name=name)
+    db.session.add(campaign)
+    db.session.add(CampaignMembership(campaign=campaign, user=current_user))
+    db.session.commit()
+
+    return jsonify({'success': True, 'campaign': campaign.to_dict()})
+
+@bp.route('/campaigns/<int:campaign_id>/members', methods=['GET', 'POST'])
+@login_required
+def campaign_members(campaign_id):
+    """List or add members of a campaign"""
+    # Only Admins can manage campaign membership
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Permission denied. Only Admins can manage campaign members.'}), 403
+
+    campaign = Campaign.query.get_or_404(campaign_id)
+
+    if request.method == 'GET':
+        members = User.query.join(CampaignMembership).filter(
+            CampaignMembership.campaign_id == campaign.id
+        ).order_by(User.username).all()
+        return jsonify([{'id': user.id, 'username': user.username, 'role': user.role} for user in members])
+
+    data = request.get_json()
+    if not data or not data.get('user_id'):
+        return jsonify({'error': 'User ID is required'}), 400
+
+    user = User.query.get_or_404(data['user_id'])
+    if CampaignMembership.is_member(campaign.id, user.id):
+        return jsonify({'error': 'User is already a member of this campaign'}), 400
+
+    db.session.add(CampaignMembership(campaign=campaign, user=user))
+    db.session.commit()
+    return jsonify({'success': True, 'message': f'{user.username} added to {campaign.name}'})
+
+@bp.route('/campaigns/<int:campaign_id>/members/<int:user_id>', methods=['DELETE'])
+@login_required
+def remove_campaign_member(campaign_id, user_id):
+    """Remove a user from a campaign"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Permission denied. Only Admins can manage campaign members.'}), 403
+
+    membership = CampaignMembership.query.filter_by(campaign_id=campaign_id, user_id=user_id).first_or_404()
+    db.session.delete(membership)
+    db.session.commit()
+    return jsonify({'success': True, 'message': 'Member removed'})
\ No newline at end of file
@@ -1,7 +1,9 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, current_app
 from flask_login import login_user, logout_user, login_required, current_user
-from app.models import User, CharacterQuickRef
+from app.models import User, CharacterQuickRef, CampaignMembership, UserArchive
+from app.tenancy import current_campaign_id
 from app import db, limiter
+from app.passwords import PasswordHashBusy
 from flask_limiter.errors import RateLimitExceeded
 
 bp = Blueprint('auth', __name__)
@@ -11,6 +13,17 @@ def rate_limit_exceeded(e):
     flash('Too many login attempts. Please wait a minute before trying again.', 'error')
     return render_template('auth/login.html'), 429
 
+@bp.errorhandler(PasswordHashBusy)
+def password_hash_busy(e):
+    # Every password hash slot in this worker is taken, usually by a login burst
+    message = 'The server is busy signing people in. Please try again in a moment.'
+    if request.is_json:
+        return jsonify({'error': message}), 503
+    flash(message, 'error')
+    if request.endpoint == 'auth.login':
+        return render_template('auth/login.html'), 503
+    return redirect(request.path)
+
 @bp.route('/login', methods=['GET', 'POST'])
 @limiter.limit("10 per minute", methods=["POST"])
 def login():
@@ -28,6 +41,10 @@ def login():
             if user.is_deleted():
                 flash('This account has been deactivated', 'error')
             else:
+                # Move hashes made under an older PASSWORD_HASH_METHOD to the current one
+                if user.password_needs_rehash():
+                    user.set_password(password)
+                    db.session.commit()
                 login_user(user, remember=remember_me)
                 next_page = request.args.get('next')
                 if not next_page:
@@ -83,6 +100,9 @@ def create_user():
     user = User(username=username, email=email, role=role)
     user.set_password(password)
     db.session.add(user)
+    # New users join the campaign the admin is currently working in
+    if current_campaign_id() is not None:
+        db.session.add(CampaignMembership(campaign_id=current_campaign_id(), user=user))
     db.session.commit()
     
     return jsonify({
@@ -95,6 +115,61 @@ def create_user():
         }
     })
 
+@bp.route('/admin/users/bulk', methods=['POST'])
+@login_required
+@limiter.limit("10 per hour")
+def bulk_create_users():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+
+    from app import provisioning
+
+    # A CSV/NDJSON upload, or JSON {"users": [{username, email, password, role, character_name}, ...]}
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            fmt = request.form.get('format') or ('csv' if upload.filename.lower().endswith('.csv') else 'ndjson')
+            rows = provisioning.parse_rows(upload.read().decode('utf-8-sig'), fmt)
+        else:
+            data = request.get_json(silent=True) or {}
+            if not isinstance(data.get('users'), list) or not all(isinstance(u, dict) for u in data['users']):
+                return jsonify({'error': 'Upload a CSV/NDJSON file or send {"users": [...]}'}), 400
+            rows = provisioning.normalize(data['users'])
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not rows:
+        return jsonify({'error': 'No users to create'}), 400
+    if len(rows) > current_app.config['PROVISION_MAX_ROWS']:
+        return jsonify({'error': f"At most {current_app.config['PROVISION_MAX_ROWS']} users per request"}), 400
+
+    # Validation is cheap and answered here; nothing is written while any row is invalid, unless skip_invalid=1
+    dry_run = request.args.get('dry_run') == '1'
+    skip_invalid = request.args.get('skip_invalid') == '1'
+    _, results = provisioning.provision(rows, dry_run=True)
+    invalid = sum(1 for result in results if result['errors'])
+    if dry_run or (invalid and not skip_invalid) or invalid == len(rows):
+        return jsonify({
+            'created': 0,
+            'invalid': invalid,
+            'results': results
+        }), 400 if invalid and not dry_run else 200
+
+    # Hashing thousands of passwords outlasts the request timeout, so the job runner creates the users.
+    # They join the campaign the admin is currently working in. The passwords travel as job secrets,
+    # which are dropped after JOB_SECRETS_TTL and never shown in the job listings.
+    from app.jobs import enqueue
+    job = enqueue('provision_users', {'rows': [{**row, 'password': None} for row in rows], 'skip_invalid': skip_invalid},
+                  campaign_id=current_campaign_id(), created_by=current_user, priority=1,
+                  secrets={'passwords': [row['password'] for row in rows]})
+    db.session.commit()
+    return jsonify({
+        'job_id': job.id,
+        'status_url': url_for('admin.job_status', job_id=job.id),
+        'invalid': invalid,
+        'results': results
+    }), 202
+
 @bp.route('/admin/users/<int:user_id>', methods=['DELETE'])
 @login_required
 def delete_user(user_id):
@@ -112,6 +187,36 @@ def delete_user(user_id):
     
     return jsonify({'message': 'User deleted successfully'})
 
+@bp.route('/admin/users/deleted')
+@login_required
+def deleted_users():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+
+    users = User.get_deleted_users().all()
+    return jsonify({'users': [{
+        'id': user.id,
+        'username': user.username,
+        'deleted_at': user.deleted_at.isoformat(),
+        'archive': user.archive.to_dict() if user.archive else None
+    } for user in users]})
+
+@bp.route('/admin/users/<int:user_id>/restore', methods=['POST'])
+@login_required
+def restore_user(user_id):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+
+    user = User.query.get_or_404(user_id)
+    if not user.is_deleted():
+        return jsonify({'error': 'User is not deleted'}), 400
+
+    # Brings back archived notes and quick refs as well as the account
+    restored = UserArchive.restore_user(user)
+    db.session.commit()
+
+    return jsonify({'message': f'{user.username} restored', 'restored_rows': restored})
+
 @bp.route('/admin/users/<int:user_id>/reset-password', methods=['POST'])
 @login_required
 def reset_user_password(user_id):
@@ -264,10 +369,15 @@ def admin_quick_references():
         flash('Access denied. Admin or DM privileges required.', 'error')
         return redirect(url_for('main.index'))
 
-    # Get all active players with their quick references
-    players = User.get_active_players().all()
+    # Get active players with their quick references in a fixed number of queries
+    evasion_above = request.args.get('evasion_above', type=int)
+    experience = request.args.get('experience', '').strip()
+    roster = User.get_player_roster(current_campaign_id(), evasion_above=evasion_above, experience=experience)
+    pagination = roster.paginate(page=request.args.get('page', 1, type=int),
+                                 per_page=50, error_out=False)
 
-    return render_template('auth/admin_quick_references.html', players=players)
+    return render_template('auth/admin_quick_references.html', players=pagination.items,
+                           pagination=pagination, evasion_above=evasion_above, experience=experience)
 
 
 @bp.route('/admin/quick-references/<int:user_id>', methods=['PUT'])
@@ -279,6 +389,8 @@ def update_player_quick_ref(user_id):
     user = User.query.get_or_404(user_id)
     if user.role != 'player':
         return jsonify({'error': 'User is not a player'}), 400
+    if not CampaignMembership.is_member(current_campaign_id(), user.id):
+        return jsonify({'error': 'User is not a member of this campaign'}), 404
 
     # Get or create quick reference
     quick_ref = CharacterQuickRef.query.filter_by(user_id=user_id).first()
@@ -1,7 +1,7 @@
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, render_template, jsonify, current_app, session, flash, redirect, url_for
 from flask_login import login_required, current_user
-from app.models import District, User
-from app import db
+from app.models import District, User, Campaign
+from app import db, limiter
 import os
 
 bp = Blueprint('main', __name__)
@@ -25,4 +25,34 @@ def guilds():
 @login_required
 def guild_info():
     # All users can access guild information
-    return render_template('guild_info.html')
\ No newline at end of file
+    return render_template('guild_info.html')
+
+@bp.route('/campaigns/<int:campaign_id>/switch', methods=['POST'])
+@login_required
+def switch_campaign(campaign_id):
+    if Campaign.resolve_for(current_user, campaign_id) != campaign_id:
+        flash('You are not a member of that campaign.', 'error')
+        return redirect(url_for('main.index'))
+
+    session['campaign_id'] = campaign_id
+    return redirect(url_for('main.index'))
+
+@bp.route('/readyz')
+@limiter.exempt
+def readyz():
+    # Load balancer probe: 503 until this worker has warmed up and can reach the database
+    from app.warmup import warm_up
+    state = current_app.extensions['warmup']
+    if not state['ready']:
+        # Covers servers without the gunicorn hook (e.g. `flask run`) and failed warm-ups
+        warm_up(current_app._get_current_object())
+        if not state['ready']:
+            return jsonify({'status': 'warming', 'pid': os.getpid()}), 503
+
+    try:
+        db.session.execute(db.text('SELECT 1'))
+    except Exception:
+        current_app.logger.exception('Readiness check could not reach the database')
+        return jsonify({'status': 'database unavailable', 'pid': os.getpid()}), 503
+
+    return jsonify({'status': 'ready', 'pid': os.getpid(), 'warmup_ms': state['timings']})
\ No newline at end of file
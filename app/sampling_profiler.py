@@ -0,0 +1,178 @@
+"""
+On-demand CPU sampling and memory snapshots for the /admin/profiler endpoints.
+
+The CPU profiler is a background thread that samples every other thread's
+stack with sys._current_frames() at a fixed interval and writes the result
+as collapsed stacks ("outer;inner;leaf count" per line), the input format
+of flamegraph.pl and speedscope. Output files land in PROFILER_OUTPUT_DIR
+so any worker on the host can serve a finished profile. A "<id>.running"
+marker next to them records the pid and deadline of each started profile,
+so any worker can also tell one still sampling from one whose worker died
+or whose sampler failed ("<id>.failed").
+
+Memory snapshots use tracemalloc, which is only started on request because
+tracing every allocation slows the worker noticeably while it is on.
+"""
+
+import json
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from time import sleep, time, perf_counter
+
+_lock = threading.Lock()
+_running = {}  # profile id -> thread, for profiles started by this worker
+_memory_baseline = None
+
+# Seconds past its deadline a profile may take to write its output before it counts as failed
+FINISH_GRACE = 30
+
+
+class ProfilerBusy(Exception):
+    """A CPU profile is already running in this worker"""
+
+
+def _frame_label(code):
+    return f'{os.path.basename(code.co_filename)}:{code.co_qualname}'
+
+
+def _sample_stacks(duration, interval, ignore_thread):
+    stacks = Counter()
+    deadline = perf_counter() + duration
+    samples = 0
+    while perf_counter() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == ignore_thread:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stacks[';'.join(reversed(stack))] += 1
+        samples += 1
+        sleep(interval)
+    return stacks, samples
+
+
+def profile_path(output_dir, profile_id):
+    return os.path.join(output_dir, f'{profile_id}.collapsed')
+
+
+def _marker_path(output_dir, profile_id, state):
+    return os.path.join(output_dir, f'{profile_id}.{state}')
+
+
+def start_cpu_profile(output_dir, seconds, interval):
+    """Sample this worker's threads for `seconds` in the background; returns the profile id"""
+    os.makedirs(output_dir, exist_ok=True)
+    profile_id = f'cpu-{os.getpid()}-{int(time() * 1000)}'
+    marker = _marker_path(output_dir, profile_id, 'running')
+
+    def run():
+        try:
+            stacks, samples = _sample_stacks(seconds, interval, threading.get_ident())
+            tmp_path = profile_path(output_dir, profile_id) + '.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(f'# {samples} samples every {interval * 1000:.0f} ms over {seconds} s in pid {os.getpid()}\n')
+                for stack, count in stacks.most_common():
+                    f.write(f'{stack} {count}\n')
+            os.replace(tmp_path, profile_path(output_dir, profile_id))
+            os.remove(marker)
+        except Exception:
+            os.replace(marker, _marker_path(output_dir, profile_id, 'failed'))
+            raise
+        finally:
+            with _lock:
+                _running.pop(profile_id, None)
+
+    with _lock:
+        if _running:
+            raise ProfilerBusy()
+        with open(marker, 'w') as f:
+            json.dump({'pid': os.getpid(), 'deadline': time() + seconds}, f)
+        thread = threading.Thread(target=run, name=f'profiler-{profile_id}', daemon=True)
+        _running[profile_id] = thread
+    thread.start()
+    return profile_id
+
+
+def cpu_profile_status(output_dir, profile_id):
+    """'done', 'running', 'failed' or None if no profile with this id was started"""
+    if os.path.exists(profile_path(output_dir, profile_id)):
+        return 'done'
+    if os.path.exists(_marker_path(output_dir, profile_id, 'failed')):
+        return 'failed'
+    try:
+        with open(_marker_path(output_dir, profile_id, 'running')) as f:
+            marker = json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        return 'failed'
+    # Still running unless its worker is gone or it is long past its deadline
+    if time() > marker['deadline'] + FINISH_GRACE:
+        return 'failed'
+    try:
+        os.kill(marker['pid'], 0)
+    except ProcessLookupError:
+        return 'failed'
+    except PermissionError:
+        pass
+    return 'running'
+
+
+def start_memory_tracing(frames=10):
+    """Start tracemalloc and take the baseline snapshot used for diffs"""
+    global _memory_baseline
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    _memory_baseline = _snapshot()
+
+
+def stop_memory_tracing():
+    global _memory_baseline
+    _memory_baseline = None
+    tracemalloc.stop()
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ])
+
+
+def memory_report(limit=25, diff=False):
+    """Top allocation sites now, or their growth since tracing started"""
+    if not tracemalloc.is_tracing():
+        return None
+
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = _snapshot()
+    if diff and _memory_baseline is not None:
+        stats = snapshot.compare_to(_memory_baseline, 'lineno')[:limit]
+        sites = [{
+            'site': str(stat.traceback[0]),
+            'size_kb': round(stat.size / 1024, 1),
+            'size_diff_kb': round(stat.size_diff / 1024, 1),
+            'count': stat.count,
+            'count_diff': stat.count_diff
+        } for stat in stats]
+    else:
+        stats = snapshot.statistics('lineno')[:limit]
+        sites = [{
+            'site': str(stat.traceback[0]),
+            'size_kb': round(stat.size / 1024, 1),
+            'count': stat.count
+        } for stat in stats]
+
+    return {
+        'pid': os.getpid(),
+        'traced_kb': round(current / 1024, 1),
+        'peak_kb': round(peak / 1024, 1),
+        'diff': diff and _memory_baseline is not None,
+        'sites': sites
+    }
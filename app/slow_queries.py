@@ -0,0 +1,166 @@
+"""
+Slow-query recorder (enabled with SLOW_QUERY_LOG_ENABLED).
+
+Statements slower than SLOW_QUERY_THRESHOLD_MS are captured with their SQL,
+bound-parameter shapes (types only, never values), the route and the
+application function that issued them, and a query plan from EXPLAIN
+(PostgreSQL) or EXPLAIN QUERY PLAN (SQLite). Records go to an in-memory
+ring buffer per worker and, with SLOW_QUERY_PERSIST, to the slow_query table.
+
+Plans are captured on a separate connection after the response has been
+sent, so a failing EXPLAIN can never abort the request's own transaction.
+"""
+
+import os
+import sys
+import threading
+from collections import deque
+from datetime import datetime
+from time import perf_counter
+
+from flask import request, has_request_context, after_this_request
+from sqlalchemy import event
+
+from app import db
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_MODELS_DIR = os.path.join(_APP_DIR, 'models')
+
+_local = threading.local()  # Guards against recording our own EXPLAIN/INSERT statements
+
+
+class SlowQueryRecorder:
+    def __init__(self, app, engine):
+        self.app = app
+        self.engine = engine
+        self.threshold = app.config['SLOW_QUERY_THRESHOLD_MS'] / 1000
+        self.persist = app.config['SLOW_QUERY_PERSIST']
+        self.records = deque(maxlen=app.config['SLOW_QUERY_BUFFER_SIZE'])
+        self._lock = threading.Lock()
+
+    def recent(self):
+        """Records captured by this worker, newest first"""
+        with self._lock:
+            return list(reversed(self.records))
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_start', []).append(perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('slow_query_start')
+        if not started:
+            return
+        duration = perf_counter() - started.pop()
+        if duration < self.threshold or getattr(_local, 'busy', False):
+            return
+
+        record = {
+            'statement': statement,
+            'parameter_shape': parameter_shape(parameters, executemany),
+            'duration_ms': round(duration * 1000, 2),
+            'route': request.endpoint if has_request_context() else None,
+            'call_site': find_call_site(),
+            'plan': None,
+            'recorded_at': datetime.utcnow()
+        }
+        with self._lock:
+            self.records.append(record)
+        self.app.logger.warning('Slow query (%.0f ms) from %s: %s', record['duration_ms'],
+                                record['call_site'] or record['route'], statement[:300])
+
+        # EXPLAIN only plain reads; run it once the response is out of the way
+        explainable = not executemany and statement.lstrip().upper().startswith(('SELECT', 'WITH'))
+        if has_request_context():
+            @after_this_request
+            def finish_after_response(response):
+                response.call_on_close(lambda: self.finish(record, parameters, explainable))
+                return response
+        else:
+            self.finish(record, parameters, explainable)
+
+    def finish(self, record, parameters, explainable):
+        _local.busy = True
+        try:
+            if explainable:
+                record['plan'] = self.explain(record['statement'], parameters)
+            if self.persist:
+                self.save(record)
+        finally:
+            _local.busy = False
+
+    def explain(self, statement, parameters):
+        """Query plan for `statement` as text, using a separate connection"""
+        dialect = self.engine.dialect.name
+        prefix = 'EXPLAIN QUERY PLAN ' if dialect == 'sqlite' else 'EXPLAIN '
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.exec_driver_sql(prefix + statement, parameters or ()).fetchall()
+        except Exception as e:
+            return f'EXPLAIN failed: {e}'
+
+        if dialect == 'sqlite':
+            # Rows are (id, parent, notused, detail); indent children under their parent
+            depth = {0: -1}
+            lines = []
+            for row_id, parent, _, detail in rows:
+                depth[row_id] = depth.get(parent, -1) + 1
+                lines.append('  ' * depth[row_id] + detail)
+            return '\n'.join(lines)
+        return '\n'.join(row[0] for row in rows)
+
+    def save(self, record):
+        from app.models.slow_query import SlowQuery
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(SlowQuery.__table__.insert(), {
+                    'statement': record['statement'],
+                    'parameter_shape': record['parameter_shape'],
+                    'duration_ms': record['duration_ms'],
+                    'route': record['route'],
+                    'call_site': (record['call_site'] or '')[:255] or None,
+                    'plan': record['plan'],
+                    'recorded_at': record['recorded_at']
+                })
+        except Exception:
+            self.app.logger.exception('Could not persist slow query record')
+
+
+def parameter_shape(parameters, executemany=False):
+    """Describe bound parameters by type so records never contain user data"""
+    if executemany and parameters:
+        return f'{len(parameters)} x {parameter_shape(parameters[0])}'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}' for key, value in parameters.items()) + '}'
+    if isinstance(parameters, (list, tuple)):
+        return '(' + ', '.join(type(value).__name__ for value in parameters) + ')'
+    return type(parameters).__name__
+
+
+def find_call_site():
+    """The innermost application function on the stack, preferring model methods"""
+    frame = sys._getframe(2)
+    first_app_frame = None
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_APP_DIR) and filename != os.path.abspath(__file__):
+            site = f'{frame.f_code.co_qualname} ({os.path.relpath(filename, os.path.dirname(_APP_DIR))}:{frame.f_lineno})'
+            if filename.startswith(_MODELS_DIR):
+                return site
+            first_app_frame = first_app_frame or site
+        frame = frame.f_back
+    return first_app_frame
+
+
+def init_app(app):
+    """Attach a slow-query recorder to the app's default engine"""
+    app.config.setdefault('SLOW_QUERY_THRESHOLD_MS', 250)
+    app.config.setdefault('SLOW_QUERY_BUFFER_SIZE', 200)
+    app.config.setdefault('SLOW_QUERY_PERSIST', False)
+
+    with app.app_context():
+        recorder = SlowQueryRecorder(app, db.engine)
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', recorder.before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', recorder.after_cursor_execute)
+
+    app.extensions['slow_queries'] = recorder
@@ -0,0 +1,140 @@
+"""
+SQLite production profile, for deployments that run without Postgres.
+
+Every new connection to an SQLite database gets:
+
+- journal_mode=WAL: readers no longer block the writer or each other
+- synchronous=NORMAL: in WAL mode this only risks the last transactions on
+  power loss, never corruption, and saves an fsync per commit
+- busy_timeout: a writer waits for the lock instead of failing at once with
+  "database is locked" while another gunicorn worker commits
+- cache_size, mmap_size and temp_store=MEMORY: fewer read syscalls and no
+  temp files for sorts
+
+With WAL, SQLite checkpoints the log back into the database from inside
+whichever commit crosses wal_autocheckpoint pages, so one unlucky request
+pays for it. Each worker therefore also runs a PASSIVE checkpoint every
+SQLITE_CHECKPOINT_INTERVAL seconds in the background, which never waits
+for readers or writers. scripts/bench_sqlite.py measures the difference.
+"""
+
+import threading
+
+from sqlalchemy import event
+
+from app import db
+
+SYNCHRONOUS_LEVELS = ['OFF', 'NORMAL', 'FULL', 'EXTRA']
+TEMP_STORES = ['DEFAULT', 'FILE', 'MEMORY']
+
+
+def is_file_database(engine):
+    """True for an on-disk SQLite database; WAL and mmap do not apply to in-memory ones"""
+    url = engine.url
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:') \
+        and 'mode=memory' not in url.database and url.query.get('mode') != 'memory'
+
+
+def pragmas(config):
+    """PRAGMA statements for the configured profile, in the order they must run"""
+    synchronous = config['SQLITE_SYNCHRONOUS'].upper()
+    temp_store = config['SQLITE_TEMP_STORE'].upper()
+    if synchronous not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f'SQLITE_SYNCHRONOUS must be one of {SYNCHRONOUS_LEVELS}, not {synchronous!r}')
+    if temp_store not in TEMP_STORES:
+        raise ValueError(f'SQLITE_TEMP_STORE must be one of {TEMP_STORES}, not {temp_store!r}')
+    return [
+        # First, so switching the journal mode waits for other connections instead of failing
+        f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}",
+        f'PRAGMA synchronous = {synchronous}',
+        f"PRAGMA cache_size = -{int(config['SQLITE_CACHE_SIZE_KB'])}",  # Negative means KiB, not pages
+        f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}",
+        f'PRAGMA temp_store = {temp_store}',
+        f"PRAGMA wal_autocheckpoint = {int(config['SQLITE_WAL_AUTOCHECKPOINT'])}",
+    ]
+
+
+def tune_engine(engine, statements):
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+class Checkpointer:
+    """Background PASSIVE WAL checkpoints for one worker process"""
+
+    def __init__(self, app, engines, interval):
+        self.app = app
+        self.engines = engines
+        self.interval = interval
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start in this process (idempotent; threads do not survive a fork)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='sqlite-checkpointer', daemon=True)
+            self._thread.start()
+
+    def checkpoint(self):
+        """Checkpoint every tuned database; returns (busy, wal pages, pages checkpointed) per engine URL"""
+        results = {}
+        for engine in self.engines:
+            with engine.connect() as connection:
+                results[engine.url.database] = tuple(
+                    connection.exec_driver_sql('PRAGMA wal_checkpoint(PASSIVE)').one()
+                )
+        return results
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.checkpoint()
+            except Exception:
+                self.app.logger.exception('SQLite checkpoint failed; will retry')
+
+    def stop(self):
+        self._stop.set()
+
+
+def init_app(app):
+    app.config.setdefault('SQLITE_TUNING', True)
+    app.config.setdefault('SQLITE_JOURNAL_MODE', 'WAL')
+    app.config.setdefault('SQLITE_SYNCHRONOUS', 'NORMAL')
+    app.config.setdefault('SQLITE_BUSY_TIMEOUT_MS', 5000)
+    app.config.setdefault('SQLITE_CACHE_SIZE_KB', 64 * 1024)
+    app.config.setdefault('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+    app.config.setdefault('SQLITE_TEMP_STORE', 'MEMORY')
+    app.config.setdefault('SQLITE_WAL_AUTOCHECKPOINT', 1000)
+    app.config.setdefault('SQLITE_CHECKPOINT_INTERVAL', 30)
+    if not app.config['SQLITE_TUNING']:
+        return
+
+    with app.app_context():
+        engines = [engine for engine in db.engines.values() if is_file_database(engine)]
+    if not engines:
+        return
+
+    statements = pragmas(app.config)
+    for engine in engines:
+        tune_engine(engine, statements)
+
+    if app.config['SQLITE_JOURNAL_MODE'].upper() == 'WAL' and app.config['SQLITE_CHECKPOINT_INTERVAL']:
+        checkpointer = Checkpointer(app, engines, app.config['SQLITE_CHECKPOINT_INTERVAL'])
+        app.extensions['sqlite_checkpointer'] = checkpointer
+
+        @app.before_request
+        def start_checkpointer():
+            # Started on first request, like the note draft flusher, so CLI commands never spawn it
+            checkpointer.start()
@@ -0,0 +1,101 @@
+"""
+Built-in background tasks, run by scripts/run_jobs.py (see app/jobs.py).
+"""
+
+import json
+import os
+from datetime import datetime, date, timedelta
+
+from flask import current_app
+from sqlalchemy import inspect
+
+from app.jobs import task
+from app.tenancy import current_campaign_id
+
+
+@task('compact_change_log', concurrency=1)
+def compact_change_log(ctx, days=30):
+    """Delete change log entries older than `days` (same as scripts/compact_change_log.py)"""
+    from app.models import ChangeLogEntry
+
+    deleted = ChangeLogEntry.compact(datetime.utcnow() - timedelta(days=int(days)))
+    return {'deleted': deleted, 'oldest_sequence': ChangeLogEntry.oldest_sequence()}
+
+
+@task('archive_deleted_users', concurrency=1)
+def archive_deleted_users(ctx, days=None):
+    """Move notes and quick refs of users deleted more than `days` ago (USER_ARCHIVE_AFTER_DAYS) into user_archive"""
+    from app import db
+    from app.models import User, UserArchive
+
+    if days is None:
+        days = current_app.config['USER_ARCHIVE_AFTER_DAYS']
+    users = User.get_archivable(datetime.utcnow() - timedelta(days=int(days))).all()
+    rows = 0
+    for done, user in enumerate(users):
+        ctx.progress(done / len(users), f'Archiving {user.username}')
+        archive = UserArchive.archive_user(user)
+        db.session.commit()  # One transaction per user, so an interrupted run keeps its progress
+        rows += sum(archive.row_counts.values())
+    return {'users': len(users), 'rows': rows}
+
+
+@task('rebuild_district_stats', concurrency=1)
+def rebuild_district_stats(ctx, campaign_id=None):
+    """Recompute the /api/overview aggregates from scratch (they are otherwise kept current on every write)"""
+    from app import db
+    from app.models import DistrictStats
+
+    districts = DistrictStats.rebuild(campaign_id)
+    db.session.commit()
+    return {'districts': districts}
+
+
+@task('provision_users', max_attempts=1, concurrency=1, campaign_scoped=True)
+def provision_users(ctx, rows, skip_invalid=False, passwords=None):
+    """Create the users of a POST /auth/admin/users/bulk upload (see app/provisioning.py) in the campaign it came from
+
+    The upload's passwords arrive separately, from the job's secrets, and
+    generated ones go back out the same way instead of into the result.
+    """
+    from app import db, provisioning
+
+    rows = [{**row, 'password': password} for row, password in zip(rows, passwords or [None] * len(rows))]
+    ctx.progress(0.0, f'Provisioning {len(rows)} users')
+    created, results = provisioning.provision(rows, campaign_id=current_campaign_id(), skip_invalid=skip_invalid)
+    db.session.commit()
+    generated = [{'row': result['row'], 'username': result['username'], 'password': result.pop('password')}
+                 for result in results if 'password' in result]
+    return {'created': created, 'invalid': sum(1 for result in results if result['errors']), 'results': results,
+            'secrets': {'passwords': generated}}
+
+
+def _export_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+@task('export_campaign', executor='process', concurrency=1, campaign_scoped=True)
+def export_campaign(ctx):
+    """Write the campaign's districts, guilds, relationships and notes to a JSON file in JOB_EXPORT_DIR"""
+    from app.models import District, Guild, GuildRelationship, PlayerNote
+
+    models = [('districts', District), ('guilds', Guild), ('guild_relationships', GuildRelationship),
+              ('player_notes', PlayerNote)]
+    export = {'campaign_id': current_campaign_id(), 'exported_at': datetime.utcnow().isoformat()}
+    for done, (key, model) in enumerate(models):
+        ctx.progress(done / len(models), f'Exporting {key}')
+        columns = [attr.key for attr in inspect(model).column_attrs]
+        export[key] = [{column: _export_value(getattr(row, column)) for column in columns}
+                       for row in model.query.order_by(model.id)]
+
+    export_dir = current_app.config['JOB_EXPORT_DIR']
+    os.makedirs(export_dir, exist_ok=True)
+    filename = f'campaign-{current_campaign_id()}-job-{ctx.job_id}.json'
+    tmp_path = os.path.join(export_dir, filename + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(export, f)
+    os.replace(tmp_path, os.path.join(export_dir, filename))
+
+    return {'file': filename, 'counts': {key: len(export[key]) for key, _ in models}}
\ No newline at end of file
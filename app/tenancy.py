@@ -0,0 +1,99 @@
+"""
+Campaign (tenant) resolution and query scoping.
+
+Every request from a signed-in user runs in one campaign, chosen from the
+X-Campaign-Id header, the campaign picked with /campaigns/<id>/switch
+(kept in the session) or the user's first membership, in that order, and
+only if the user belongs to it. The id is kept on g.campaign_id.
+
+While a campaign is set, every ORM SELECT, UPDATE and DELETE touching a
+CampaignScoped model gets `campaign_id = <current>` added to its WHERE and
+JOIN criteria, including relationship loads and Session.get(). Requests
+without a campaign see no scoped rows at all. Code outside a request (CLI
+scripts, migrations) sees every campaign unless it enters campaign_scope().
+New scoped rows get the current campaign, or the default campaign outside
+a request. Pass execution_options(all_campaigns=True) to opt out.
+"""
+
+from contextlib import contextmanager
+
+from flask import g, request, session, jsonify, has_app_context, has_request_context
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import with_loader_criteria
+
+from app import db
+from app.models.campaign import Campaign, CampaignScoped
+
+_UNSET = object()
+
+
+def current_campaign_id():
+    """Campaign of the current request or campaign_scope(), if any"""
+    return g.get('campaign_id') if has_app_context() else None
+
+
+@contextmanager
+def campaign_scope(campaign_id):
+    """Run a block as if inside a request for `campaign_id` (for scripts and warm-up)"""
+    previous = g.get('campaign_id', _UNSET)
+    g.campaign_id = campaign_id
+    try:
+        yield
+    finally:
+        if previous is _UNSET:
+            g.pop('campaign_id', None)
+        else:
+            g.campaign_id = previous
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _scope_to_campaign(orm_execute_state):
+    if not (orm_execute_state.is_select or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if orm_execute_state.is_column_load or orm_execute_state.execution_options.get('all_campaigns'):
+        return
+    if not has_app_context() or (not has_request_context() and 'campaign_id' not in g):
+        return
+
+    campaign_id = g.get('campaign_id')
+    orm_execute_state.statement = orm_execute_state.statement.options(
+        with_loader_criteria(CampaignScoped, lambda cls: cls.campaign_id == campaign_id, include_aliases=True)
+    )
+
+
+@event.listens_for(db.session, 'before_flush')
+def _assign_campaign(session, flush_context, instances):
+    campaign_id = current_campaign_id()
+    default = None
+    for obj in session.new:
+        if isinstance(obj, CampaignScoped) and obj.campaign_id is None and obj.campaign is None:
+            if campaign_id is not None:
+                obj.campaign_id = campaign_id
+            elif not has_request_context():
+                default = default or Campaign.get_default()
+                obj.campaign = default
+
+
+def resolve_campaign():
+    g.campaign_id = None
+    if request.endpoint == 'static' or not current_user.is_authenticated:
+        return
+
+    header = request.headers.get('X-Campaign-Id', type=int)
+    g.campaign_id = Campaign.resolve_for(current_user, header or session.get('campaign_id'))
+    # An explicitly requested campaign must never silently fall back to another one
+    if header is not None and g.campaign_id != header:
+        return jsonify({'error': 'You are not a member of this campaign'}), 403
+
+
+def init_app(app):
+    app.before_request(resolve_campaign)
+
+    @app.context_processor
+    def inject_campaigns():
+        def user_campaigns():
+            if not current_user.is_authenticated:
+                return []
+            return Campaign.get_user_campaigns(current_user).all()
+        return {'current_campaign_id': current_campaign_id(), 'user_campaigns': user_campaigns}
\ No newline at end of file
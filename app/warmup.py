@@ -0,0 +1,137 @@
+"""
+Worker warm-up, readiness and cached reference data.
+
+warm_up() runs once per worker before it accepts traffic (gunicorn's
+post_worker_init hook in gunicorn.conf.py). It opens pool connections,
+compiles every Jinja template and primes the district and guild caches,
+so the first real requests don't pay for any of it. /readyz reports 503
+until it has finished.
+
+The district and guild lists change rarely, so their serialized payloads
+are cached per worker and campaign and revalidated against the campaign's
+latest change log sequence, which every ORM write to those tables
+advances. A value loaded within CHANGE_LOG_SETTLE_SECONDS of the newest
+entry is not reused, as a transaction committing out of sequence order
+would not move the sequence. The least recently used campaigns are evicted once the cache
+holds REFERENCE_CACHE_SIZE entries.
+"""
+
+import threading
+from collections import OrderedDict
+from time import perf_counter
+
+from flask import current_app
+
+from app import db
+from app.models import Campaign
+from app.models.change_log import ChangeLogEntry
+from app.tenancy import campaign_scope, current_campaign_id
+
+
+class ReferenceCache:
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (campaign id, name) -> (change log sequence, settled, value)
+
+    def get(self, name, loader):
+        """Cached value of `name` for the current campaign, reloaded whenever its change log has moved on"""
+        campaign_id = current_campaign_id()
+        key = (campaign_id, name)
+        # Read the sequence before loading so a concurrent write can only make
+        # the cached value newer than its sequence, never older.
+        sequence, created_at = ChangeLogEntry.newest(campaign_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == sequence and entry[1]:
+                self._entries.move_to_end(key)
+                return entry[2]
+
+        # Until the newest entry is settled a transaction that flushed before it may
+        # still commit without moving the sequence, so such a value is not reused
+        settled = created_at is None or created_at < ChangeLogEntry.settled_before()
+        value = loader()
+        with self._lock:
+            self._entries[key] = (sequence, settled, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def reference_cache():
+    return current_app.extensions['reference_cache']
+
+
+def _open_pool(app):
+    """Open up to WARMUP_POOL_CONNECTIONS connections per engine and return them to the pool"""
+    with app.app_context():
+        for engine in db.engines.values():
+            count = app.config['WARMUP_POOL_CONNECTIONS']
+            if hasattr(engine.pool, 'size'):
+                count = min(count, engine.pool.size())
+            connections = []
+            try:
+                for _ in range(max(count, 1)):
+                    connection = engine.connect()
+                    connections.append(connection)
+                    connection.exec_driver_sql('SELECT 1')
+            finally:
+                for connection in connections:
+                    connection.close()
+
+
+def _compile_templates(app):
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
+
+
+def _prime_caches(app):
+    """Load the district and guild lists of the most recently active campaigns"""
+    from app.routes.api import load_districts, load_guilds
+
+    with app.app_context():
+        cache = app.extensions['reference_cache']
+        recent = db.session.query(ChangeLogEntry.campaign_id).filter(
+            ChangeLogEntry.campaign_id.isnot(None)
+        ).group_by(ChangeLogEntry.campaign_id).order_by(db.func.max(ChangeLogEntry.id).desc())
+        campaign_ids = [row[0] for row in recent.limit(app.config['WARMUP_CAMPAIGNS'])]
+        if not campaign_ids:
+            campaign_ids = [campaign.id for campaign in Campaign.query.order_by(Campaign.id).limit(1)]
+
+        for campaign_id in campaign_ids:
+            with campaign_scope(campaign_id):
+                cache.get('districts', load_districts)
+                cache.get('guilds', load_guilds)
+        db.session.remove()
+
+
+def warm_up(app):
+    """Run every warm-up step and mark this worker ready; returns the step timings in ms"""
+    state = app.extensions['warmup']
+    timings = {}
+    try:
+        for step, run in [('pool', _open_pool), ('templates', _compile_templates), ('caches', _prime_caches)]:
+            started = perf_counter()
+            run(app)
+            timings[step] = round((perf_counter() - started) * 1000, 1)
+    except Exception:
+        app.logger.exception('Warm-up failed; /readyz will retry it')
+        state['ready'] = False
+        return timings
+
+    state.update(ready=True, timings=timings)
+    app.logger.info('Worker warm-up finished: %s', ', '.join(f'{k} {v} ms' for k, v in timings.items()))
+    return timings
+
+
+def init_app(app):
+    app.config.setdefault('WARMUP_POOL_CONNECTIONS', 2)
+    app.config.setdefault('WARMUP_CAMPAIGNS', 20)
+    app.config.setdefault('REFERENCE_CACHE_SIZE', 1000)
+    app.extensions['reference_cache'] = ReferenceCache(app.config['REFERENCE_CACHE_SIZE'])
+    app.extensions['warmup'] = {'ready': False, 'timings': {}}
@@ -1,8 +1,11 @@
 import os
-from dotenv import load_dotenv
+import tempfile
 
 basedir = os.path.abspath(os.path.dirname(__file__))
-load_dotenv(os.path.join(basedir, '.env'))
+# Deployments set real environment variables; only pay for python-dotenv when there is a .env file
+if os.path.exists(os.path.join(basedir, '.env')):
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(basedir, '.env'))
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
@@ -15,6 +18,25 @@ class Config:
     SQLALCHEMY_DATABASE_URI = database_url or \
         'sqlite:///' + os.path.join(basedir, '..', 'instance', 'aethermere.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # SQLite production profile (app/sqlite_tuning.py), applied to on-disk SQLite databases only
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', 'true').lower() == 'true'
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))  # Wait this long for a write lock
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))  # Page cache per connection
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # Bytes of the file read via mmap
+    SQLITE_TEMP_STORE = os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')
+    SQLITE_WAL_AUTOCHECKPOINT = int(os.environ.get('SQLITE_WAL_AUTOCHECKPOINT', 1000))  # Pages
+    SQLITE_CHECKPOINT_INTERVAL = float(os.environ.get('SQLITE_CHECKPOINT_INTERVAL', 30))  # Background checkpoints; 0 disables
+
+    # Optional read replicas (comma-separated URLs); GET traffic reads from them when they keep up
+    replica_urls = [url.strip().replace('postgres://', 'postgresql://', 1)
+                    for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    SQLALCHEMY_BINDS = {f'replica_{i}': url for i, url in enumerate(replica_urls)}
+    REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
+    REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', 10))
+    REPLICA_READ_YOUR_WRITES_SECONDS = float(os.environ.get('REPLICA_READ_YOUR_WRITES_SECONDS', 5))
     WTF_CSRF_ENABLED = False
 
     # Rate limiting configuration - use Redis if available, otherwise use PostgreSQL
@@ -26,4 +48,77 @@ class Config:
     else:
         RATELIMIT_STORAGE_URL = 'memory://'
 
-    RATELIMIT_DEFAULT = "1000 per hour"
\ No newline at end of file
+    RATELIMIT_DEFAULT = "1000 per hour"
+
+    # Per-request SQL profiling: query counts, N+1 warnings and Server-Timing headers
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_N_PLUS_ONE_THRESHOLD = int(os.environ.get('PROFILING_N_PLUS_ONE_THRESHOLD', 5))
+
+    # Prometheus metrics at /admin/metrics, aggregated across workers through METRICS_DIR
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_DIR = os.environ.get('METRICS_DIR') or os.path.join(tempfile.gettempdir(), 'aethermere-metrics')
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # Lets a scraper authenticate without a login session
+
+    # Slow-query log with EXPLAIN capture, viewable at /admin/slow-queries
+    SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG_ENABLED', 'true').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 250))
+    SLOW_QUERY_BUFFER_SIZE = int(os.environ.get('SLOW_QUERY_BUFFER_SIZE', 200))
+    SLOW_QUERY_PERSIST = os.environ.get('SLOW_QUERY_PERSIST', 'false').lower() == 'true'  # Also store in slow_query table
+
+    # On-demand CPU sampling and tracemalloc endpoints under /admin/profiler (off unless enabled)
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'false').lower() == 'true'
+    PROFILER_OUTPUT_DIR = os.environ.get('PROFILER_OUTPUT_DIR') or os.path.join(tempfile.gettempdir(), 'aethermere-profiles')
+    PROFILER_MAX_SECONDS = int(os.environ.get('PROFILER_MAX_SECONDS', 60))
+
+    # Connections each worker opens during warm-up (see gunicorn.conf.py and /readyz)
+    WARMUP_POOL_CONNECTIONS = int(os.environ.get('WARMUP_POOL_CONNECTIONS', 2))
+    WARMUP_CAMPAIGNS = int(os.environ.get('WARMUP_CAMPAIGNS', 20))  # Most recently active campaigns to prime
+
+    # Cached district/guild payloads per worker, two per campaign
+    REFERENCE_CACHE_SIZE = int(os.environ.get('REFERENCE_CACHE_SIZE', 1000))
+
+    # Note autosave: drafts are journaled per worker in NOTE_DRAFT_DIR and written to the database in batches.
+    # Workers flush on graceful shutdown; mount NOTE_DRAFT_DIR on a persistent volume so a crash loses nothing either
+    NOTE_DRAFT_DIR = os.environ.get('NOTE_DRAFT_DIR') or os.path.join(basedir, '..', 'instance', 'note-drafts')
+    NOTE_DRAFT_FLUSH_INTERVAL = float(os.environ.get('NOTE_DRAFT_FLUSH_INTERVAL', 2))
+    NOTE_DRAFT_BATCH_SIZE = int(os.environ.get('NOTE_DRAFT_BATCH_SIZE', 200))
+    NOTE_DRAFT_FSYNC = os.environ.get('NOTE_DRAFT_FSYNC', 'true').lower() == 'true'  # Off trades crash safety for latency
+
+    # Longest a transaction stays open after writing change log entries; sync cursors hold back that long
+    CHANGE_LOG_SETTLE_SECONDS = float(os.environ.get('CHANGE_LOG_SETTLE_SECONDS', 10))
+
+    # Background jobs, worked by scripts/run_jobs.py rather than the web workers
+    JOB_THREAD_WORKERS = int(os.environ.get('JOB_THREAD_WORKERS', 4))
+    JOB_PROCESS_WORKERS = int(os.environ.get('JOB_PROCESS_WORKERS', 2))  # For CPU-bound tasks
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1))
+    JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', 300))  # Requeue running jobs whose runner went quiet
+    JOB_RETRY_BACKOFF = float(os.environ.get('JOB_RETRY_BACKOFF', 10))  # Seconds before the first retry, doubling after
+    JOB_SECRETS_TTL = int(os.environ.get('JOB_SECRETS_TTL', 3600))  # Seconds job passwords are kept before being dropped
+    JOB_EXPORT_DIR = os.environ.get('JOB_EXPORT_DIR') or os.path.join(basedir, '..', 'instance', 'exports')
+
+    # Days a user stays soft deleted before their notes and quick refs move to user_archive
+    USER_ARCHIVE_AFTER_DAYS = int(os.environ.get('USER_ARCHIVE_AFTER_DAYS', 30))
+
+    # Password hashing: werkzeug method string (calibrate with scripts/calibrate_password_hash.py)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # Concurrent hashes per worker process
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 8))  # Waiting hashes before logins get a 503
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 5))
+
+    # Bulk user provisioning (scripts/provision_users.py, POST /auth/admin/users/bulk)
+    PROVISION_BATCH_SIZE = int(os.environ.get('PROVISION_BATCH_SIZE', 500))
+    PROVISION_HASH_PROCESSES = int(os.environ.get('PROVISION_HASH_PROCESSES', os.cpu_count() or 1))
+    PROVISION_MAX_ROWS = int(os.environ.get('PROVISION_MAX_ROWS', 2000))  # Per admin request; the script has no limit
+
+    # Data backfills in migrations (migrations/backfill.py): rows per committed chunk and pause between chunks
+    BACKFILL_BATCH_SIZE = int(os.environ.get('BACKFILL_BATCH_SIZE', 1000))
+    BACKFILL_PAUSE = float(os.environ.get('BACKFILL_PAUSE', 0.1))
+
+    # Note revision history: a full snapshot every N revisions; versions replaced sooner than this are not kept
+    NOTE_REVISION_SNAPSHOT_EVERY = int(os.environ.get('NOTE_REVISION_SNAPSHOT_EVERY', 10))
+    NOTE_REVISION_COALESCE_SECONDS = int(os.environ.get('NOTE_REVISION_COALESCE_SECONDS', 60))
+
+    # Autocomplete indexes: how often (seconds) a lookup checks the change log for renames, and the result cap
+    AUTOCOMPLETE_SYNC_INTERVAL = float(os.environ.get('AUTOCOMPLETE_SYNC_INTERVAL', 1.0))
+    AUTOCOMPLETE_MAX_RESULTS = int(os.environ.get('AUTOCOMPLETE_MAX_RESULTS', 25))
\ No newline at end of file
@@ -7,7 +7,7 @@ Roles: admin, dm, player
 
 import sys
 from app import create_app, db
-from app.models import User
+from app.models import User, Campaign, CampaignMembership
 
 def create_user(username, email, password, role='player'):
     app = create_app()
@@ -34,6 +34,8 @@ def create_user(username, email, password, role='player'):
         user.set_password(password)
         
         db.session.add(user)
+        # Scripts have no campaign switcher, so new users join the default campaign
+        db.session.add(CampaignMembership(campaign=Campaign.get_default(), user=user))
         db.session.commit()
         
         print(f"✅ Created {role} user: {username} ({email})")
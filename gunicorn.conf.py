@@ -0,0 +1,28 @@
+# Loaded automatically by gunicorn from the working directory.
+#
+# The app is deliberately not preloaded in the master: each worker creates
+# its own engine and per-process metrics file after the fork.
+#
+# Workers are threaded so a request waiting on a password hash (app/passwords.py)
+# or the database leaves the rest of the worker serving. Keep GUNICORN_THREADS
+# above PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE: the threads past that are
+# what other endpoints keep during a login burst, and only a login that finds
+# every hash slot taken gets the 503.
+
+import os
+
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+
+def post_worker_init(worker):
+    """Warm each worker up before it starts accepting connections"""
+    from app.warmup import warm_up
+    warm_up(worker.wsgi)
+
+
+def worker_exit(server, worker):
+    """Write out this worker's autosave drafts so a redeploy does not depend on the journal surviving"""
+    buffer = worker.wsgi.extensions.get('note_drafts') if hasattr(worker, 'wsgi') else None
+    if buffer is not None:
+        buffer.close()
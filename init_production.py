@@ -6,7 +6,7 @@ Run this once after deployment.
 
 import os
 from app import create_app, db
-from app.models import District, User
+from app.models import District, User, Campaign, CampaignMembership
 
 # District data
 districts_data = [
@@ -96,6 +96,7 @@ def init_production():
             admin = User(username=admin_username, email=admin_email, role='admin')
             admin.set_password(admin_password)
             db.session.add(admin)
+            db.session.add(CampaignMembership(campaign=Campaign.get_default(), user=admin))
             print(f"✅ Created admin user: {admin_username}")
         
         db.session.commit()
@@ -0,0 +1,156 @@
+"""
+Chunked, resumable data backfills for migrations.
+
+A data-rewriting migration that runs one UPDATE over a large table holds
+its locks until the whole table is rewritten. backfill() walks the table
+in primary key order instead, BACKFILL_BATCH_SIZE rows at a time, and
+commits each chunk on its own (inside Alembic's autocommit_block), so the
+app keeps serving traffic between chunks. It pauses BACKFILL_PAUSE seconds
+after each chunk and logs progress.
+
+The last key done is saved in the backfill_checkpoint table after every
+chunk. If the migration is interrupted, running `flask db upgrade` again
+continues after that key. Whether or not it finishes, nothing done before
+the interruption is rolled back, so:
+
+- put the backfill in its own revision, never in one that also changes the
+  schema, so a rerun does not repeat DDL that was already applied: after
+  the revision that adds what it fills (5f2c8e7d1a94), or before the one
+  that needs the data in shape, such as cleaning values ahead of a type
+  cast (b3d7e2f90c18);
+- make the change idempotent (a chunk can run twice if the process dies
+  between its UPDATE and its checkpoint).
+
+Usage in a revision:
+
+    from migrations.backfill import backfill
+
+    def upgrade():
+        notes = sa.table('player_note', sa.column('id', sa.Integer), sa.column('content', sa.Text),
+                         sa.column('length', sa.Integer))
+        # Set-based: one UPDATE per key range
+        backfill('player_note_length', notes, values={'length': sa.func.length(notes.c.content)},
+                 where=notes.c.length.is_(None))
+
+        # Row by row: process(conn, rows) gets each chunk of rows as mappings
+        backfill('player_note_trim', notes, process=trim_notes)
+"""
+
+import json
+import logging
+import time
+from datetime import datetime
+
+import sqlalchemy as sa
+from alembic import op
+from flask import current_app, has_app_context
+
+logger = logging.getLogger('alembic.backfill')
+
+CHECKPOINT_TABLE = 'backfill_checkpoint'
+
+checkpoints = sa.Table(
+    CHECKPOINT_TABLE, sa.MetaData(),
+    sa.Column('name', sa.String(100), primary_key=True),
+    sa.Column('last_key', sa.Text, nullable=True),  # JSON, so integer and string keys both round-trip
+    sa.Column('rows_done', sa.Integer, nullable=False, default=0),
+    sa.Column('updated_at', sa.DateTime, nullable=False)
+)
+
+
+def _setting(name, default):
+    if has_app_context():
+        return current_app.config.get(name, default)
+    return default
+
+
+def _load_checkpoint(conn, name):
+    checkpoints.create(conn, checkfirst=True)
+    row = conn.execute(sa.select(checkpoints).where(checkpoints.c.name == name)).mappings().first()
+    if row is None:
+        return False, None, 0
+    return True, json.loads(row['last_key']), row['rows_done']
+
+
+def _save_checkpoint(conn, name, last_key, rows_done, exists):
+    values = {'last_key': json.dumps(last_key), 'rows_done': rows_done, 'updated_at': datetime.utcnow()}
+    if exists:
+        conn.execute(checkpoints.update().where(checkpoints.c.name == name).values(**values))
+    else:
+        conn.execute(checkpoints.insert().values(name=name, **values))
+
+
+def backfill(name, table, values=None, process=None, where=None, key='id', batch_size=None, pause=None):
+    """Apply `values` (column -> SQL expression) or call `process(conn, rows)` over `table` in key-ordered chunks.
+
+    `name` identifies the checkpoint and must be unique per backfill. `where`
+    limits the rows touched. Returns the number of rows processed.
+    """
+    if (values is None) == (process is None):
+        raise ValueError('Pass exactly one of values= or process=')
+    batch_size = batch_size or _setting('BACKFILL_BATCH_SIZE', 1000)
+    pause = _setting('BACKFILL_PAUSE', 0.1) if pause is None else pause
+    key_column = table.c[key]
+    context = op.get_context()
+
+    if context.as_sql:
+        # Offline (--sql) mode cannot page through rows, so emit the change as one statement
+        if process is not None:
+            raise RuntimeError(f'Backfill {name!r} processes rows in Python and cannot run in --sql mode')
+        statement = table.update().values(**values)
+        op.execute(statement.where(where) if where is not None else statement)
+        return 0
+
+    with context.autocommit_block():
+        conn = op.get_bind()
+        has_checkpoint, last_key, rows_done = _load_checkpoint(conn, name)
+        if has_checkpoint:
+            logger.info(f'Backfill {name}: resuming after {key}={last_key!r} ({rows_done} rows already done)')
+
+        def remaining_filter(after):
+            conditions = [where] if where is not None else []
+            if after is not None:
+                conditions.append(key_column > after)
+            return sa.and_(sa.true(), *conditions)
+
+        total = rows_done + conn.execute(
+            sa.select(sa.func.count()).select_from(table).where(remaining_filter(last_key))
+        ).scalar()
+        started = time.monotonic()
+
+        while True:
+            if process is not None:
+                rows = conn.execute(
+                    sa.select(table).where(remaining_filter(last_key)).order_by(key_column).limit(batch_size)
+                ).mappings().all()
+                if not rows:
+                    break
+                process(conn, rows)
+                chunk_last, chunk_size = rows[-1][key], len(rows)
+            else:
+                keys = conn.execute(
+                    sa.select(key_column).where(remaining_filter(last_key)).order_by(key_column).limit(batch_size)
+                ).scalars().all()
+                if not keys:
+                    break
+                chunk_last, chunk_size = keys[-1], len(keys)
+                conn.execute(table.update().where(remaining_filter(last_key), key_column <= chunk_last)
+                             .values(**values))
+
+            last_key = chunk_last
+            rows_done += chunk_size
+            _save_checkpoint(conn, name, last_key, rows_done, exists=has_checkpoint)
+            has_checkpoint = True
+
+            elapsed = time.monotonic() - started
+            logger.info(f'Backfill {name}: {rows_done}/{total} rows '
+                        f'({100 * rows_done / max(total, 1):.0f}%, {key} <= {last_key!r}, {elapsed:.1f}s)')
+            if chunk_size < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+
+        # Finished: forget the checkpoint so a downgrade and upgrade runs the backfill again
+        conn.execute(checkpoints.delete().where(checkpoints.c.name == name))
+        logger.info(f'Backfill {name}: done, {rows_done} rows')
+    return rows_done
@@ -5,6 +5,11 @@ from flask import current_app
 
 from alembic import context
 
+from migrations.backfill import CHECKPOINT_TABLE
+
+# Indexes the models declare with PostgreSQL-only options, which other databases never get
+POSTGRESQL_ONLY_INDEXES = {'ix_character_quick_refs_experiences'}
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -90,9 +95,21 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # backfill_checkpoint is managed by migrations/backfill.py, not by the models. The GIN
+    # index on quick ref experiences only exists on PostgreSQL (see revision 7c41d9e05b2a)
+    def include_object(object, name, type_, reflected, compare_to):
+        if type_ == 'table' and name == CHECKPOINT_TABLE:
+            return False
+        if type_ == 'index' and name in POSTGRESQL_ONLY_INDEXES:
+            return context.get_bind().dialect.name == 'postgresql'
+        return True
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault('include_object', include_object)
+    # Backfills commit chunk by chunk, so every revision gets its own transaction
+    conf_args.setdefault('transaction_per_migration', True)
 
     connectable = get_engine()
 
@@ -0,0 +1,66 @@
+"""Unique player note per user and target
+
+Revision ID: 1660541e9add
+Revises: 669527450c29
+Create Date: 2026-10-19 17:59:04.000784
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1660541e9add'
+down_revision = '669527450c29'
+branch_labels = None
+depends_on = None
+
+note = sa.table('player_note', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+                sa.column('target_type', sa.String), sa.column('target_id', sa.Integer),
+                sa.column('campaign_id', sa.Integer), sa.column('updated_at', sa.DateTime))
+revision_table = sa.table('player_note_revision', sa.column('note_id', sa.Integer))
+district_stats = sa.table('district_stats', sa.column('district_id', sa.Integer), sa.column('note_count', sa.Integer))
+change_log = sa.table('change_log', sa.column('entity_type', sa.String), sa.column('entity_id', sa.Integer),
+                      sa.column('action', sa.String), sa.column('payload', sa.Text), sa.column('user_id', sa.Integer),
+                      sa.column('campaign_id', sa.Integer), sa.column('created_at', sa.DateTime))
+
+
+def _dedupe(conn):
+    """Keep the most recently updated of a user's notes on a target and delete the others"""
+    key = [note.c.user_id, note.c.target_type, note.c.target_id]
+    duplicated = conn.execute(sa.select(*key).group_by(*key).having(sa.func.count() > 1)).all()
+    for user_id, target_type, target_id in duplicated:
+        rows = conn.execute(sa.select(note.c.id, note.c.campaign_id).where(
+            note.c.user_id == user_id, note.c.target_type == target_type, note.c.target_id == target_id
+        ).order_by(note.c.updated_at.desc(), note.c.id.desc())).all()
+        extra = rows[1:]
+        extra_ids = [row.id for row in extra]
+
+        conn.execute(revision_table.delete().where(revision_table.c.note_id.in_(extra_ids)))
+        conn.execute(note.delete().where(note.c.id.in_(extra_ids)))
+        if target_type == 'district':
+            count = district_stats.c.note_count
+            conn.execute(district_stats.update().where(district_stats.c.district_id == target_id).values(
+                note_count=sa.case((count > len(extra_ids), count - len(extra_ids)), else_=0)
+            ))
+        # Logged like ORM deletes so syncing clients drop the duplicates too
+        conn.execute(change_log.insert(), [
+            {'entity_type': 'note', 'entity_id': row.id, 'action': 'delete', 'payload': None, 'user_id': None,
+             'campaign_id': row.campaign_id, 'created_at': datetime.utcnow()}
+            for row in extra
+        ])
+
+
+def upgrade():
+    _dedupe(op.get_bind())
+
+    with op.batch_alter_table('player_note', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_player_note_user_target', ['user_id', 'target_type', 'target_id'])
+
+
+def downgrade():
+    # Deleted duplicates are not restored
+    with op.batch_alter_table('player_note', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_player_note_user_target', type_='unique')
@@ -0,0 +1,82 @@
+"""Backfill district stats
+
+Revision ID: 5f2c8e7d1a94
+Revises: 145b7674a385
+Create Date: 2026-10-19 17:41:08.512337
+
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.backfill import backfill
+
+
+# revision identifiers, used by Alembic.
+revision = '5f2c8e7d1a94'
+down_revision = '145b7674a385'
+branch_labels = None
+depends_on = None
+
+COUNT_COLUMNS = ['guild_count', 'influence_low', 'influence_medium', 'influence_high',
+                 'positive_relationships', 'negative_relationships', 'note_count']
+
+district = sa.table('district', sa.column('id', sa.Integer), sa.column('campaign_id', sa.Integer))
+guild = sa.table('guild', sa.column('id', sa.Integer), sa.column('headquarters_district_id', sa.Integer),
+                 sa.column('influence', sa.String))
+relationship = sa.table('guild_relationship', sa.column('id', sa.Integer), sa.column('guild_1_id', sa.Integer),
+                        sa.column('guild_2_id', sa.Integer), sa.column('relationship_type', sa.String))
+note = sa.table('player_note', sa.column('target_type', sa.String), sa.column('target_id', sa.Integer))
+district_stats = sa.table('district_stats', sa.column('district_id', sa.Integer), sa.column('campaign_id', sa.Integer),
+                          sa.column('updated_at', sa.DateTime), *[sa.column(name, sa.Integer) for name in COUNT_COLUMNS])
+
+
+def _fill(conn, rows):
+    """Aggregates for one chunk of districts, as DistrictStats.refresh computes them"""
+    campaigns = {row['id']: row['campaign_id'] for row in rows}
+    stats = {district_id: dict.fromkeys(COUNT_COLUMNS, 0) for district_id in campaigns}
+
+    for district_id, influence, count in conn.execute(
+        sa.select(guild.c.headquarters_district_id, guild.c.influence, sa.func.count())
+        .where(guild.c.headquarters_district_id.in_(campaigns))
+        .group_by(guild.c.headquarters_district_id, guild.c.influence)
+    ):
+        stats[district_id]['guild_count'] += count
+        if influence in ('Low', 'Medium', 'High'):
+            stats[district_id][f'influence_{influence.lower()}'] += count
+
+    related = defaultdict(set)
+    for district_id, relationship_id, relationship_type in conn.execute(
+        sa.select(guild.c.headquarters_district_id, relationship.c.id, relationship.c.relationship_type)
+        .join(guild, sa.or_(guild.c.id == relationship.c.guild_1_id, guild.c.id == relationship.c.guild_2_id))
+        .where(guild.c.headquarters_district_id.in_(campaigns))
+    ):
+        if relationship_type in ('positive', 'negative'):
+            related[(district_id, relationship_type)].add(relationship_id)
+    for (district_id, relationship_type), ids in related.items():
+        stats[district_id][f'{relationship_type}_relationships'] = len(ids)
+
+    for district_id, count in conn.execute(
+        sa.select(note.c.target_id, sa.func.count())
+        .where(note.c.target_type == 'district', note.c.target_id.in_(campaigns))
+        .group_by(note.c.target_id)
+    ):
+        stats[district_id]['note_count'] = count
+
+    # Rerunning a chunk after an interruption replaces what it wrote the first time
+    conn.execute(district_stats.delete().where(district_stats.c.district_id.in_(campaigns)))
+    now = datetime.utcnow()
+    conn.execute(district_stats.insert(), [
+        dict(counts, district_id=district_id, campaign_id=campaigns[district_id], updated_at=now)
+        for district_id, counts in stats.items()
+    ])
+
+
+def upgrade():
+    backfill('district_stats', district, process=_fill)
+
+
+def downgrade():
+    op.execute(district_stats.delete())
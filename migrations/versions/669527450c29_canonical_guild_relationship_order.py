@@ -0,0 +1,94 @@
+"""Canonical guild relationship order
+
+Revision ID: 669527450c29
+Revises: 5f2c8e7d1a94
+Create Date: 2026-10-19 17:53:02.241626
+
+"""
+import json
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '669527450c29'
+down_revision = '5f2c8e7d1a94'
+branch_labels = None
+depends_on = None
+
+relationship = sa.table('guild_relationship', sa.column('id', sa.Integer), sa.column('guild_1_id', sa.Integer),
+                        sa.column('guild_2_id', sa.Integer), sa.column('relationship_type', sa.String),
+                        sa.column('campaign_id', sa.Integer), sa.column('updated_at', sa.DateTime))
+guild = sa.table('guild', sa.column('id', sa.Integer), sa.column('headquarters_district_id', sa.Integer))
+district_stats = sa.table('district_stats', sa.column('district_id', sa.Integer),
+                          sa.column('positive_relationships', sa.Integer), sa.column('negative_relationships', sa.Integer))
+change_log = sa.table('change_log', sa.column('entity_type', sa.String), sa.column('entity_id', sa.Integer),
+                      sa.column('action', sa.String), sa.column('payload', sa.Text), sa.column('user_id', sa.Integer),
+                      sa.column('campaign_id', sa.Integer), sa.column('created_at', sa.DateTime))
+
+
+def _change(row, action, payload=None):
+    # Logged like ORM writes so syncing clients drop merged duplicates and see the new order
+    return {'entity_type': 'guild_relationship', 'entity_id': row.id, 'action': action,
+            'payload': json.dumps(payload) if payload is not None else None, 'user_id': None,
+            'campaign_id': row.campaign_id, 'created_at': datetime.utcnow()}
+
+
+def _delete(conn, row):
+    """Delete a relationship row and take it out of its districts' relationship counts"""
+    conn.execute(relationship.delete().where(relationship.c.id == row.id))
+    if row.relationship_type in ('positive', 'negative'):
+        column = district_stats.c[f'{row.relationship_type}_relationships']
+        districts = sa.select(guild.c.headquarters_district_id).where(
+            guild.c.id.in_([row.guild_1_id, row.guild_2_id]), guild.c.headquarters_district_id.isnot(None)
+        )
+        conn.execute(district_stats.update().where(district_stats.c.district_id.in_(districts), column > 0)
+                     .values({column: column - 1}))
+    return _change(row, 'delete')
+
+
+def _canonicalize(conn):
+    """Store every pair lower guild id first, keeping the most recently updated of (A, B) and (B, A)"""
+    reversed_rows = conn.execute(
+        sa.select(relationship).where(relationship.c.guild_1_id >= relationship.c.guild_2_id)
+        .order_by(relationship.c.id)
+    ).all()
+    changes = []
+    for row in reversed_rows:
+        if row.guild_1_id == row.guild_2_id:
+            # A guild related to itself; the API has always refused these
+            changes.append(_delete(conn, row))
+            continue
+
+        twin = conn.execute(sa.select(relationship).where(
+            relationship.c.guild_1_id == row.guild_2_id, relationship.c.guild_2_id == row.guild_1_id
+        )).first()
+        if twin is not None:
+            if (twin.updated_at or datetime.min) >= (row.updated_at or datetime.min):
+                changes.append(_delete(conn, row))
+                continue
+            changes.append(_delete(conn, twin))
+
+        conn.execute(relationship.update().where(relationship.c.id == row.id)
+                     .values(guild_1_id=row.guild_2_id, guild_2_id=row.guild_1_id))
+        changes.append(_change(row, 'update', {'guild_1_id': row.guild_2_id, 'guild_2_id': row.guild_1_id}))
+
+    if changes:
+        conn.execute(change_log.insert(), changes)
+
+
+def upgrade():
+    _canonicalize(op.get_bind())
+
+    with op.batch_alter_table('guild_relationship', schema=None) as batch_op:
+        batch_op.create_check_constraint('ck_guild_relationship_canonical', 'guild_1_id < guild_2_id')
+        batch_op.create_index('ix_guild_relationship_guild_2', ['guild_2_id'], unique=False)
+
+
+def downgrade():
+    # Merged duplicates are not restored; canonical rows are valid in either schema
+    with op.batch_alter_table('guild_relationship', schema=None) as batch_op:
+        batch_op.drop_index('ix_guild_relationship_guild_2')
+        batch_op.drop_constraint('ck_guild_relationship_canonical', type_='check')
@@ -0,0 +1,58 @@
+"""Native JSON columns for CharacterQuickRef
+
+Revision ID: 7c41d9e05b2a
+Revises: b3d7e2f90c18
+Create Date: 2026-10-19 10:03:27.554910
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '7c41d9e05b2a'
+down_revision = 'b3d7e2f90c18'
+branch_labels = None
+depends_on = None
+
+JSON_COLUMNS = {'damage_thresholds': dict, 'experiences': list}
+
+
+def upgrade():
+    # b3d7e2f90c18 has already nulled out values the cast would reject
+    if op.get_bind().dialect.name == 'postgresql':
+        for name in JSON_COLUMNS:
+            op.alter_column('character_quick_refs', name,
+                   existing_type=sa.Text(),
+                   type_=postgresql.JSONB(astext_type=sa.Text()),
+                   existing_nullable=True,
+                   postgresql_using=f'{name}::jsonb')
+        op.create_index('ix_character_quick_refs_experiences', 'character_quick_refs', ['experiences'],
+                        unique=False, postgresql_using='gin', postgresql_ops={'experiences': 'jsonb_path_ops'})
+    else:
+        # SQLite stores JSON as text, so the existing (now validated) values carry over unchanged
+        with op.batch_alter_table('character_quick_refs', schema=None) as batch_op:
+            for name in JSON_COLUMNS:
+                batch_op.alter_column(name, existing_type=sa.Text(), type_=sa.JSON(), existing_nullable=True)
+
+    with op.batch_alter_table('character_quick_refs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_character_quick_refs_evasion_score'), ['evasion_score'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('character_quick_refs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_character_quick_refs_evasion_score'))
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_character_quick_refs_experiences', table_name='character_quick_refs')
+        for name in JSON_COLUMNS:
+            op.alter_column('character_quick_refs', name,
+                   existing_type=postgresql.JSONB(astext_type=sa.Text()),
+                   type_=sa.Text(),
+                   existing_nullable=True,
+                   postgresql_using=f'{name}::text')
+    else:
+        with op.batch_alter_table('character_quick_refs', schema=None) as batch_op:
+            for name in JSON_COLUMNS:
+                batch_op.alter_column(name, existing_type=sa.JSON(), type_=sa.Text(), existing_nullable=True)
@@ -0,0 +1,50 @@
+"""Clean CharacterQuickRef JSON text
+
+Revision ID: b3d7e2f90c18
+Revises: 3b8e1f2a6c4d
+Create Date: 2026-10-19 10:02:51.306417
+
+"""
+import json
+
+import sqlalchemy as sa
+
+from migrations.backfill import backfill
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d7e2f90c18'
+down_revision = '3b8e1f2a6c4d'
+branch_labels = None
+depends_on = None
+
+JSON_COLUMNS = {'damage_thresholds': dict, 'experiences': list}
+
+
+def upgrade():
+    # Null out values that are not valid JSON of the expected shape, so the
+    # type cast in the next revision (7c41d9e05b2a) cannot fail
+    quick_refs = sa.table('character_quick_refs', sa.column('id', sa.Integer),
+                          *[sa.column(name, sa.Text) for name in JSON_COLUMNS])
+
+    def clean(conn, rows):
+        for row in rows:
+            invalid = {}
+            for name, expected in JSON_COLUMNS.items():
+                if row[name] is None:
+                    continue
+                try:
+                    valid = isinstance(json.loads(row[name]), expected)
+                except (ValueError, TypeError):
+                    valid = False
+                if not valid:
+                    invalid[name] = None
+            if invalid:
+                conn.execute(quick_refs.update().where(quick_refs.c.id == row['id']).values(**invalid))
+
+    backfill('character_quick_refs_clean_json', quick_refs, process=clean)
+
+
+def downgrade():
+    # Values that were not valid JSON are not restored
+    pass
@@ -0,0 +1,146 @@
+"""Add campaign tenancy
+
+Revision ID: e83f1b6a0c52
+Revises: a5f0c3e81d77
+Create Date: 2026-10-19 13:41:52.306718
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e83f1b6a0c52'
+down_revision = 'a5f0c3e81d77'
+branch_labels = None
+depends_on = None
+
+SCOPED_TABLES = ['district', 'guild', 'guild_relationship', 'player_note', 'character_quick_refs']
+SCOPED_ENTITY_TYPES = ['district', 'guild', 'guild_relationship', 'note', 'quick_ref']
+
+# Lets batch mode on SQLite find the unnamed unique constraints from the initial migrations
+NAMING_CONVENTION = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+
+
+def _unnamed_unique(table, column):
+    if op.get_bind().dialect.name == 'postgresql':
+        return f'{table}_{column}_key'
+    return f'uq_{table}_{column}'
+
+
+def upgrade():
+    op.create_table('campaign',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('campaign_membership',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('campaign_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['campaign_id'], ['campaign.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('campaign_id', 'user_id', name='uq_campaign_membership')
+    )
+    with op.batch_alter_table('campaign_membership', schema=None) as batch_op:
+        batch_op.create_index('ix_campaign_membership_user_id', ['user_id'], unique=False)
+
+    # Everything that exists today belongs to one default campaign, and every user is a member
+    conn = op.get_bind()
+    campaign = sa.table('campaign', sa.column('id', sa.Integer), sa.column('name', sa.String),
+                        sa.column('created_at', sa.DateTime))
+    membership = sa.table('campaign_membership', sa.column('campaign_id', sa.Integer),
+                          sa.column('user_id', sa.Integer), sa.column('created_at', sa.DateTime))
+    user = sa.table('user', sa.column('id', sa.Integer))
+    now = datetime.utcnow()
+    conn.execute(campaign.insert().values(name='Aethermere', created_at=now))
+    default_id = conn.execute(sa.select(sa.func.min(campaign.c.id))).scalar()
+    conn.execute(membership.insert().from_select(
+        ['campaign_id', 'user_id', 'created_at'],
+        sa.select(sa.literal(default_id), user.c.id, sa.literal(now))
+    ))
+
+    for table in SCOPED_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('campaign_id', sa.Integer(), nullable=True))
+        conn.execute(sa.table(table, sa.column('campaign_id', sa.Integer)).update().values(campaign_id=default_id))
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+            batch_op.alter_column('campaign_id', existing_type=sa.Integer(), nullable=False)
+            batch_op.create_foreign_key(f'fk_{table}_campaign_id_campaign', 'campaign', ['campaign_id'], ['id'])
+
+    with op.batch_alter_table('district', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(_unnamed_unique('district', 'district_number'), type_='unique')
+        batch_op.create_unique_constraint('uq_district_campaign_number', ['campaign_id', 'district_number'])
+
+    with op.batch_alter_table('guild', schema=None) as batch_op:
+        batch_op.create_index('ix_guild_campaign_name', ['campaign_id', 'name'], unique=False)
+        batch_op.create_index('ix_guild_campaign_headquarters', ['campaign_id', 'headquarters_district_id'], unique=False)
+
+    with op.batch_alter_table('guild_relationship', schema=None) as batch_op:
+        batch_op.create_index('ix_guild_relationship_campaign_guilds', ['campaign_id', 'guild_1_id', 'guild_2_id'], unique=False)
+
+    with op.batch_alter_table('player_note', schema=None) as batch_op:
+        batch_op.create_index('ix_player_note_campaign_target', ['campaign_id', 'target_type', 'target_id'], unique=False)
+
+    with op.batch_alter_table('character_quick_refs', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(_unnamed_unique('character_quick_refs', 'user_id'), type_='unique')
+        batch_op.drop_index('ix_character_quick_refs_evasion_score')
+        batch_op.create_unique_constraint('uq_character_quick_refs_campaign_user', ['campaign_id', 'user_id'])
+        batch_op.create_index('ix_character_quick_refs_campaign_evasion', ['campaign_id', 'evasion_score'], unique=False)
+
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('campaign_id', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_change_log_campaign_id_id', ['campaign_id', 'id'], unique=False)
+    change_log = sa.table('change_log', sa.column('campaign_id', sa.Integer), sa.column('entity_type', sa.String))
+    conn.execute(change_log.update().where(change_log.c.entity_type.in_(SCOPED_ENTITY_TYPES))
+                 .values(campaign_id=default_id))
+
+
+def downgrade():
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_change_log_campaign_id_id')
+        batch_op.drop_column('campaign_id')
+
+    # Only the default campaign's rows fit back into a single-campaign schema
+    conn = op.get_bind()
+    campaign = sa.table('campaign', sa.column('id', sa.Integer))
+    default_id = conn.execute(sa.select(sa.func.min(campaign.c.id))).scalar()
+    for table in SCOPED_TABLES:
+        scoped = sa.table(table, sa.column('campaign_id', sa.Integer))
+        conn.execute(scoped.delete().where(scoped.c.campaign_id != default_id))
+
+    with op.batch_alter_table('character_quick_refs', schema=None) as batch_op:
+        batch_op.drop_index('ix_character_quick_refs_campaign_evasion')
+        batch_op.drop_constraint('uq_character_quick_refs_campaign_user', type_='unique')
+        batch_op.create_index('ix_character_quick_refs_evasion_score', ['evasion_score'], unique=False)
+        batch_op.create_unique_constraint(_unnamed_unique('character_quick_refs', 'user_id'), ['user_id'])
+
+    with op.batch_alter_table('player_note', schema=None) as batch_op:
+        batch_op.drop_index('ix_player_note_campaign_target')
+
+    with op.batch_alter_table('guild_relationship', schema=None) as batch_op:
+        batch_op.drop_index('ix_guild_relationship_campaign_guilds')
+
+    with op.batch_alter_table('guild', schema=None) as batch_op:
+        batch_op.drop_index('ix_guild_campaign_headquarters')
+        batch_op.drop_index('ix_guild_campaign_name')
+
+    with op.batch_alter_table('district', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_district_campaign_number', type_='unique')
+        batch_op.create_unique_constraint(_unnamed_unique('district', 'district_number'), ['district_number'])
+
+    for table in SCOPED_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(f'fk_{table}_campaign_id_campaign', type_='foreignkey')
+            batch_op.drop_column('campaign_id')
+
+    with op.batch_alter_table('campaign_membership', schema=None) as batch_op:
+        batch_op.drop_index('ix_campaign_membership_user_id')
+
+    op.drop_table('campaign_membership')
+    op.drop_table('campaign')
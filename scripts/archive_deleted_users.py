@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Move notes and quick refs of long-deleted users into the user_archive table.
+Usage: python scripts/archive_deleted_users.py [days]   (default: USER_ARCHIVE_AFTER_DAYS)
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import User, UserArchive
+
+def archive_deleted_users(days=None):
+    app = create_app()
+
+    with app.app_context():
+        days = days if days is not None else app.config['USER_ARCHIVE_AFTER_DAYS']
+        users = User.get_archivable(datetime.utcnow() - timedelta(days=days)).all()
+        for user in users:
+            archive = UserArchive.archive_user(user)
+            db.session.commit()
+            print(f"   {user.username}: {archive.row_counts} ({len(archive.payload)} bytes compressed)")
+        print(f"✅ Archived {len(users)} users deleted more than {days} days ago")
+
+if __name__ == '__main__':
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    archive_deleted_users(days)
\ No newline at end of file
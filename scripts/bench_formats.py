@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Compare JSON, MessagePack and CBOR for /api/districts payloads: encoded size
+(raw and gzipped), encode time and decode time.
+Usage: python scripts/bench_formats.py [districts ...]   (default: 50 500 5000)
+
+Districts are generated with svg_path strings the size of real map shapes
+and serialized with District.to_dict(), as the endpoint does. JSON is
+encoded by the app's own provider (sorted keys, compact separators).
+"""
+
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+from datetime import datetime
+from time import perf_counter
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import msgpack
+
+from app import create_app
+from app.models import District
+from app.negotiation import ENCODERS, cbor2
+
+
+def svg_path(rng, points):
+    x, y = rng.uniform(0, 1000), rng.uniform(0, 1000)
+    commands = [f'M{x:.2f} {y:.2f}']
+    for _ in range(points):
+        x, y = x + rng.uniform(-8, 8), y + rng.uniform(-8, 8)
+        commands.append(f'L{x:.2f} {y:.2f}')
+    return ' '.join(commands) + ' Z'
+
+
+def make_payload(count, seed=1):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    return [District(
+        id=number, name=f'District {number}', info='Merchants, smugglers and a very old bridge. ' * 3,
+        status=rng.choice(['Stable', 'Contested', 'Sealed - Dangerous']), color='#4a5568',
+        district_number=number, svg_path=svg_path(rng, rng.randint(150, 600)),
+        label_x=rng.randint(0, 1000), label_y=rng.randint(0, 1000), created_at=now, updated_at=now
+    ).to_dict() for number in range(1, count + 1)]
+
+
+def timed(func, arg, runs):
+    timings = []
+    for _ in range(runs):
+        started = perf_counter()
+        func(arg)
+        timings.append((perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main(counts):
+    app = create_app()
+    formats = [
+        ('json', lambda obj: app.json.dumps(obj, separators=(',', ':')).encode(), json.loads),
+        ('msgpack', ENCODERS['application/msgpack'], msgpack.unpackb),
+    ]
+    if cbor2 is not None:
+        formats.append(('cbor', ENCODERS['application/cbor'], cbor2.loads))
+    else:
+        print('   (cbor2 is not installed; skipping CBOR)')
+
+    for count in counts:
+        payload = make_payload(count)
+        runs = max(3, min(50, 5000 // count))
+        print(f"\n📦 {count} districts ({runs} runs, median)")
+        print(f"   {'format':<9}{'bytes':>12}{'gzipped':>12}{'encode':>11}{'decode':>11}")
+        baseline = None
+        for name, encode, decode in formats:
+            data = encode(payload)
+            assert decode(data) == json.loads(formats[0][1](payload)), f'{name} does not round-trip'
+            encode_ms, decode_ms = timed(encode, payload, runs), timed(decode, data, runs)
+            baseline = baseline or (len(data), encode_ms, decode_ms)
+            print(f"   {name:<9}{len(data):>12,}{len(gzip.compress(data, 6)):>12,}"
+                  f"{encode_ms:>9.2f}ms{decode_ms:>9.2f}ms"
+                  f"   ({len(data) / baseline[0]:.0%} size, {baseline[1] / encode_ms:.1f}x/{baseline[2] / decode_ms:.1f}x speed)")
+
+    print("\n✅ Clients opt in with 'Accept: application/msgpack' (or application/cbor)")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [50, 500, 5000])
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Compare the ORM and read-row (app/read_models.py) paths of the list
+endpoints: rows per second (query + serialize) and memory per loaded row.
+Usage: python scripts/bench_read_models.py [rows ...]   (default: 1000 10000 50000)
+
+Each size gets a fresh SQLite database with that many districts, guilds,
+guild relationships and notes (all on one district, as get_notes would
+read them). Memory is the tracemalloc peak while loading the rows,
+before serialization; the ORM figure includes session state.
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app import read_models
+from config.config import Config
+
+USERS = 50
+
+
+def make_config(db_path):
+    return type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path,
+        'SQLITE_CHECKPOINT_INTERVAL': 0,
+        'METRICS_ENABLED': False,
+        'SLOW_QUERY_LOG_ENABLED': False,
+    })
+
+
+def seed(count):
+    from app.models import District, Guild, GuildRelationship, PlayerNote, User
+
+    rng = random.Random(1)
+    users = [{'username': f'bench{i}', 'email': f'bench{i}@example.com', 'role': 'player', 'password_hash': 'x',
+              'character_name': f'Character {i}' if i % 2 else None} for i in range(USERS)]
+    db.session.execute(User.__table__.insert(), users)
+    campaign_id = db.session.execute(db.text('SELECT id FROM campaign')).scalar()
+    common = {'campaign_id': campaign_id}
+    db.session.execute(District.__table__.insert(), [
+        {**common, 'name': f'District {i}', 'info': 'A quarter of narrow streets. ' * 4, 'status': 'Stable',
+         'color': '#4a5568', 'district_number': i, 'svg_path': 'M0 0 L10 10 Z', 'label_x': 0, 'label_y': 0}
+        for i in range(1, count + 1)])
+    db.session.execute(Guild.__table__.insert(), [
+        {**common, 'name': f'Guild {i}', 'description': 'Traders of rumours and rope. ' * 3, 'leadership': 'A council',
+         'status': 'Active', 'influence': rng.choice(['Low', 'Medium', 'High']),
+         'headquarters_district_id': rng.choice([None, rng.randint(1, count)])}
+        for i in range(1, count + 1)])
+    db.session.execute(GuildRelationship.__table__.insert(), [
+        {**common, 'guild_1_id': i, 'guild_2_id': i % count + 1,
+         'relationship_type': rng.choice(['positive', 'negative']), 'description': 'Old grudges.'}
+        for i in range(1, count + 1)])
+    db.session.execute(PlayerNote.__table__.insert(), [
+        {**common, 'user_id': rng.randint(1, USERS), 'target_type': 'district', 'target_id': 1,
+         'content': 'Saw someone suspicious near the docks. ' * 3}
+        for _ in range(count)])
+    db.session.commit()
+
+
+# The ORM paths as the endpoints ran them before app/read_models.py
+
+def orm_districts():
+    from app.models import District
+    return District.query.all()
+
+
+def orm_guilds():
+    from app.models import Guild
+    return Guild.query.options(db.joinedload(Guild.headquarters)).all()
+
+
+def orm_relationships():
+    from app.models import GuildRelationship
+    relationships = GuildRelationship.query.all()
+    for rel in relationships:
+        rel.guild_1, rel.guild_2  # Lazy loads, as the serializer triggered them
+    return relationships
+
+
+def orm_notes():
+    from app.models import PlayerNote
+    notes = PlayerNote.get_notes_for_target('district', 1)
+    for note in notes:
+        note.user
+    return notes
+
+
+def serialize_guild(guild):
+    return {'id': guild.id, 'name': guild.name, 'description': guild.description, 'leadership': guild.leadership,
+            'status': guild.status, 'influence': guild.influence,
+            'headquarters_district_id': guild.headquarters_district_id,
+            'headquarters_name': guild.headquarters.name if guild.headquarters else None,
+            'created_at': guild.created_at.isoformat(), 'updated_at': guild.updated_at.isoformat()}
+
+
+def serialize_relationship(rel):
+    return {'id': rel.id, 'guild_1_id': rel.guild_1_id, 'guild_1_name': rel.guild_1.name,
+            'guild_2_id': rel.guild_2_id, 'guild_2_name': rel.guild_2.name,
+            'relationship_type': rel.relationship_type, 'description': rel.description,
+            'created_at': rel.created_at.isoformat(), 'updated_at': rel.updated_at.isoformat()}
+
+
+def serialize_note(note):
+    return {'id': note.id, 'user_id': note.user_id, 'username': note.user.display_name, 'content': note.content,
+            'created_at': note.created_at.isoformat(), 'updated_at': note.updated_at.isoformat()}
+
+
+LISTS = [
+    ('districts', orm_districts, lambda district: district.to_dict(), read_models.list_districts),
+    ('guilds', orm_guilds, serialize_guild, read_models.list_guilds),
+    ('relationships', orm_relationships, serialize_relationship, read_models.list_relationships),
+    ('notes', orm_notes, serialize_note, lambda: read_models.list_notes('district', 1)),
+]
+
+
+def measure(load, serialize, runs):
+    timings = []
+    for _ in range(runs):
+        db.session.remove()
+        started = perf_counter()
+        rows = load()
+        [serialize(row) for row in rows]
+        timings.append(perf_counter() - started)
+
+    db.session.remove()
+    tracemalloc.start()
+    rows = load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.remove()
+    return len(rows) / statistics.median(timings), peak / len(rows)
+
+
+def main(counts):
+    for count in counts:
+        directory = tempfile.mkdtemp(prefix='aethermere-bench-')
+        app = create_app(make_config(os.path.join(directory, 'bench.db')))
+        with app.app_context():
+            db.create_all()
+            from app.models import Campaign
+            Campaign.get_default()
+            db.session.commit()
+            seed(count)
+
+            runs = max(3, min(20, 100000 // count))
+            print(f"\n📚 {count:,} rows per list ({runs} runs, median)")
+            print(f"   {'list':<15}{'orm rows/s':>12}{'rows rows/s':>13}{'speedup':>9}{'orm B/row':>11}{'rows B/row':>12}")
+            for name, orm_load, orm_serialize, rows_load in LISTS:
+                orm_rate, orm_bytes = measure(orm_load, orm_serialize, runs)
+                rows_rate, rows_bytes = measure(rows_load, lambda row: row.to_dict(), runs)
+                print(f"   {name:<15}{orm_rate:>12,.0f}{rows_rate:>13,.0f}{rows_rate / orm_rate:>8.1f}x"
+                      f"{orm_bytes:>11,.0f}{rows_bytes:>12,.0f}")
+
+    print("\n✅ B/row is peak memory while loading, divided by the rows loaded")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000])
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Multi-process read/write throughput on SQLite with and without the production
+profile (app/sqlite_tuning.py), the way several gunicorn workers share one file.
+Usage: python scripts/bench_sqlite.py [workers] [seconds] [write_percent]   (default: 4 5 20)
+
+Each profile gets a fresh database in a temporary directory. Every worker
+process reads a district list and a district's notes, or updates a note and
+commits (through the normal ORM path: change log, revisions, district stats).
+"""
+
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+from time import perf_counter, sleep, time
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError
+
+from app import create_app, db
+from config.config import Config
+
+DISTRICTS = 20
+USERS = 10
+
+
+def make_config(db_path, tuned):
+    return type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path,
+        'SQLITE_TUNING': tuned,
+        'SQLITE_CHECKPOINT_INTERVAL': 0,  # Checkpointed explicitly below instead of by a thread
+        'METRICS_ENABLED': False,
+        'SLOW_QUERY_LOG_ENABLED': False,
+    })
+
+
+def seed(db_path, tuned):
+    from app.models import District, User, PlayerNote
+
+    app = create_app(make_config(db_path, tuned))
+    with app.app_context():
+        db.create_all()
+        for number in range(1, DISTRICTS + 1):
+            db.session.add(District(name=f'District {number}', district_number=number, svg_path='M0 0',
+                                    label_x=0, label_y=0))
+        users = [User(username=f'bench{i}', email=f'bench{i}@example.com', role='player',
+                      password_hash='x') for i in range(USERS)]
+        db.session.add_all(users)
+        db.session.flush()
+        for user in users:
+            for district_id in range(1, DISTRICTS + 1):
+                db.session.add(PlayerNote(user_id=user.id, target_type='district', target_id=district_id,
+                                          content=f'{user.username} notes on district {district_id}'))
+        db.session.commit()
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+    return journal_mode
+
+
+def worker(db_path, tuned, start_at, seconds, write_percent, results):
+    from app.models import District, PlayerNote
+
+    app = create_app(make_config(db_path, tuned))
+    rng = random.Random(os.getpid())
+    reads = writes = locked = 0
+    write_ms = []
+    with app.app_context():
+        note_ids = [note_id for (note_id,) in db.session.query(PlayerNote.id)]
+        db.session.remove()
+        sleep(max(0, start_at - time()))
+        deadline = perf_counter() + seconds
+        while perf_counter() < deadline:
+            try:
+                if rng.randrange(100) < write_percent:
+                    started = perf_counter()
+                    note = db.session.get(PlayerNote, rng.choice(note_ids))
+                    note.content = f'{note.content.split(" @")[0]} @{rng.random()}'
+                    db.session.commit()
+                    write_ms.append((perf_counter() - started) * 1000)
+                    writes += 1
+                else:
+                    District.query.all()
+                    PlayerNote.query.filter_by(target_type='district', target_id=rng.randint(1, DISTRICTS)).all()
+                    db.session.commit()
+                    reads += 1
+            except OperationalError as e:
+                db.session.rollback()
+                if 'locked' not in str(e):
+                    raise
+                locked += 1
+        db.session.remove()
+    results.put({'reads': reads, 'writes': writes, 'locked': locked, 'write_ms': write_ms})
+
+
+def run(tuned, workers, seconds, write_percent):
+    directory = tempfile.mkdtemp(prefix='aethermere-bench-')
+    db_path = os.path.join(directory, 'bench.db')
+    journal_mode = seed(db_path, tuned)
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    start_at = time() + 3  # Time for every worker to import the app and connect
+    processes = [context.Process(target=worker, args=(db_path, tuned, start_at, seconds, write_percent, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    totals = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    write_ms = sorted(ms for total in totals for ms in total['write_ms'])
+    return {
+        'journal_mode': journal_mode,
+        'reads': sum(total['reads'] for total in totals) / seconds,
+        'writes': sum(total['writes'] for total in totals) / seconds,
+        'locked': sum(total['locked'] for total in totals),
+        'write_p50': statistics.median(write_ms) if write_ms else 0,
+        'write_p95': write_ms[int(len(write_ms) * 0.95)] if write_ms else 0,
+    }
+
+
+def main(workers=4, seconds=5, write_percent=20):
+    print(f"🗄️  SQLite: {workers} worker processes, {seconds}s, {write_percent}% writes\n")
+    print(f"   {'profile':<10}{'journal':>9}{'reads/s':>10}{'writes/s':>10}{'locked':>8}{'write p50':>11}{'write p95':>11}")
+    for name, tuned in [('default', False), ('tuned', True)]:
+        result = run(tuned, workers, seconds, write_percent)
+        print(f"   {name:<10}{result['journal_mode']:>9}{result['reads']:>10.0f}{result['writes']:>10.0f}"
+              f"{result['locked']:>8}{result['write_p50']:>9.1f}ms{result['write_p95']:>9.1f}ms")
+    print("\n✅ 'locked' counts operations that failed with \"database is locked\"")
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:4]]
+    main(*args)
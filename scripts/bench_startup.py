@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Measure worker cold-start cost: import, create_app(), optional warm-up and
+the first few requests, each in a fresh interpreter.
+Usage: python scripts/bench_startup.py [runs]   (default: 5)
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Requests a player's first page load makes, in order
+FIRST_REQUESTS = ['/', '/api/districts', '/api/guilds']
+
+
+def measure(warm):
+    """Runs inside the child interpreter; prints one JSON line of timings in ms"""
+    timings = {}
+    started = perf_counter()
+    from app import create_app
+    timings['import'] = perf_counter() - started
+
+    started = perf_counter()
+    app = create_app()
+    timings['create_app'] = perf_counter() - started
+
+    if warm:
+        from app.warmup import warm_up
+        started = perf_counter()
+        warm_up(app)
+        timings['warm_up'] = perf_counter() - started
+
+    from app.models import User
+    with app.app_context():
+        user = User.query.first()
+        user_id = user.id if user else None
+
+    client = app.test_client()
+    if user_id is not None:
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+
+    for path in FIRST_REQUESTS:
+        started = perf_counter()
+        client.get(path)
+        timings[path] = perf_counter() - started
+
+    print(json.dumps({name: round(value * 1000, 1) for name, value in timings.items()}))
+
+
+def run_child(warm):
+    result = subprocess.run([sys.executable, __file__, '--child', 'warm' if warm else 'cold'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def bench_startup(runs=5):
+    for warm in [False, True]:
+        results = [run_child(warm) for _ in range(runs)]
+        print(f"\n{'With warm-up' if warm else 'Cold'} (median of {runs} runs, ms)")
+        for name in results[0]:
+            print(f"   {name:<16} {statistics.median(r[name] for r in results):>8.1f}")
+        first_requests = statistics.median(sum(r[path] for path in FIRST_REQUESTS) for r in results)
+        print(f"   {'first requests':<16} {first_requests:>8.1f}")
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, ROOT)
+    if len(sys.argv) > 2 and sys.argv[1] == '--child':
+        measure(sys.argv[2] == 'warm')
+    else:
+        runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+        bench_startup(runs)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Pick password hash parameters that cost about `target_ms` per hash on this host.
+Usage: python scripts/calibrate_password_hash.py [target_ms] [scrypt|pbkdf2]   (default: 250 scrypt)
+
+Run it on the production machine type; the result goes into PASSWORD_HASH_METHOD.
+Existing users are moved to the new parameters as they log in.
+"""
+
+import os
+import statistics
+import sys
+from time import perf_counter
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+
+# Floors from the OWASP password storage cheat sheet; never recommend less
+MIN_SCRYPT_N = 2 ** 15
+MIN_PBKDF2_ITERATIONS = 600_000
+
+def measure(method, runs=5):
+    timings = []
+    for _ in range(runs):
+        started = perf_counter()
+        generate_password_hash('calibration-password', method=method)
+        timings.append((perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def calibrate_scrypt(target_ms):
+    """Largest power-of-two N (r=8, p=1) whose hash fits in the target"""
+    best = None
+    n = 2 ** 12
+    while n <= 2 ** 20:
+        method = f'scrypt:{n}:8:1'
+        ms = measure(method)
+        print(f"   {method:<24} {ms:8.1f} ms  {128 * n * 8 / 2 ** 20:6.0f} MiB per hash")
+        if ms > target_ms:
+            break
+        best = (method, ms)
+        n *= 2
+    if best is None or int(best[0].split(':')[1]) < MIN_SCRYPT_N:
+        best = (f'scrypt:{MIN_SCRYPT_N}:8:1', measure(f'scrypt:{MIN_SCRYPT_N}:8:1'))
+    return best
+
+def calibrate_pbkdf2(target_ms):
+    """Iteration count scaled linearly from a probe, rounded to 10,000"""
+    probe = 100_000
+    ms = measure(f'pbkdf2:sha256:{probe}')
+    iterations = max(int(probe * target_ms / ms) // 10_000 * 10_000, MIN_PBKDF2_ITERATIONS)
+    method = f'pbkdf2:sha256:{iterations}'
+    return method, measure(method)
+
+def calibrate(target_ms=250, algorithm='scrypt'):
+    app = create_app()
+    workers = app.config['PASSWORD_HASH_WORKERS']
+    current = app.config['PASSWORD_HASH_METHOD']
+
+    print(f"🔐 Calibrating {algorithm} for ~{target_ms:.0f} ms per hash on {os.cpu_count()} CPUs")
+    method, ms = calibrate_scrypt(target_ms) if algorithm == 'scrypt' else calibrate_pbkdf2(target_ms)
+    current_ms = measure(current)
+
+    print(f"\n   Current:     {current} ({current_ms:.1f} ms)")
+    print(f"   Recommended: {method} ({ms:.1f} ms)")
+    if ms > target_ms * 1.5:
+        print(f"   ⚠️  The security floor costs more than {target_ms:.0f} ms here")
+    # hashlib releases the GIL, so each worker process hashes up to PASSWORD_HASH_WORKERS at once
+    cpus = os.cpu_count() or 1
+    print(f"   Throughput:  ~{min(workers, cpus) * 1000 / ms:.1f} logins/s per worker process "
+          f"(PASSWORD_HASH_WORKERS={workers}), ~{cpus * 1000 / ms:.1f}/s for the whole host")
+    print(f"\n✅ Set PASSWORD_HASH_METHOD={method}")
+
+if __name__ == '__main__':
+    target = float(sys.argv[1]) if len(sys.argv) > 1 else 250
+    algorithm = sys.argv[2] if len(sys.argv) > 2 else 'scrypt'
+    if algorithm not in ('scrypt', 'pbkdf2'):
+        sys.exit("Algorithm must be 'scrypt' or 'pbkdf2'")
+    calibrate(target, algorithm)
\ No newline at end of file
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Delete change log entries older than the retention window.
+Usage: python scripts/compact_change_log.py [days]   (default: 30)
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.models.change_log import ChangeLogEntry
+
+def compact_change_log(days=30):
+    app = create_app()
+
+    with app.app_context():
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        deleted = ChangeLogEntry.compact(cutoff)
+        print(f"✅ Removed {deleted} change log entries older than {days} days")
+        print(f"   Oldest retained sequence: {ChangeLogEntry.oldest_sequence()}")
+
+if __name__ == '__main__':
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    compact_change_log(days)
\ No newline at end of file
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Create many users at once from a CSV (header: username,email,password,role,character_name) or NDJSON file.
+Usage: python scripts/provision_users.py <file> [--campaign ID] [--dry-run] [--skip-invalid]
+
+Rows without a password get a generated one, printed next to the username.
+Nothing is created while any row is invalid unless --skip-invalid is given.
+"""
+
+import argparse
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import Campaign
+from app.provisioning import parse_rows, provision
+
+def provision_users(path, campaign_id=None, dry_run=False, skip_invalid=False):
+    app = create_app()
+
+    with open(path, encoding='utf-8-sig') as f:
+        rows = parse_rows(f.read(), 'csv' if path.lower().endswith('.csv') else 'ndjson')
+
+    with app.app_context():
+        if campaign_id is None:
+            campaign_id = Campaign.get_default().id
+        elif db.session.get(Campaign, campaign_id) is None:
+            print(f"❌ Campaign {campaign_id} does not exist")
+            return False
+
+        created, results = provision(rows, campaign_id=campaign_id, dry_run=dry_run, skip_invalid=skip_invalid)
+        db.session.commit()
+
+        for result in results:
+            if result['errors']:
+                print(f"❌ Row {result['row']} ({result['username'] or '-'}): {'; '.join(result['errors'])}")
+            elif result['status'] == 'created':
+                password = f"  password: {result['password']}" if 'password' in result else ''
+                print(f"✅ {result['username']} (id {result['id']}){password}")
+
+        invalid = sum(1 for result in results if result['errors'])
+        if dry_run:
+            print(f"Dry run: {len(rows) - invalid} valid, {invalid} invalid")
+        else:
+            print(f"Created {created} of {len(rows)} users in campaign {campaign_id}")
+        return created > 0 or (dry_run and not invalid)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk-create users from CSV or NDJSON')
+    parser.add_argument('file')
+    parser.add_argument('--campaign', type=int, help='Campaign the users join (default: the default campaign)')
+    parser.add_argument('--dry-run', action='store_true', help='Only validate')
+    parser.add_argument('--skip-invalid', action='store_true', help='Create the valid rows even if some are invalid')
+    args = parser.parse_args()
+    sys.exit(0 if provision_users(args.file, args.campaign, args.dry_run, args.skip_invalid) else 1)
\ No newline at end of file
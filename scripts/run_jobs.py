@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Work the background job queue (see app/jobs.py).
+Usage: python scripts/run_jobs.py [--once]   (--once: exit when nothing is due or running)
+"""
+
+import logging
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.jobs import JobRunner
+
+def run_jobs(once=False):
+    app = create_app()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    print(f"🛠  Working the job queue ({app.config['JOB_THREAD_WORKERS']} threads, "
+          f"{app.config['JOB_PROCESS_WORKERS']} processes)")
+    JobRunner(app).run(once=once)
+    print("✅ Job runner stopped")
+
+if __name__ == '__main__':
+    run_jobs(once='--once' in sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import Campaign, CampaignMembership, User
+from config.config import Config
+
+
+@pytest.fixture
+def app():
+    directory = tempfile.mkdtemp()
+    config = type('TestConfig', (Config,), {
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, 'test.db'),
+        'RATELIMIT_ENABLED': False,
+        'METRICS_DIR': os.path.join(directory, 'metrics'),
+        'NOTE_DRAFT_DIR': os.path.join(directory, 'drafts'),
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        first = Campaign.get_default()
+        second = Campaign(name='Second')
+        db.session.add(second)
+        for username, campaign in [('alice', first), ('bob', first), ('carol', second)]:
+            user = User(username=username, email=f'{username}@example.com', role='player')
+            user.set_password('pw')
+            db.session.add(CampaignMembership(campaign=campaign, user=user))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def login(app, username):
+    client = app.test_client()
+    response = client.post('/auth/login', data={'username': username, 'password': 'pw'})
+    assert response.status_code == 302
+    return client
+
+
+def changed_users(client):
+    changes = client.get('/api/changes').json['changes']
+    return {change['entity_id'] for change in changes if change['entity_type'] == 'user'}
+
+
+def test_user_changes_stay_in_their_campaigns(app):
+    with app.app_context():
+        ids = {user.username: user.id for user in User.query.all()}
+
+    assert changed_users(login(app, 'carol')) == {ids['carol']}
+    assert changed_users(login(app, 'alice')) == {ids['alice'], ids['bob']}
+
+
+def test_unsettled_page_asks_client_to_wait(app):
+    response = login(app, 'alice').get('/api/changes?limit=1').json
+
+    assert response['changes'] and response['next'] == 0
+    assert response['has_more'] is False
+    assert 1 <= response['retry_after'] <= app.config['CHANGE_LOG_SETTLE_SECONDS']